@@ -16,12 +16,14 @@ from datetime import datetime
 from contextlib import asynccontextmanager
 import os
 
-from models import init_database, User, Seller, Product, Order, Settings, ActivityLog, ShopifyStore, Shipment
+from models import init_database, get_db_connection, User, Seller, Product, Order, Settings, ActivityLog, ShopifyStore, Shipment, next_cursor
 from trendyol_scraper import get_scraper
 from shopify_api import get_shopify_api, ShopifyAPI
 from stock_sync import get_stock_sync_manager
 from webhooks import router as webhook_router
-from websocket_manager import manager, EventTypes, broadcast_product_event, broadcast_seller_event, broadcast_order_event
+from websocket_manager import manager, EventTypes, parse_topics, broadcast_product_event, broadcast_seller_event, broadcast_order_event
+from query_log import query_stats
+from config import QUERY_LOG_CONFIG
 
 # Logging
 logging.basicConfig(level=logging.INFO)
@@ -40,8 +42,7 @@ async def periodic_order_check():
             logger.info("🔄 Periyodik sipariş kontrolü başlıyor...")
             
             # Tüm kullanıcıları al ve her biri için sipariş çek
-            import sqlite3
-            conn = sqlite3.connect('database/dropship.db')
+            conn = get_db_connection()
             cursor = conn.cursor()
             cursor.execute("SELECT id FROM users")
             users = cursor.fetchall()
@@ -68,10 +69,13 @@ async def lifespan(app: FastAPI):
     # Başlangıç: Periyodik görevi başlat
     logger.info("🚀 Periyodik sipariş kontrolü başlatılıyor (her 5 dakika)...")
     periodic_task = asyncio.create_task(periodic_order_check())
+    # WebSocket heartbeat ve ölü bağlantı temizliği
+    manager.start_heartbeat()
     
     yield
     
-    # Kapanış: Periyodik görevi durdur
+    # Kapanış: Periyodik görevi ve heartbeat'i durdur
+    await manager.stop_heartbeat()
     if periodic_task:
         periodic_task.cancel()
         try:
@@ -126,37 +130,68 @@ async def health_check():
 # ==================== WEBSOCKET ENDPOINT ====================
 
 @app.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket):
+async def websocket_endpoint(websocket: WebSocket, token: Optional[str] = None, topics: Optional[str] = None,
+                             last_seq: Optional[int] = None, stream_id: Optional[str] = None):
     """
     WebSocket endpoint - Real-time senkronizasyon
-    Kullanım: ws://localhost:8000/ws
+    Kullanım: ws://localhost:8000/ws?token=<oturum_token>&topics=orders,stock
+    
+    Bağlantı token ile kullanıcıya bağlanır; event'ler sadece o kullanıcının
+    abone olduğu topic'lere göre iletilir. Yeniden bağlanırken last_seq ve
+    stream_id gönderilirse sadece kaçırılan event'ler tekrar gönderilir.
     """
-    await manager.connect(websocket)
+    user = User.validate_token(token) if token else None
+    if not user:
+        await websocket.close(code=1008)
+        return
+    
+    user_id = str(user['user_id'])
+    replay = await manager.connect(websocket, user_id=user_id, topics=parse_topics(topics),
+                                   last_seq=last_seq, stream_id=stream_id)
     
     try:
         # Bağlantı mesajı gönder
         await manager.send_personal_message({
             "type": "connected",
             "message": "WebSocket bağlantısı kuruldu",
-            "connections": manager.get_connection_count()
+            "connections": manager.get_connection_count(),
+            "topics": sorted(manager.get_topics(websocket)),
+            "stream_id": manager.stream_id,
+            "seq": manager.current_seq(user_id),
+            "replayed": replay['replayed']
         }, websocket)
         
         # Mesaj dinlemeye başla
         while True:
             data = await websocket.receive_json()
+            message_type = data.get("type")
+            # Her mesaj (pong dahil) bağlantının canlı olduğunu gösterir
+            manager.touch(websocket)
             
             # Ping-pong için
-            if data.get("type") == "ping":
+            if message_type == "ping":
                 await manager.send_personal_message({
                     "type": "pong",
                     "timestamp": data.get("timestamp")
                 }, websocket)
+            
+            # Topic abonelikleri
+            elif message_type in ("subscribe", "unsubscribe"):
+                requested = parse_topics(data.get("topics"))
+                if message_type == "subscribe":
+                    current = manager.subscribe(websocket, requested)
+                else:
+                    current = manager.unsubscribe(websocket, requested)
+                await manager.send_personal_message({
+                    "type": "subscriptions",
+                    "topics": sorted(current)
+                }, websocket)
                 
     except WebSocketDisconnect:
-        manager.disconnect(websocket)
+        manager.disconnect(websocket, user_id)
     except Exception as e:
         logger.error(f"WebSocket error: {e}")
-        manager.disconnect(websocket)
+        manager.disconnect(websocket, user_id)
 
 
 @app.get("/ws/stats")
@@ -164,7 +199,12 @@ async def websocket_stats():
     """WebSocket bağlantı istatistikleri"""
     return {
         "total_connections": manager.get_connection_count(),
-        "active_users": manager.get_user_count()
+        "active_users": manager.get_user_count(),
+        "topics": manager.get_topic_counts(),
+        "queues": manager.get_queue_stats(),
+        "coalescing": manager.get_coalescing_stats(),
+        "replay": manager.get_replay_stats(),
+        "heartbeat": manager.get_heartbeat_stats()
     }
 
 
@@ -322,12 +362,12 @@ async def get_dashboard(current_user: dict = Depends(get_current_user)):
         scraper = get_scraper()
         
         # İstatistikler (kullanıcıya özel)
-        products = Product.get_all(per_page=10000, user_id=user_id)
-        orders = Order.get_all(user_id=user_id)
+        orders = Order.get_all(user_id=user_id, decode_json=False)
         sellers = Seller.get_all(user_id=user_id)
         
-        total_products = products.get('total', 0)
-        synced_products = len([p for p in products.get('products', []) if p.get('is_synced_to_shopify')])
+        # Ürün satırlarını yüklemeden say
+        total_products = Product.count(user_id=user_id)
+        synced_products = Product.count(user_id=user_id, synced_only=True)
         
         return {
             "success": True,
@@ -379,7 +419,7 @@ async def create_seller(seller: SellerCreate, background_tasks: BackgroundTasks,
         }
         
         # WebSocket broadcast - Tüm bağlı cihazlara bildir
-        await broadcast_seller_event(EventTypes.SELLER_ADDED, seller_data)
+        await broadcast_seller_event(EventTypes.SELLER_ADDED, seller_data, user_id=user_id)
         
         return {
             "success": True, 
@@ -409,7 +449,7 @@ async def scrape_seller_products(trendyol_seller_id: int, db_seller_id: int, use
             "seller_id": db_seller_id,
             "trendyol_seller_id": trendyol_seller_id,
             "product_count": len(products)
-        })
+        }, user_id=user_id)
         logger.info(f"Satıcı {trendyol_seller_id}: {len(products)} ürün çekildi")
     except Exception as e:
         logger.error(f"Ürün çekme hatası: {e}")
@@ -447,12 +487,22 @@ async def sync_seller_products(seller_id: int, background_tasks: BackgroundTasks
 
 @app.get("/api/products")
 async def get_products(page: int = 1, per_page: int = 20, seller_id: Optional[int] = None, 
-                       synced_only: bool = False, current_user: dict = Depends(get_current_user)):
-    """Ürün listesi"""
+                       synced_only: bool = False, cursor: Optional[str] = None,
+                       include_total: bool = True, fields: Optional[str] = None,
+                       current_user: dict = Depends(get_current_user)):
+    """
+    Ürün listesi
+    
+    Derin sayfalar için page yerine bir önceki yanıttaki next_cursor gönderilir.
+    fields=id,name,images gibi virgülle ayrılmış liste sadece o alanları döndürür.
+    """
     try:
         result = Product.get_all(page=page, per_page=per_page, seller_id=seller_id, 
-                                 synced_only=synced_only, user_id=current_user['user_id'])
+                                 synced_only=synced_only, user_id=current_user['user_id'],
+                                 cursor=cursor, include_total=include_total, fields=fields)
         return {"success": True, "data": result}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -523,7 +573,7 @@ async def upload_products_to_shopify(product_ids: List[int], profit_margin: floa
                     "product_id": pid,
                     "shopify_product_id": str(shopify_product['id']),
                     "price": shopify_price
-                })
+                }, user_id=user_id)
         
         ActivityLog.create('shopify_sync', f'{len(product_ids)} ürün Shopify\'a yüklendi', user_id=user_id)
     except Exception as e:
@@ -537,8 +587,10 @@ async def check_product_stock(product_id: int, current_user: dict = Depends(get_
         if not product:
             raise HTTPException(status_code=404, detail="Ürün bulunamadı")
         
-        scraper = get_scraper()
-        stock_info = scraper.check_product_stock(product['trendyol_id'])
+        # Başka bir kullanıcı aynı ürünü az önce kontrol ettiyse ortak gözlem kullanılır
+        stock_info = get_stock_sync_manager().check_single_product(
+            product['trendyol_id'], user_id=current_user['user_id']
+        )
         
         return {
             "success": True,
@@ -557,11 +609,23 @@ async def check_product_stock(product_id: int, current_user: dict = Depends(get_
 
 @app.get("/api/orders")
 async def get_orders(status: Optional[str] = None, page: int = 1, per_page: int = 20,
+                     cursor: Optional[str] = None, include_total: bool = False,
                      current_user: dict = Depends(get_current_user)):
-    """Sipariş listesi"""
+    """
+    Sipariş listesi
+    
+    Derin sayfalar için page yerine bir önceki yanıttaki next_cursor gönderilir.
+    """
     try:
-        orders = Order.get_all(status=status, page=page, per_page=per_page, user_id=current_user['user_id'])
-        return {"success": True, "data": orders}
+        user_id = current_user['user_id']
+        orders = Order.get_all(status=status, page=page, per_page=per_page,
+                               user_id=user_id, cursor=cursor)
+        response = {"success": True, "data": orders, "next_cursor": next_cursor(orders, per_page)}
+        if include_total:
+            response["total"] = Order.count(status=status, user_id=user_id)
+        return response
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -611,7 +675,7 @@ async def sync_shopify_orders(user_id: int):
             await broadcast_order_event(EventTypes.ORDER_CREATED, {
                 "order_count": len(new_orders),
                 "message": f"{len(new_orders)} yeni sipariş!"
-            })
+            }, user_id=user_id)
         
         return new_orders
     except Exception as e:
@@ -628,7 +692,7 @@ async def check_new_orders(current_user: dict = Depends(get_current_user)):
         user_id = current_user['user_id']
         
         # Bekleyen siparişleri say
-        pending_orders = Order.get_all(status='pending', user_id=user_id)
+        pending_orders = Order.get_all(status='pending', user_id=user_id, decode_json=False)
         pending_count = len(pending_orders) if isinstance(pending_orders, list) else 0
         
         # Son aktiviteleri al (bildirim olarak)
@@ -703,48 +767,43 @@ async def get_order_check_status(current_user: dict = Depends(get_current_user))
 # ==================== STOK SENKRONİZASYONU ====================
 
 @app.post("/api/stock/sync")
-async def sync_stock(background_tasks: BackgroundTasks, current_user: dict = Depends(get_current_user)):
-    """Tüm ürünlerin stok durumunu senkronize et"""
+async def sync_stock(current_user: dict = Depends(get_current_user)):
+    """Kullanıcının ürünlerinin stok durumunu senkronize et (adil kuyruğa eklenir)"""
     try:
         user_id = current_user['user_id']
-        background_tasks.add_task(run_stock_sync, user_id)
+        sync_manager = get_stock_sync_manager()
+        if not sync_manager.request_sync(user_id):
+            return {"success": True, "message": "Stok senkronizasyonu zaten sırada veya senkronize ürün yok"}
         return {"success": True, "message": "Stok senkronizasyonu başlatıldı..."}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-async def run_stock_sync(user_id: int):
-    """Stok senkronizasyonu çalıştır"""
-    sync_manager = get_stock_sync_manager()
-    sync_manager.sync_all_products(user_id=user_id)
-
 @app.get("/api/stock/status")
 async def get_stock_sync_status(current_user: dict = Depends(get_current_user)):
-    """Stok senkronizasyon durumu"""
+    """Stok senkronizasyon durumu (kullanıcıya özel)"""
     try:
         sync_manager = get_stock_sync_manager()
-        return {"success": True, "data": sync_manager.get_sync_status()}
+        return {"success": True, "data": sync_manager.get_sync_status(user_id=current_user['user_id'])}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/stock/auto-sync/start")
 async def start_auto_sync(current_user: dict = Depends(get_current_user)):
-    """Otomatik stok senkronizasyonunu başlat"""
+    """Kullanıcı için otomatik stok senkronizasyonunu başlat"""
     try:
         user_id = current_user['user_id']
+        Settings.set('auto_stock_sync', True, user_id=user_id)
         sync_manager = get_stock_sync_manager()
         sync_manager.start_auto_sync()
-        Settings.set('auto_stock_sync', True, user_id=user_id)
         return {"success": True, "message": "Otomatik senkronizasyon başlatıldı"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/stock/auto-sync/stop")
 async def stop_auto_sync(current_user: dict = Depends(get_current_user)):
-    """Otomatik stok senkronizasyonunu durdur"""
+    """Kullanıcı için otomatik stok senkronizasyonunu durdur (diğer kullanıcılar etkilenmez)"""
     try:
         user_id = current_user['user_id']
-        sync_manager = get_stock_sync_manager()
-        sync_manager.stop_auto_sync()
         Settings.set('auto_stock_sync', False, user_id=user_id)
         return {"success": True, "message": "Otomatik senkronizasyon durduruldu"}
     except Exception as e:
@@ -820,7 +879,7 @@ async def bulk_sync_to_shopify(request: BulkSyncRequest, current_user: dict = De
             "success_count": success_count,
             "error_count": error_count,
             "product_ids": request.product_ids
-        })
+        }, user_id=user_id)
         
         return {
             "success": True,
@@ -839,9 +898,8 @@ async def bulk_update_price(request: BulkPriceUpdate, current_user: dict = Depen
     """Seçili ürünlerin fiyatlarını toplu güncelle"""
     try:
         user_id = current_user['user_id']
-        import sqlite3
         
-        conn = sqlite3.connect('database/dropship.db')
+        conn = get_db_connection()
         cursor = conn.cursor()
         
         success_count = 0
@@ -883,7 +941,7 @@ async def bulk_update_price(request: BulkPriceUpdate, current_user: dict = Depen
         await broadcast_product_event(EventTypes.PRODUCT_PRICE_CHANGED, {
             "updated_count": success_count,
             "product_ids": request.product_ids
-        })
+        }, user_id=user_id)
         
         return {
             "success": True,
@@ -898,9 +956,8 @@ async def bulk_delete_products(request: BulkDeleteRequest, current_user: dict =
     """Seçili ürünleri toplu sil"""
     try:
         user_id = current_user['user_id']
-        import sqlite3
         
-        conn = sqlite3.connect('database/dropship.db')
+        conn = get_db_connection()
         cursor = conn.cursor()
         
         deleted_count = 0
@@ -918,7 +975,7 @@ async def bulk_delete_products(request: BulkDeleteRequest, current_user: dict =
         await broadcast_product_event(EventTypes.PRODUCT_DELETED, {
             "deleted_count": deleted_count,
             "product_ids": request.product_ids
-        })
+        }, user_id=user_id)
         
         return {
             "success": True,
@@ -1026,7 +1083,7 @@ async def bulk_stock_update(current_user: dict = Depends(get_current_user)):
         await broadcast_product_event(EventTypes.PRODUCT_STOCK_CHANGED, {
             "updated_count": updated_count,
             "message": "Toplu stok güncelleme tamamlandı"
-        })
+        }, user_id=user_id)
         
         return {
             "success": True,
@@ -1043,11 +1100,10 @@ async def get_dashboard_stats(current_user: dict = Depends(get_current_user)):
     """Dashboard için özet istatistikler"""
     try:
         user_id = current_user['user_id']
-        import sqlite3
         from datetime import datetime, timedelta
         
-        conn = sqlite3.connect('database/dropship.db')
-        conn.row_factory = sqlite3.Row
+        # Sabit 'database/dropship.db' yolu DATABASE_PATH'i yok sayıyordu
+        conn = get_db_connection()
         cursor = conn.cursor()
         
         # Bugün
@@ -1062,7 +1118,7 @@ async def get_dashboard_stats(current_user: dict = Depends(get_current_user)):
         total_products = cursor.fetchone()['count']
         
         # Stokta olan ürünler
-        cursor.execute("SELECT COUNT(*) as count FROM products WHERE user_id = ? AND stock > 0", (user_id,))
+        cursor.execute("SELECT COUNT(*) as count FROM products WHERE user_id = ? AND stock_status = 'in_stock'", (user_id,))
         in_stock_products = cursor.fetchone()['count']
         
         # Shopify'a yüklenen ürünler
@@ -1171,11 +1227,9 @@ async def get_sales_report(
     """Satış raporu - günlük bazda"""
     try:
         user_id = current_user['user_id']
-        import sqlite3
         from datetime import datetime, timedelta
         
-        conn = sqlite3.connect('database/dropship.db')
-        conn.row_factory = sqlite3.Row
+        conn = get_db_connection()
         cursor = conn.cursor()
         
         # Dönem belirleme
@@ -1232,10 +1286,8 @@ async def get_top_products(
     """En çok satan ürünler"""
     try:
         user_id = current_user['user_id']
-        import sqlite3
         
-        conn = sqlite3.connect('database/dropship.db')
-        conn.row_factory = sqlite3.Row
+        conn = get_db_connection()
         cursor = conn.cursor()
         
         # En çok sipariş verilen ürünler (order_items tablosu varsa)
@@ -1275,10 +1327,8 @@ async def get_profit_analysis(current_user: dict = Depends(get_current_user)):
     """Kar marjı analizi"""
     try:
         user_id = current_user['user_id']
-        import sqlite3
         
-        conn = sqlite3.connect('database/dropship.db')
-        conn.row_factory = sqlite3.Row
+        conn = get_db_connection()
         cursor = conn.cursor()
         
         # Kar marjı ayarı
@@ -1584,7 +1634,7 @@ async def add_shipment_to_order(order_id: int, data: ShipmentCreate,
             "order_id": order_id,
             "status": "shipped",
             "tracking_number": data.tracking_number
-        })
+        }, user_id=user_id)
         
         shipment = Shipment.get_by_id(shipment_id, user_id)
         return {"success": True, "data": shipment}
@@ -1771,7 +1821,7 @@ async def process_order_to_trendyol(order_id: int,
             "order_id": order_id,
             "status": "processing",
             "message": "Sipariş işleniyor"
-        })
+        }, user_id=user_id)
         
         return {"success": True, "message": "Sipariş Trendyol'da işleniyor..."}
     except Exception as e:
@@ -1857,6 +1907,34 @@ async def stop_order_automation(current_user: dict = Depends(get_current_user)):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# ==================== YÖNETİM ====================
+
+async def get_admin_user(current_user: dict = Depends(get_current_user)):
+    """Yönetim endpoint'leri: sadece ADMIN_EMAILS'teki kullanıcılar (tanımlı değilse kimse)"""
+    if current_user.get('email') not in QUERY_LOG_CONFIG['admin_emails']:
+        raise HTTPException(status_code=403, detail="Bu işlem için yetkiniz yok")
+    return current_user
+
+@app.get("/api/admin/query-stats")
+async def get_query_stats(sort: str = 'total_ms', limit: int = 50,
+                          current_user: dict = Depends(get_admin_user)):
+    """
+    SQL fingerprint bazında sorgu istatistikleri ve son yavaş sorgular
+    
+    sort: total_ms, count, p95_ms, max_ms, mean_ms, slow_count
+    """
+    try:
+        return {"success": True, "data": query_stats.get_stats(sort=sort, limit=max(1, min(limit, 500)))}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.delete("/api/admin/query-stats")
+async def reset_query_stats(current_user: dict = Depends(get_admin_user)):
+    """Sorgu istatistiklerini sıfırla (ör. yük testi öncesi)"""
+    query_stats.reset()
+    return {"success": True, "message": "Sorgu istatistikleri sıfırlandı"}
+
+
 # ============================================================================
 # WEB FRONTEND - Static Files Serving
 # ============================================================================
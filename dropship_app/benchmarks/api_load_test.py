@@ -0,0 +1,322 @@
+"""
+HTTP API Yük Testi (endpoint bazlı gecikme bütçeleri)
+Mobil uygulamanın ve web panelinin sürekli yokladığı endpoint'lere kapalı
+döngü yük uygular ve api:app'in işlem tavanını ölçer:
+
+    /api/dashboard, /api/products, /api/orders,
+    /api/notifications/new-orders, /api/reports/dashboard
+
+Varsayılan akış:
+    1. generate_data ile geçici bir veritabanı sentetik veriyle doldurulur
+       (--database verilirse mevcut dosya kullanılır).
+    2. api:app ayrı bir uvicorn sürecinde başlatılır (--url verilirse atlanır).
+    3. Her kiracı için oturum token'ı açılır; istemciler ayrı süreçlerde
+       (worker) thread'ler halinde, ağırlıklı endpoint karışımıyla istek atar.
+    4. Isınma süresinden sonraki istekler için endpoint başına RPS,
+       p50/p95/p99 ve hata oranı raporlanır.
+
+Bütçeler DEFAULT_BUDGETS'tadır; --budgets ile JSON dosyasından endpoint bazında
+ezilebilir ({"/api/orders": {"p95_ms": 120}}). Bir bütçe aşılırsa çıkış kodu 1.
+
+Kullanım (dropship_app dizininden):
+    python benchmarks/api_load_test.py
+    python benchmarks/api_load_test.py --concurrency 64 --duration 30 --server-workers 4
+    python benchmarks/api_load_test.py --database /tmp/load/dropship.db --budgets budgets.json --output api.json
+    python benchmarks/api_load_test.py --url http://127.0.0.1:8000 --database database/dropship.db
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from ws_load_test import percentile, raise_fd_limit
+
+# (endpoint, sorgu, ağırlık) - ağırlıklar istemcilerin yoklama sıklığına göre
+ENDPOINTS = [
+    ('/api/dashboard', '', 2),
+    ('/api/products', '?page=1&per_page=20', 3),
+    ('/api/orders', '?page=1&per_page=20', 3),
+    ('/api/notifications/new-orders', '', 4),
+    ('/api/reports/dashboard', '', 1),
+]
+# Varsayılan veri boyutu, --concurrency 16 ve tek uvicorn worker için (ölçülen değerin ~1.5 katı).
+# Bu ayarlarda gecikmenin çoğu sunucu kuyruğudur; farklı yük profilleri için --budgets kullanın.
+DEFAULT_BUDGETS = {
+    '/api/dashboard': {'p95_ms': 900, 'p99_ms': 1100},
+    '/api/products': {'p95_ms': 750, 'p99_ms': 1000},
+    '/api/orders': {'p95_ms': 800, 'p99_ms': 1000},
+    '/api/notifications/new-orders': {'p95_ms': 800, 'p99_ms': 1000},
+    '/api/reports/dashboard': {'p95_ms': 900, 'p99_ms': 1100},
+}
+MAX_ERROR_RATE = 0.01
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=APP_DIR,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+# ==================== VERİ + SUNUCU ====================
+
+def prepare_database(args):
+    """Veritabanını hazırla (gerekirse sentetik veriyle doldur) ve kiracı token'larını aç"""
+    import generate_data
+    import models
+
+    path = os.path.abspath(args.database or os.path.join(tempfile.mkdtemp(prefix='apiload-'), 'dropship.db'))
+    if not os.path.exists(path):
+        data_args = generate_data.build_parser().parse_args([
+            '--users', str(args.users), '--products', str(args.products),
+            '--orders', str(args.orders), '--seed', str(args.seed)
+        ])
+        print(f"Sentetik veri üretiliyor: {path}")
+        generate_data.generate(generate_data.SqliteTarget(path, reset=True), data_args)
+    models.DATABASE_PATH = path
+
+    conn = models.get_db_connection()
+    user_ids = [row['id'] for row in conn.execute('SELECT id FROM users ORDER BY id LIMIT ?', (args.tenants,))]
+    conn.close()
+    if not user_ids:
+        raise SystemExit(f"{path} içinde kullanıcı yok")
+    return path, [models.User.create_session(user_id) for user_id in user_ids]
+
+
+def start_server(args, database_path):
+    """api:app'i ayrı bir uvicorn sürecinde başlat, /health yanıt verene kadar bekle"""
+    env = dict(os.environ, DATABASE_PATH=database_path)
+    # Dashboard'daki kur sorgusu dışarı çıkmasın
+    env.setdefault('USD_TRY_RATE', '35')
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'api:app', '--host', '127.0.0.1', '--port', str(args.port),
+         '--workers', str(args.server_workers), '--log-level', 'warning', '--no-access-log'],
+        cwd=APP_DIR, env=env
+    )
+    url = f'http://127.0.0.1:{args.port}'
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"uvicorn başlatılamadı (çıkış kodu {process.returncode})")
+        try:
+            urllib.request.urlopen(f'{url}/health', timeout=1).read()
+            return process, url
+        except (urllib.error.URLError, OSError):
+            time.sleep(0.2)
+    process.terminate()
+    raise SystemExit("uvicorn 60 sn içinde yanıt vermedi")
+
+
+# ==================== İSTEMCİ WORKER ====================
+
+def client_worker(worker_id, url, tokens, threads, warmup, duration, seed, results):
+    """multiprocessing giriş noktası: threads adet kapalı döngü istemci çalıştır"""
+    import requests
+
+    raise_fd_limit()
+    paths = [path for path, _, _ in ENDPOINTS]
+    weights = [weight for _, _, weight in ENDPOINTS]
+    queries = {path: query for path, query, _ in ENDPOINTS}
+    measure_from = time.time() + warmup
+    stop_at = measure_from + duration
+    lock = threading.Lock()
+    latencies = {path: [] for path in paths}
+    errors = {path: 0 for path in paths}
+
+    def run(thread_id):
+        rng = random.Random(f'{seed}:{worker_id}:{thread_id}')
+        session = requests.Session()
+        local = {path: [] for path in paths}
+        local_errors = {path: 0 for path in paths}
+        while True:
+            path = rng.choices(paths, weights=weights)[0]
+            headers = {'Authorization': f'Bearer {rng.choice(tokens)}'}
+            started = time.time()
+            if started >= stop_at:
+                break
+            try:
+                ok = session.get(f'{url}{path}{queries[path]}', headers=headers, timeout=30).status_code == 200
+            except requests.RequestException:
+                ok = False
+            if started < measure_from:
+                continue
+            if ok:
+                local[path].append(time.time() - started)
+            else:
+                local_errors[path] += 1
+        with lock:
+            for path in paths:
+                latencies[path].extend(local[path])
+                errors[path] += local_errors[path]
+
+    workers = [threading.Thread(target=run, args=(t,)) for t in range(threads)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    results.put((worker_id, latencies, errors))
+
+
+def run_load(args, url, tokens):
+    """İstemci süreçlerini başlat, endpoint bazında gecikmeleri topla"""
+    ctx = multiprocessing.get_context('spawn')
+    results = ctx.Queue()
+    per_worker = [args.concurrency // args.workers + (1 if w < args.concurrency % args.workers else 0)
+                  for w in range(args.workers)]
+    processes = [
+        ctx.Process(target=client_worker, args=(
+            w, url, tokens, threads, args.warmup, args.duration, args.seed, results
+        ), daemon=True)
+        for w, threads in enumerate(per_worker) if threads
+    ]
+    for p in processes:
+        p.start()
+
+    latencies = {path: [] for path, _, _ in ENDPOINTS}
+    errors = {path: 0 for path, _, _ in ENDPOINTS}
+    for _ in processes:
+        _, worker_latencies, worker_errors = results.get(timeout=args.warmup + args.duration + 120)
+        for path in latencies:
+            latencies[path].extend(worker_latencies[path])
+            errors[path] += worker_errors[path]
+    for p in processes:
+        p.join(timeout=5)
+    return latencies, errors
+
+
+# ==================== RAPOR + BÜTÇE ====================
+
+def summarize(latencies, errors, duration):
+    summary = {}
+    for path, values in latencies.items():
+        total = len(values) + errors[path]
+        summary[path] = {
+            'requests': total,
+            'rps': round(len(values) / duration, 1),
+            'p50_ms': round(percentile(values, 50) * 1000, 2),
+            'p95_ms': round(percentile(values, 95) * 1000, 2),
+            'p99_ms': round(percentile(values, 99) * 1000, 2),
+            'errors': errors[path],
+            'error_rate': round(errors[path] / total, 4) if total else 0.0
+        }
+    return summary
+
+
+def load_budgets(path):
+    """Varsayılan bütçeler + dosyadaki endpoint bazlı değerler"""
+    budgets = {endpoint: dict(limits) for endpoint, limits in DEFAULT_BUDGETS.items()}
+    if path:
+        with open(path, encoding='utf-8') as f:
+            for endpoint, limits in json.load(f).items():
+                budgets.setdefault(endpoint, {}).update(limits)
+    return budgets
+
+
+def check_budgets(summary, budgets):
+    """Aşılan bütçeleri (endpoint, metrik, ölçülen, limit) olarak döndür"""
+    violations = []
+    for path, result in summary.items():
+        limits = budgets.get(path, {})
+        for metric in ('p50_ms', 'p95_ms', 'p99_ms'):
+            if metric in limits and result[metric] > limits[metric]:
+                violations.append((path, metric, result[metric], limits[metric]))
+        max_error_rate = limits.get('max_error_rate', MAX_ERROR_RATE)
+        if result['error_rate'] > max_error_rate:
+            violations.append((path, 'error_rate', result['error_rate'], max_error_rate))
+        if not result['requests']:
+            violations.append((path, 'requests', 0, 1))
+    return violations
+
+
+def print_report(summary, violations, duration):
+    failed = {path for path, _, _, _ in violations}
+    print(f"\n{'endpoint':<32} {'istek':>7} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'hata':>6} {'bütçe':>7}")
+    for path, r in summary.items():
+        status = 'AŞILDI' if path in failed else 'ok'
+        print(f"{path:<32} {r['requests']:>7} {r['rps']:>8.1f} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} "
+              f"{r['p99_ms']:>8.1f} {r['errors']:>6} {status:>7}")
+    total_rps = sum(r['rps'] for r in summary.values())
+    print(f"{'toplam':<32} {sum(r['requests'] for r in summary.values()):>7} {total_rps:>8.1f}"
+          f"   ({duration:.0f} sn ölçüm, gecikmeler ms)")
+    for path, metric, value, limit in violations:
+        print(f"❌ {path} {metric}: {value} > {limit}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP API yük testi (endpoint bazlı gecikme bütçeleri)")
+    parser.add_argument('--url', help='Çalışan bir api:app adresi (verilmezse yerel uvicorn başlatılır)')
+    parser.add_argument('--database', help='Kullanılacak SQLite dosyası (yoksa sentetik veriyle oluşturulur)')
+    parser.add_argument('--users', type=int, default=10, help='Üretilecek kiracı sayısı')
+    parser.add_argument('--products', type=int, default=100000, help='Üretilecek toplam ürün')
+    parser.add_argument('--orders', type=int, default=50000, help='Üretilecek toplam sipariş')
+    parser.add_argument('--tenants', type=int, default=50, help='İstek atılacak en fazla kiracı')
+    parser.add_argument('--concurrency', type=int, default=16, help='Eşzamanlı istemci (thread) sayısı')
+    parser.add_argument('--workers', type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help='İstemci süreç sayısı')
+    parser.add_argument('--server-workers', type=int, default=1, help='uvicorn worker sayısı')
+    parser.add_argument('--duration', type=float, default=20, help='Ölçüm süresi (sn)')
+    parser.add_argument('--warmup', type=float, default=3, help='Ölçüme katılmayan ısınma süresi (sn)')
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--budgets', help='Endpoint bazlı bütçe JSON dosyası')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='Sonuçların yazılacağı JSON dosyası')
+    args = parser.parse_args()
+
+    raise_fd_limit()
+    budgets = load_budgets(args.budgets)
+    database_path, tokens = prepare_database(args)
+    server = None
+    url = args.url.rstrip('/') if args.url else None
+    if not url:
+        server, url = start_server(args, database_path)
+    try:
+        print(f"Yük: {args.concurrency} istemci / {args.workers} süreç, {len(tokens)} kiracı, "
+              f"{args.warmup:.0f}+{args.duration:.0f} sn → {url}")
+        latencies, errors = run_load(args, url, tokens)
+    finally:
+        if server:
+            server.terminate()
+            server.wait(timeout=10)
+
+    summary = summarize(latencies, errors, args.duration)
+    violations = check_budgets(summary, budgets)
+    print_report(summary, violations, args.duration)
+
+    if args.output:
+        report = {
+            'benchmark': 'api_load',
+            'commit': git_commit(),
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'config': vars(args),
+            'endpoints': summary,
+            'budgets': budgets,
+            'violations': [
+                {'endpoint': p, 'metric': m, 'value': v, 'limit': lim} for p, m, v, lim in violations
+            ]
+        }
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\nSonuçlar: {args.output}")
+
+    sys.exit(1 if violations else 0)
+
+
+if __name__ == '__main__':
+    main()
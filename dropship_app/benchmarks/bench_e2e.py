@@ -0,0 +1,351 @@
+"""
+Uçtan Uca Benchmark: satıcı çekme → kaydetme → Shopify yükleme → stok senkronizasyonu
+Ağ kullanmadan, yerel Trendyol (fake_trendyol) ve Shopify (fake_shopify) sunucularına
+karşı gerçek uygulama kodunu çalıştırır ve her aşamanın süresini ölçer.
+
+Aşamalar:
+    scrape   : TrendyolScraper.scrape_seller_products (sayfalar paralel)
+    upsert   : Product.create_or_update (api.py'deki arka plan görevi gibi)
+    upload   : ProductUploader.upload_product + Product.update_shopify_sync
+               (--upload-limit ürün HTTP üzerinden; kalan ürünler sahte mağazaya
+               doğrudan eklenir ki senkronizasyon tüm katalogla çalışsın)
+    sync     : StockSyncManager.sync_all_products (tüm katalog, Shopify yazmaları dahil)
+    orders   : ShopifyAPI.get_new_orders sayfaları + Order.create
+    reports  : dashboard ve rapor sorguları (tekrarlı, medyan ms)
+
+Her boyut kendi geçici veritabanı ve sunucularıyla çalışır. Sonuçlar JSON
+olarak yazılır (--output); --compare ile önceki bir sonuç dosyasıyla
+aşama aşama karşılaştırılır.
+
+Kullanım (dropship_app dizininden):
+    python benchmarks/bench_e2e.py --sizes 1000 --output e2e.json
+    python benchmarks/bench_e2e.py --sizes 1000,10000,100000 --stages scrape,upsert,sync
+    python benchmarks/bench_e2e.py --sizes 10000 --compare e2e-eski.json
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from datetime import datetime
+
+import requests
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Kur sorgusu yapılmasın; models DATABASE_PATH'i import anında okur
+os.environ.setdefault('USD_TRY_RATE', '35')
+os.environ.setdefault('DATABASE_PATH', os.path.join(tempfile.mkdtemp(prefix='e2ebench-'), 'dropship.db'))
+
+import models
+import stock_sync
+from models import ActivityLog, Order, Product, Seller, ShopifyStore, get_db_connection, init_database
+from shopify_api import ProductUploader, ShopifyAPI
+from trendyol_scraper import TrendyolScraper
+
+from fake_shopify import start_fake_shopify
+from fake_trendyol import ID_BLOCK, start_fake_trendyol
+
+STAGES = ['scrape', 'upsert', 'upload', 'sync', 'orders', 'reports']
+SELLER_ID = 100
+USER_ID = 1
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=APP_DIR,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+def fake_stats(base_url):
+    with urllib.request.urlopen(f'{base_url}/__fake/stats') as response:
+        return json.loads(response.read())
+
+
+def stage_result(seconds, items, **extra):
+    return {
+        'seconds': round(seconds, 3),
+        'items': items,
+        'per_second': round(items / seconds, 1) if seconds > 0 else None,
+        **extra
+    }
+
+
+class E2ERun:
+    """Tek katalog boyutu için sunucular, veritabanı ve aşamalar"""
+
+    def __init__(self, size, args):
+        self.size = size
+        self.args = args
+        self.products = []
+        self.uploaded_ids = []
+
+        models.DATABASE_PATH = os.path.join(tempfile.mkdtemp(prefix=f'e2ebench-{size}-'), 'dropship.db')
+        init_database()
+        conn = get_db_connection()
+        conn.execute('INSERT INTO sellers (trendyol_seller_id, user_id, name) VALUES (?, ?, ?)',
+                     (SELLER_ID, USER_ID, 'Benchmark Satıcı'))
+        conn.commit()
+        conn.close()
+        self.db_seller_id = Seller.get_all(user_id=USER_ID)[0]['id']
+
+        self.trendyol, self.trendyol_url = start_fake_trendyol(
+            products=size, seed=args.seed, churn=args.churn, latency_ms=args.trendyol_latency_ms,
+            error_rate=args.trendyol_error_rate
+        )
+        self.shopify, self.shop_url = start_fake_shopify(
+            seed=args.seed, bucket_size=args.shopify_bucket, leak_rate=args.shopify_leak,
+            latency_ms=args.shopify_latency_ms
+        )
+        ShopifyStore.create(USER_ID, self.shop_url, 'bench-token', 'Benchmark', is_default=True)
+        self.scraper = TrendyolScraper(base_api_url=self.trendyol_url)
+        self.shopify_api = ShopifyAPI(self.shop_url, 'bench-token')
+
+    def close(self):
+        self.trendyol.shutdown()
+        self.shopify.shutdown()
+
+    def scrape(self):
+        started = time.perf_counter()
+        self.products = self.scraper.scrape_seller_products(SELLER_ID)
+        return stage_result(time.perf_counter() - started, len(self.products),
+                            requests=fake_stats(self.trendyol_url)['search'])
+
+    def upsert(self):
+        if not self.products:
+            self.products = [self.trendyol.catalog.search_item(SELLER_ID * ID_BLOCK + i)
+                             for i in range(1, self.size + 1)]
+            self.products = [self.scraper._parse_product(p, SELLER_ID) for p in self.products]
+        started = time.perf_counter()
+        for product in self.products:
+            product['seller_id'] = self.db_seller_id
+            Product.create_or_update(product, user_id=USER_ID)
+        return stage_result(time.perf_counter() - started, len(self.products))
+
+    def upload(self):
+        uploader = ProductUploader(self.shopify_api)
+        page = Product.get_all(per_page=self.args.upload_limit, user_id=USER_ID, include_total=False)
+        before = fake_stats(self.shop_url)
+        started = time.perf_counter()
+        success = 0
+        for product in page['products']:
+            result = uploader.upload_product(product, 50, 35)
+            if result:
+                Product.update_shopify_sync(product['id'], result['shopify_id'], result['shopify_price'])
+                self.uploaded_ids.append(int(result['shopify_id']))
+                success += 1
+        elapsed = time.perf_counter() - started
+        after = fake_stats(self.shop_url)
+
+        # Kalan ürünler HTTP'siz sahte mağazaya eklenir (senkronizasyon tüm katalogla ölçülsün)
+        conn = get_db_connection()
+        rows = conn.execute(
+            'SELECT id, name, shopify_price FROM products WHERE user_id = ? AND is_synced_to_shopify = 0',
+            (USER_ID,)
+        ).fetchall()
+        updates = []
+        for row in rows:
+            created = self.shopify.shop.create_product({
+                'title': row['name'], 'variants': [{'price': '19.99', 'option1': 'Standart'}]
+            })
+            updates.append((str(created['id']), row['id']))
+        conn.executemany('UPDATE products SET shopify_id = ?, is_synced_to_shopify = 1 WHERE id = ?', updates)
+        conn.commit()
+        conn.close()
+
+        # items/per_second sadece başarılı (2xx) yüklemeler; 429 ile reddedilenler
+        # failed'a yazılır, throttled sahte mağazanın döndüğü 429 sayısıdır
+        return stage_result(elapsed, success, attempted=len(page['products']),
+                            failed=len(page['products']) - success,
+                            throttled=after['throttled'] - before['throttled'])
+
+    def sync(self):
+        # Bir dönem ilerlet: --churn oranındaki ürünlerin stok/fiyatı değişir
+        request = urllib.request.Request(f'{self.trendyol_url}/__fake/advance', method='POST')
+        urllib.request.urlopen(request).read()
+        stock_sync.REQUEST_DELAY = self.args.sync_delay
+        manager = stock_sync.StockSyncManager()
+        manager.scraper = self.scraper
+        shopify_before = fake_stats(self.shop_url)
+        trendyol_before = fake_stats(self.trendyol_url)
+
+        started = time.perf_counter()
+        results = manager.sync_all_products(user_id=USER_ID, resume=False)
+        elapsed = time.perf_counter() - started
+
+        shopify_after = fake_stats(self.shop_url)
+        trendyol_after = fake_stats(self.trendyol_url)
+        return stage_result(
+            elapsed, results.get('total_checked', 0),
+            out_of_stock=results.get('out_of_stock', 0),
+            price_changes=results.get('price_changes', 0),
+            shopify_updated=results.get('shopify_updated', 0),
+            shopify_failed=results.get('shopify_failed', 0),
+            unknown=results.get('unknown', 0),
+            errors=results.get('errors', 0),
+            trendyol_requests=trendyol_after['detail'] - trendyol_before['detail'],
+            shopify_calls=shopify_after['calls'] - shopify_before['calls'],
+            shopify_throttled=shopify_after['throttled'] - shopify_before['throttled']
+        )
+
+    def orders(self):
+        shop = self.shopify.shop
+        product_ids = self.uploaded_ids or list(shop.products)[:100]
+        for i in range(self.args.orders):
+            shop.create_order([product_ids[i % len(product_ids)]], i)
+
+        started = time.perf_counter()
+        ingested = 0
+        throttled = 0
+        last_order_id = None
+        while True:
+            try:
+                orders = self.shopify_api.get_new_orders(last_order_id)
+            except requests.exceptions.HTTPError as e:
+                # Çağrı kovası dolu - Retry-After kadar bekleyip tekrar dene
+                if e.response is None or e.response.status_code != 429:
+                    raise
+                throttled += 1
+                time.sleep(float(e.response.headers.get('Retry-After', 1)))
+                continue
+            if not orders:
+                break
+            for order_data in orders:
+                Order.create(order_data, user_id=USER_ID)
+                ingested += 1
+            last_order_id = orders[-1]['shopify_order_id']
+        return stage_result(time.perf_counter() - started, ingested, throttled=throttled)
+
+    def reports(self):
+        queries = {
+            'dashboard': lambda: (
+                Order.get_all(user_id=USER_ID, decode_json=False),
+                Seller.get_all(user_id=USER_ID),
+                Product.count(user_id=USER_ID),
+                Product.count(user_id=USER_ID, synced_only=True),
+                ActivityLog.get_recent(10, user_id=USER_ID)
+            ),
+            'product_list': lambda: Product.get_all(page=1, per_page=50, user_id=USER_ID),
+            'product_list_deep': lambda: Product.get_all(page=max(1, self.size // 50), per_page=50,
+                                                         user_id=USER_ID, include_total=False),
+            'order_list': lambda: Order.get_all(page=1, per_page=50, user_id=USER_ID),
+            'tier_counts': lambda: Product.get_tier_counts(USER_ID),
+            'sales_report': self._sales_report
+        }
+        timings = {}
+        started = time.perf_counter()
+        for name, query in queries.items():
+            samples = []
+            for _ in range(self.args.report_repeat):
+                t = time.perf_counter()
+                query()
+                samples.append((time.perf_counter() - t) * 1000)
+            timings[name] = round(statistics.median(samples), 3)
+        elapsed = time.perf_counter() - started
+        return stage_result(elapsed, len(queries) * self.args.report_repeat, median_ms=timings)
+
+    @staticmethod
+    def _sales_report():
+        """/api/reports/sales sorgusu"""
+        conn = get_db_connection()
+        rows = conn.execute('''
+            SELECT DATE(created_at) as date, COUNT(*) as order_count, COALESCE(SUM(total_price), 0) as revenue
+            FROM orders WHERE user_id = ? AND DATE(created_at) >= ?
+            GROUP BY DATE(created_at) ORDER BY date DESC
+        ''', (USER_ID, '2000-01-01')).fetchall()
+        conn.close()
+        return rows
+
+
+def compare(previous, current):
+    """Aynı boyut/aşama için saniyedeki işlem değişimi (pozitif = hızlandı)"""
+    old_runs = {run['size']: run for run in previous.get('runs', [])}
+    print(f"\nKarşılaştırma: {previous.get('commit')} → {current.get('commit')}")
+    print(f"{'boyut':>8} {'aşama':>8} {'eski adet/sn':>13} {'yeni adet/sn':>13} {'değişim':>9}")
+    for run in current['runs']:
+        old = old_runs.get(run['size'])
+        if not old:
+            continue
+        for stage, result in run['stages'].items():
+            before = old['stages'].get(stage)
+            if not before or not before['per_second'] or not result['per_second']:
+                continue
+            change = (result['per_second'] - before['per_second']) / before['per_second'] * 100
+            print(f"{run['size']:>8} {stage:>8} {before['per_second']:>13.1f} {result['per_second']:>13.1f} "
+                  f"{change:>+8.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Uçtan uca scrape → upsert → upload → sync benchmark")
+    parser.add_argument('--sizes', default='1000', help='Virgülle ayrılmış katalog boyutları (ör: 1000,10000,100000)')
+    parser.add_argument('--stages', default=','.join(STAGES), help='Çalıştırılacak aşamalar')
+    parser.add_argument('--upload-limit', type=int, default=100, help='HTTP ile yüklenecek ürün sayısı')
+    parser.add_argument('--orders', type=int, default=500, help='Sahte mağazadaki sipariş sayısı')
+    parser.add_argument('--report-repeat', type=int, default=20, help='Rapor sorgusu tekrar sayısı')
+    parser.add_argument('--churn', type=float, default=0.1, help='Senkronizasyonda değişen ürün oranı')
+    parser.add_argument('--sync-delay', type=float, default=0.0,
+                        help='Stok isteği arası bekleme (sn, uygulama varsayılanı 0.2)')
+    parser.add_argument('--trendyol-latency-ms', type=float, default=0)
+    parser.add_argument('--trendyol-error-rate', type=float, default=0.0)
+    parser.add_argument('--shopify-latency-ms', type=float, default=0)
+    parser.add_argument('--shopify-bucket', type=int, default=40, help='Shopify çağrı kovası boyutu')
+    parser.add_argument('--shopify-leak', type=float, default=2.0, help='Shopify kovası saniyede boşalma')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='Sonuçların yazılacağı JSON dosyası')
+    parser.add_argument('--compare', help='Karşılaştırılacak önceki sonuç dosyası')
+    parser.add_argument('--verbose', action='store_true', help='Uygulama loglarını göster')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.CRITICAL)
+    stages = [s.strip() for s in args.stages.split(',') if s.strip()]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"Bilinmeyen aşama: {', '.join(sorted(unknown))}")
+
+    report = {
+        'benchmark': 'e2e',
+        'commit': git_commit(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'config': vars(args),
+        'runs': []
+    }
+
+    print(f"{'boyut':>8} {'aşama':>8} {'süre (sn)':>10} {'adet':>8} {'adet/sn':>10}")
+    for size in [int(s) for s in args.sizes.split(',') if s.strip()]:
+        run = E2ERun(size, args)
+        results = {}
+        try:
+            for stage in STAGES:
+                if stage not in stages:
+                    continue
+                results[stage] = getattr(run, stage)()
+                r = results[stage]
+                print(f"{size:>8} {stage:>8} {r['seconds']:>10.3f} {r['items']:>8} {r['per_second'] or 0:>10.1f}")
+        finally:
+            run.close()
+        report['runs'].append({'size': size, 'stages': results})
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\nSonuçlar: {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            compare(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Sipariş Listesi Benchmark
+Order.get_all'ın eski (sipariş başına kargo sorgusu) ve yeni (tek sorgu) halini karşılaştırır
+
+Geçici bir veritabanına N sipariş ve bunların bir kısmı için kargo kayıtları yazılır,
+ardından farklı sayfa boyutlarında iki yol ölçülür.
+
+Son ölçüm (50k sipariş, tek kullanıcı, migration'lar uygulanmış): 20'lik sayfada fark
+yok (0.9-1.0x), 100-50000'lik sayfalarda 1.3-1.6x. Kazancın çoğu sorgu sayısından
+değil JSON decode'dan gelir; decode_json=False yeni yola ayrıca ~1.5x ekler. Eski yolun
+kargo sorgusu da shipments(order_id, created_at) index'ini kullandığı için fark küçüktür.
+
+Kullanım (dropship_app dizininden):
+    python benchmarks/bench_order_list.py
+    python benchmarks/bench_order_list.py --orders 50000 --per-page 20,1000,50000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# models, config üzerinden DATABASE_PATH'i import anında okur
+os.environ.setdefault('DATABASE_PATH', os.path.join(tempfile.mkdtemp(prefix='orderbench-'), 'dropship.db'))
+
+from models import Order, Shipment, get_db_connection, init_database
+
+
+def seed(order_count: int, users: int, shipment_ratio: float):
+    """Sipariş ve kargo kayıtlarını toplu olarak ekle"""
+    rng = random.Random(42)
+    conn = get_db_connection()
+    conn.execute('DELETE FROM shipments')
+    conn.execute('DELETE FROM orders')
+
+    address = json.dumps({
+        'name': 'Ayşe Yılmaz', 'address1': 'Atatürk Cad. No: 12', 'city': 'İstanbul',
+        'province': 'Kadıköy', 'zip': '34710', 'country': 'Turkey', 'phone': '+905551112233'
+    })
+    orders = []
+    for i in range(order_count):
+        items = json.dumps([
+            {'title': f'Ürün {i}-{k}', 'sku': f'TY-{i}-{k}', 'quantity': 1 + k, 'price': 199.9 + k}
+            for k in range(rng.randint(1, 4))
+        ])
+        created = f'2025-{1 + i % 12:02d}-{1 + i % 28:02d} {i % 24:02d}:{i % 60:02d}:{(i * 7) % 60:02d}'
+        orders.append((
+            1 + i % users, f'shopify-{i}', f'#{1000 + i}', 'Ayşe Yılmaz', 'ayse@example.com',
+            '+905551112233', address, items, 499.9, 449.9, 50.0,
+            rng.choice(['pending', 'processing', 'shipped', 'delivered']), created
+        ))
+    conn.executemany('''
+        INSERT INTO orders (
+            user_id, shopify_order_id, shopify_order_number,
+            customer_name, customer_email, customer_phone,
+            shipping_address, order_items,
+            total_price, subtotal_price, shipping_price, status, created_at
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', orders)
+
+    carriers = list(Shipment.CARRIERS.keys()) or ['yurtici']
+    shipments = []
+    for order_id in range(1, order_count + 1):
+        if rng.random() >= shipment_ratio:
+            continue
+        # Bazı siparişlerde birden fazla kargo kaydı (en sonuncusu seçilmeli)
+        for n in range(rng.choice([1, 1, 1, 2])):
+            shipments.append((
+                1 + (order_id - 1) % users, order_id, f'TRK{order_id:08d}{n}',
+                rng.choice(carriers), 'in_transit', f'2025-06-{1 + n:02d} 10:00:00'
+            ))
+    conn.executemany('''
+        INSERT INTO shipments (user_id, order_id, tracking_number, carrier, status, created_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', shipments)
+    conn.commit()
+    conn.close()
+    return len(shipments)
+
+
+def legacy_get_all(page=1, per_page=20, user_id=None):
+    """Eski Order.get_all: her sipariş için ayrı kargo sorgusu ve JSON decode"""
+    conn = get_db_connection()
+    offset = (page - 1) * per_page
+    query = 'SELECT * FROM orders WHERE 1=1'
+    params = []
+    if user_id:
+        query += ' AND user_id = ?'
+        params.append(user_id)
+    # Eşit created_at'lerde karşılaştırma için id ile aynı sıraya sabitlenir
+    query += ' ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?'
+    params.extend([per_page, offset])
+
+    result = []
+    for o in conn.execute(query, params).fetchall():
+        order = dict(o)
+        order['shipping_address'] = json.loads(order['shipping_address']) if order['shipping_address'] else {}
+        order['order_items'] = json.loads(order['order_items']) if order['order_items'] else []
+        shipment = conn.execute(
+            'SELECT * FROM shipments WHERE order_id = ? ORDER BY created_at DESC LIMIT 1',
+            (order['id'],)
+        ).fetchone()
+        if shipment:
+            shipment_data = dict(shipment)
+            order['tracking_number'] = shipment_data.get('tracking_number')
+            order['carrier'] = shipment_data.get('carrier')
+            order['carrier_name'] = Shipment.CARRIERS.get(shipment_data.get('carrier', ''), {}).get('name', '')
+            order['tracking_url'] = shipment_data.get('tracking_url')
+            order['shipment_status'] = shipment_data.get('status')
+        result.append(order)
+    conn.close()
+    return result
+
+
+def measure(func, repeat: int, **kwargs) -> float:
+    """Ortalama süre (ms)"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(**kwargs)
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sipariş listesi sorgu benchmark")
+    parser.add_argument('--orders', type=int, default=50000, help='Oluşturulacak sipariş sayısı')
+    parser.add_argument('--users', type=int, default=1, help='Siparişlerin dağıtılacağı kullanıcı sayısı')
+    parser.add_argument('--shipment-ratio', type=float, default=0.6, help='Kargo kaydı olan sipariş oranı')
+    parser.add_argument('--per-page', default='20,100,1000,5000', help='Virgülle ayrılmış sayfa boyutları')
+    parser.add_argument('--repeat', type=int, default=5, help='Her ölçüm için tekrar sayısı')
+    args = parser.parse_args()
+
+    init_database()
+    started = time.perf_counter()
+    shipment_count = seed(args.orders, args.users, args.shipment_ratio)
+    print(f"Veri: {args.orders} sipariş, {shipment_count} kargo kaydı "
+          f"({time.perf_counter() - started:.1f} sn)")
+
+    # Sonuçlar birebir aynı olmalı
+    sample = min(args.orders, 1000)
+    assert legacy_get_all(per_page=sample) == Order.get_all(per_page=sample), "Sonuçlar farklı"
+
+    print(f"{'sayfa':>8} {'eski (ms)':>12} {'yeni (ms)':>12} {'yeni, decode yok':>18} {'hızlanma':>10}")
+    for per_page in [int(p) for p in args.per_page.split(',') if p.strip()]:
+        repeat = args.repeat if per_page <= 1000 else 1
+        user_id = 1 if args.users > 1 else None
+        legacy_ms = measure(legacy_get_all, repeat, per_page=per_page, user_id=user_id)
+        batched_ms = measure(Order.get_all, repeat, per_page=per_page, user_id=user_id)
+        raw_ms = measure(Order.get_all, repeat, per_page=per_page, user_id=user_id, decode_json=False)
+        speedup = legacy_ms / batched_ms if batched_ms else float('inf')
+        print(f"{per_page:>8} {legacy_ms:>12.2f} {batched_ms:>12.2f} {raw_ms:>18.2f} {speedup:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
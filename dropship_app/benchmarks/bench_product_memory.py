@@ -0,0 +1,100 @@
+"""
+Ürün Toplu İşleme Bellek Benchmark
+Senkronize ürünleri belleğe almanın üç yolunu tracemalloc ile karşılaştırır
+
+    dict       : eski get_synced_products - tüm tablo dict(sqlite3.Row) listesi
+    kayıt      : get_synced_products - tüm tablo ProductRecord (__slots__) listesi
+    akış       : iter_synced_products - parça parça, tek seferde bir parça bellekte
+
+Kullanım (dropship_app dizininden):
+    python benchmarks/bench_product_memory.py
+    python benchmarks/bench_product_memory.py --products 100000 --batch-size 1000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# models, config üzerinden DATABASE_PATH'i import anında okur
+os.environ.setdefault('DATABASE_PATH', os.path.join(tempfile.mkdtemp(prefix='memorybench-'), 'dropship.db'))
+
+from models import Product, ProductRecord, get_db_connection, init_database
+
+
+def seed(product_count: int, users: int):
+    """Senkronize ürünleri toplu olarak ekle"""
+    conn = get_db_connection()
+    conn.execute('DELETE FROM products')
+    conn.executemany('''
+        INSERT INTO products (
+            user_id, trendyol_id, shopify_id, name, trendyol_price, shopify_price,
+            profit_margin, is_synced_to_shopify, stock_status, last_sync
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, 1, 'in_stock', '2025-06-01 10:00:00')
+    ''', (
+        (1 + i % users, 700000000 + i, f'gid://shopify/Product/{8000000000 + i}',
+         f'Kadın Pamuklu Oversize Basic Tişört - Model {i}', 199.9 + i % 300, 12.5 + i % 40, 50)
+        for i in range(product_count)
+    ))
+    conn.commit()
+    conn.close()
+
+
+def legacy_dicts():
+    """Eski get_synced_products: tüm satırlar dict olarak"""
+    columns = ', '.join(ProductRecord.FIELDS)
+    conn = get_db_connection()
+    rows = conn.execute(f'SELECT {columns} FROM products WHERE is_synced_to_shopify = 1').fetchall()
+    conn.close()
+    return [dict(r) for r in rows]
+
+
+def measure(label, func, products):
+    """Tepe bellek (tracemalloc) ve süre"""
+    tracemalloc.start()
+    started = time.perf_counter()
+    count = func()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:>8} {count:>10} {peak / 1024 / 1024:>12.1f} {peak / max(products, 1):>12.0f} {elapsed:>10.2f}")
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ürün toplu işleme bellek benchmark")
+    parser.add_argument('--products', type=int, default=100000, help='Oluşturulacak ürün sayısı')
+    parser.add_argument('--users', type=int, default=10, help='Ürünlerin dağıtılacağı kullanıcı sayısı')
+    parser.add_argument('--batch-size', type=int, default=1000, help='Akış modunda parça boyutu')
+    args = parser.parse_args()
+
+    init_database()
+    seed(args.products, args.users)
+
+    def run_dicts():
+        rows = legacy_dicts()
+        return len(rows)
+
+    def run_records():
+        rows = Product.get_synced_products()
+        return len(rows)
+
+    def run_stream():
+        count = 0
+        for product in Product.iter_synced_products(batch_size=args.batch_size):
+            count += product['trendyol_id'] > 0
+        return count
+
+    print(f"{'yol':>8} {'ürün':>10} {'tepe (MB)':>12} {'bayt/ürün':>12} {'süre (sn)':>10}")
+    dict_peak = measure('dict', run_dicts, args.products)
+    record_peak = measure('kayıt', run_records, args.products)
+    stream_peak = measure('akış', run_stream, args.products)
+    print(f"\nkayıt: {dict_peak / record_peak:.1f}x daha az bellek, "
+          f"akış: {dict_peak / stream_peak:.1f}x daha az bellek")
+
+
+if __name__ == "__main__":
+    main()
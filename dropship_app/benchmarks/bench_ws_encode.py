@@ -0,0 +1,89 @@
+"""
+WebSocket Broadcast Encode Benchmark
+Broadcast başına JSON encode maliyetini bağlantı sayısına göre ölçer
+
+Eski yol: her bağlantı için send_json -> mesaj N kez JSON'a çevrilir.
+Yeni yol: encode_message ile bir kez çevrilir, aynı frame herkese gider.
+
+Kullanım (dropship_app dizininden):
+    python benchmarks/bench_ws_encode.py
+    python benchmarks/bench_ws_encode.py --products 500 --connections 1,10,100,1000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from websocket_manager import EventTypes, encode_message, orjson
+
+
+def build_stock_sync_payload(product_count: int) -> dict:
+    """Büyük bir stok senkronizasyon sonucu mesajı oluştur"""
+    return {
+        "type": EventTypes.STOCK_SYNC_COMPLETED,
+        "data": {
+            "total_checked": product_count,
+            "details": [
+                {
+                    "product_id": i,
+                    "product": f"Ürün {i} - Pamuklu Basic Tişört",
+                    "action": f"Fiyat değişti: {100 + i}₺ → {110 + i}₺",
+                    "in_stock": i % 7 != 0
+                }
+                for i in range(product_count)
+            ]
+        },
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+def legacy_encode(message: dict, connections: int) -> int:
+    """Eski davranış: Starlette send_json her bağlantı için json.dumps çağırır"""
+    size = 0
+    for _ in range(connections):
+        size = len(json.dumps(message, separators=(",", ":"), ensure_ascii=False))
+    return size
+
+
+def shared_encode(message: dict, connections: int) -> int:
+    """Yeni davranış: bir kez encode, frame N bağlantıya paylaşılır"""
+    frame = encode_message(message)
+    frames = [frame] * connections
+    return len(frames[0])
+
+
+def measure(func, message: dict, connections: int, repeat: int) -> float:
+    """Ortalama süre (ms)"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(message, connections)
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="WebSocket broadcast encode benchmark")
+    parser.add_argument("--products", type=int, default=200, help="Mesajdaki ürün detayı sayısı")
+    parser.add_argument("--connections", default="1,10,100,1000", help="Virgülle ayrılmış bağlantı sayıları")
+    parser.add_argument("--repeat", type=int, default=20, help="Her ölçüm için tekrar sayısı")
+    args = parser.parse_args()
+
+    message = build_stock_sync_payload(args.products)
+    counts = [int(c) for c in args.connections.split(",") if c.strip()]
+    frame_size = len(encode_message(message))
+
+    print(f"Encoder: {'orjson' if orjson is not None else 'json (stdlib)'}")
+    print(f"Payload: {args.products} ürün, {frame_size / 1024:.1f} KB")
+    print(f"{'bağlantı':>10} {'eski (ms)':>12} {'yeni (ms)':>12} {'hızlanma':>10}")
+    for connections in counts:
+        legacy_ms = measure(legacy_encode, message, connections, args.repeat)
+        shared_ms = measure(shared_encode, message, connections, args.repeat)
+        speedup = legacy_ms / shared_ms if shared_ms else float("inf")
+        print(f"{connections:>10} {legacy_ms:>12.3f} {shared_ms:>12.3f} {speedup:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
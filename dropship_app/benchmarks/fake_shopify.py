@@ -0,0 +1,500 @@
+"""
+Yerel Shopify Admin API Sunucusu (benchmark / CI için)
+ShopifyAPI'nin kullandığı REST endpoint'lerini bellek içi bir mağaza ile taklit eder:
+
+    shop, products, variants, inventory_levels/set, locations, orders,
+    orders/{id}/fulfillment_orders, fulfillments, webhooks
+    graphql.json: bulkOperationRunQuery + currentBulkOperation (ürünler JSONL)
+
+Shopify'ın leaky-bucket limiti taklit edilir: her REST çağrısı kovaya 1 ekler,
+kova saniyede --leak-rate boşalır. Yanıtlarda X-Shopify-Shop-Api-Call-Limit
+başlığı döner; kova doluysa 429 + Retry-After. Ürün ve sipariş listeleri
+Link başlığıyla (page_info) sayfalanır. Gecikme ayarlanabilir.
+
+Mağaza adresi olarak base URL verilir (ShopifyAPI şemalı shop_name kabul eder):
+
+Kullanım (dropship_app dizininden):
+    python benchmarks/fake_shopify.py --port 8766 --products 2000 --orders 500
+    SHOPIFY_SHOP_NAME=http://127.0.0.1:8766 SHOPIFY_ACCESS_TOKEN=test python shopify_api.py
+
+Kod içinden:
+    server, shop_url = start_fake_shopify(products=100, bucket_size=40, leak_rate=2)
+    api = ShopifyAPI(shop_url, 'test-token')
+    ...
+    server.shutdown()
+"""
+import argparse
+import base64
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+API_PREFIX = re.compile(r'^/admin/api/[^/]+/(.+)$')
+MAX_LIMIT = 250
+LOCATION_ID = 70000000001
+
+
+class LeakyBucket:
+    """Erişim token'ı başına Shopify çağrı limiti (kova boyutu / saniyede boşalma)"""
+
+    def __init__(self, size=40, leak_rate=2.0):
+        self.size = size
+        self.leak_rate = leak_rate
+        self._levels = {}  # token -> (seviye, son güncelleme)
+        self._lock = threading.Lock()
+
+    def take(self, token):
+        """Kovaya bir çağrı ekle. (kabul edildi mi, güncel seviye)"""
+        with self._lock:
+            now = time.monotonic()
+            level, updated = self._levels.get(token, (0.0, now))
+            level = max(0.0, level - (now - updated) * self.leak_rate)
+            if level + 1 > self.size:
+                self._levels[token] = (level, now)
+                return False, level
+            level += 1
+            self._levels[token] = (level, now)
+            return True, level
+
+
+class FakeShop:
+    """Bellek içi mağaza: ürünler, siparişler, webhook'lar"""
+
+    def __init__(self, products=0, orders=0, seed=42):
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.products = {}
+        self.variants = {}  # variant_id -> product_id
+        self.inventory = {}  # inventory_item_id -> miktar
+        self.orders = {}
+        self.fulfillments = {}
+        self.webhooks = {}
+        self.bulk_operations = {}
+        self._ids = {'product': 8000000000, 'variant': 45000000000, 'inventory': 47000000000,
+                     'order': 5500000000, 'line': 14000000000, 'fulfillment': 4900000000,
+                     'webhook': 1200000000, 'bulk': 1}
+        for i in range(products):
+            self.create_product({
+                'title': f'Ürün {i + 1}', 'vendor': 'Trendyol', 'status': 'active',
+                'variants': [{'option1': size, 'price': f'{self.rng.uniform(5, 60):.2f}',
+                              'sku': f'TY-{i + 1}-{size}'} for size in ('S', 'M', 'L')]
+            })
+        product_ids = list(self.products)
+        for i in range(orders):
+            self.create_order(self.rng.sample(product_ids, min(len(product_ids), self.rng.randint(1, 3))), i)
+
+    def _next(self, kind):
+        self._ids[kind] += 1
+        return self._ids[kind]
+
+    def create_product(self, data):
+        with self.lock:
+            product_id = self._next('product')
+            now = datetime.now().isoformat()
+            variants = []
+            for v in data.get('variants') or [{'price': '0.00'}]:
+                variant = {
+                    'id': self._next('variant'), 'product_id': product_id,
+                    'title': v.get('option1') or 'Default Title', 'price': str(v.get('price', '0.00')),
+                    'compare_at_price': v.get('compare_at_price'), 'sku': v.get('sku', ''),
+                    'option1': v.get('option1'), 'inventory_item_id': self._next('inventory'),
+                    'inventory_quantity': int(v.get('inventory_quantity') or 0),
+                    'inventory_management': v.get('inventory_management')
+                }
+                self.variants[variant['id']] = product_id
+                self.inventory[variant['inventory_item_id']] = variant['inventory_quantity']
+                variants.append(variant)
+            product = {
+                'id': product_id, 'title': data.get('title', ''), 'body_html': data.get('body_html', ''),
+                'vendor': data.get('vendor', ''), 'product_type': data.get('product_type', ''),
+                'status': data.get('status', 'active'), 'tags': data.get('tags', ''),
+                'options': data.get('options') or [], 'images': [
+                    {'id': self._next('inventory'), 'src': img.get('src')} for img in data.get('images') or []
+                ],
+                'variants': variants, 'created_at': now, 'updated_at': now
+            }
+            self.products[product_id] = product
+            return product
+
+    def create_order(self, product_ids, index=0):
+        with self.lock:
+            order_id = self._next('order')
+            line_items = []
+            for product_id in product_ids:
+                product = self.products[product_id]
+                variant = product['variants'][0]
+                line_items.append({
+                    'id': self._next('line'), 'product_id': product_id, 'variant_id': variant['id'],
+                    'title': product['title'], 'variant_title': variant['title'], 'sku': variant['sku'],
+                    'quantity': 1, 'price': variant['price']
+                })
+            total = sum(float(item['price']) for item in line_items)
+            created = (datetime(2025, 1, 1) + timedelta(minutes=index * 7)).isoformat()
+            self.orders[order_id] = {
+                'id': order_id, 'name': f'#{1000 + index + 1}', 'order_number': 1000 + index + 1,
+                'email': f'musteri{index}@example.com', 'created_at': created,
+                'financial_status': 'paid', 'fulfillment_status': None, 'closed_at': None,
+                'cancelled_at': None, 'total_price': f'{total + 4.99:.2f}',
+                'subtotal_price': f'{total:.2f}', 'currency': 'USD',
+                'total_shipping_price_set': {'shop_money': {'amount': '4.99', 'currency_code': 'USD'}},
+                'customer': {'first_name': 'Ayşe', 'last_name': 'Yılmaz', 'email': f'musteri{index}@example.com'},
+                'shipping_address': {
+                    'first_name': 'Ayşe', 'last_name': 'Yılmaz', 'name': 'Ayşe Yılmaz',
+                    'address1': 'Atatürk Cad. No: 12', 'city': 'İstanbul', 'province': 'Kadıköy',
+                    'zip': '34710', 'country': 'Turkey', 'phone': '+905551112233'
+                },
+                'line_items': line_items
+            }
+            return self.orders[order_id]
+
+
+def encode_page_info(offset):
+    return base64.urlsafe_b64encode(json.dumps({'offset': offset}).encode()).decode().rstrip('=')
+
+
+def decode_page_info(page_info):
+    padded = page_info + '=' * (-len(page_info) % 4)
+    return int(json.loads(base64.urlsafe_b64decode(padded))['offset'])
+
+
+class FakeShopifyServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, shop, bucket_size=40, leak_rate=2.0, latency_ms=0, jitter_ms=0):
+        super().__init__(address, FakeShopifyHandler)
+        self.shop = shop
+        self.bucket = LeakyBucket(bucket_size, leak_rate)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.rng = random.Random(shop.rng.random())
+        self.stats_lock = threading.Lock()
+        self.stats = {'calls': 0, 'throttled': 0, 'endpoints': {}}
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def record(self, endpoint, throttled=False):
+        with self.stats_lock:
+            self.stats['calls'] += 1
+            self.stats['throttled'] += throttled
+            self.stats['endpoints'][endpoint] = self.stats['endpoints'].get(endpoint, 0) + 1
+
+    def delay(self):
+        if self.latency_ms or self.jitter_ms:
+            with self.stats_lock:
+                jitter = self.rng.uniform(-self.jitter_ms, self.jitter_ms)
+            time.sleep(max(0.0, self.latency_ms + jitter) / 1000)
+
+
+class FakeShopifyHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Başlık ve gövde ayrı yazılır; Nagle + gecikmeli ACK keep-alive'da her yanıta ~40 ms ekler
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body=None, headers=None, content_type='application/json; charset=utf-8'):
+        if isinstance(body, (bytes, str)):
+            payload = body.encode('utf-8') if isinstance(body, str) else body
+        else:
+            payload = json.dumps(body if body is not None else {}, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if not length:
+            return {}
+        try:
+            return json.loads(self.rfile.read(length))
+        except ValueError:
+            return None
+
+    def _page(self, items, query, resource):
+        """Link başlıklı cursor sayfalama"""
+        limit = min(MAX_LIMIT, max(1, int((query.get('limit') or ['50'])[0])))
+        page_info = (query.get('page_info') or [None])[0]
+        offset = decode_page_info(page_info) if page_info else 0
+        page = items[offset:offset + limit]
+        links = []
+        base = f'{self.server.base_url}{urlparse(self.path).path}'
+        if offset + limit < len(items):
+            links.append(f'<{base}?{urlencode({"limit": limit, "page_info": encode_page_info(offset + limit)})}>; rel="next"')
+        if offset > 0:
+            previous = encode_page_info(max(0, offset - limit))
+            links.append(f'<{base}?{urlencode({"limit": limit, "page_info": previous})}>; rel="previous"')
+        return {resource: page}, ({'Link': ', '.join(links)} if links else {})
+
+    def _handle(self, method):
+        server = self.server
+        url = urlparse(self.path)
+
+        if url.path == '/__fake/stats':
+            with server.stats_lock:
+                return self._send(200, json.loads(json.dumps(server.stats)))
+        bulk = re.match(r'^/__fake/bulk/(\d+)\.jsonl$', url.path)
+        if bulk:
+            operation = server.shop.bulk_operations.get(int(bulk.group(1)))
+            if not operation:
+                return self._send(404, {'errors': 'Not Found'})
+            return self._send(200, operation['data'], content_type='application/jsonl')
+
+        match = API_PREFIX.match(url.path)
+        if not match:
+            return self._send(404, {'errors': 'Not Found'})
+        if not self.headers.get('X-Shopify-Access-Token'):
+            return self._send(401, {'errors': '[API] Invalid API key or access token'})
+
+        path = match.group(1)
+        endpoint = re.sub(r'/\d+', '/{id}', path)
+        accepted, level = server.bucket.take(self.headers['X-Shopify-Access-Token'])
+        limit_header = {'X-Shopify-Shop-Api-Call-Limit': f'{int(round(level))}/{server.bucket.size}'}
+        if not accepted:
+            server.record(endpoint, throttled=True)
+            return self._send(429, {'errors': 'Exceeded 2 calls per second for api client. Reduce request rates '
+                                              'to resume uninterrupted service.'},
+                              {**limit_header, 'Retry-After': '1.0'})
+        server.record(endpoint)
+        server.delay()
+
+        query = parse_qs(url.query)
+        body = self._body() if method in ('POST', 'PUT') else {}
+        if body is None:
+            return self._send(400, {'errors': 'Invalid JSON'}, limit_header)
+        status, response, headers = self._route(method, path, query, body)
+        self._send(status, response, {**limit_header, **headers})
+
+    def _route(self, method, path, query, body):
+        shop = self.server.shop
+        not_found = (404, {'errors': 'Not Found'}, {})
+        parts = path[:-5].split('/') if path.endswith('.json') else path.split('/')
+
+        if parts == ['shop'] and method == 'GET':
+            return 200, {'shop': {'id': 1, 'name': 'Fake Shop', 'domain': 'fake.myshopify.com',
+                                  'currency': 'USD', 'plan_name': 'basic'}}, {}
+
+        if parts == ['locations'] and method == 'GET':
+            return 200, {'locations': [{'id': LOCATION_ID, 'name': 'Depo', 'active': True}]}, {}
+
+        if parts[0] == 'products':
+            if len(parts) == 1 and method == 'GET':
+                status_filter = (query.get('status') or [None])[0]
+                with shop.lock:
+                    items = [p for p in shop.products.values() if not status_filter or p['status'] == status_filter]
+                page, headers = self._page(items, query, 'products')
+                return 200, page, headers
+            if len(parts) == 1 and method == 'POST':
+                if not (body.get('product') or {}).get('title'):
+                    return 422, {'errors': {'title': ["can't be blank"]}}, {}
+                return 201, {'product': shop.create_product(body['product'])}, {}
+            if len(parts) == 2 and parts[1].isdigit():
+                product_id = int(parts[1])
+                with shop.lock:
+                    product = shop.products.get(product_id)
+                    if not product:
+                        return not_found
+                    if method == 'GET':
+                        return 200, {'product': product}, {}
+                    if method == 'PUT':
+                        for key, value in (body.get('product') or {}).items():
+                            if key not in ('id', 'variants'):
+                                product[key] = value
+                        product['updated_at'] = datetime.now().isoformat()
+                        return 200, {'product': product}, {}
+                    if method == 'DELETE':
+                        for variant in shop.products.pop(product_id)['variants']:
+                            shop.variants.pop(variant['id'], None)
+                        return 200, {}, {}
+
+        if parts[0] == 'variants' and len(parts) == 2 and parts[1].isdigit() and method == 'PUT':
+            with shop.lock:
+                product_id = shop.variants.get(int(parts[1]))
+                if product_id is None:
+                    return not_found
+                variant = next(v for v in shop.products[product_id]['variants'] if v['id'] == int(parts[1]))
+                for key in ('price', 'compare_at_price', 'sku', 'inventory_management'):
+                    if key in (body.get('variant') or {}):
+                        variant[key] = body['variant'][key]
+                return 200, {'variant': variant}, {}
+
+        if parts == ['inventory_levels', 'set'] and method == 'POST':
+            item_id = body.get('inventory_item_id')
+            with shop.lock:
+                if item_id not in shop.inventory:
+                    return 422, {'errors': ['Inventory item does not exist']}, {}
+                shop.inventory[item_id] = int(body.get('available') or 0)
+            return 200, {'inventory_level': {'inventory_item_id': item_id, 'location_id': body.get('location_id'),
+                                             'available': shop.inventory[item_id]}}, {}
+
+        if parts[0] == 'orders':
+            if len(parts) == 1 and method == 'GET':
+                since_id = int((query.get('since_id') or ['0'])[0])
+                status = (query.get('status') or ['any'])[0]
+                fulfillment = (query.get('fulfillment_status') or [None])[0]
+                with shop.lock:
+                    items = [
+                        o for o in sorted(shop.orders.values(), key=lambda o: o['id'])
+                        if o['id'] > since_id
+                        and (status == 'any' or (status == 'open') == (o['closed_at'] is None))
+                        and (fulfillment != 'unfulfilled' or o['fulfillment_status'] is None)
+                    ]
+                page, headers = self._page(items, query, 'orders')
+                return 200, page, headers
+            if len(parts) >= 2 and parts[1].isdigit():
+                with shop.lock:
+                    order = shop.orders.get(int(parts[1]))
+                if not order:
+                    return not_found
+                if len(parts) == 2 and method == 'GET':
+                    return 200, {'order': order}, {}
+                if parts[2:] == ['fulfillment_orders'] and method == 'GET':
+                    return 200, {'fulfillment_orders': [{
+                        'id': order['id'] + 1000000000, 'order_id': order['id'],
+                        'status': 'closed' if order['fulfillment_status'] else 'open',
+                        'line_items': [{'id': item['id'] + 1000000000, 'line_item_id': item['id'],
+                                        'quantity': item['quantity']} for item in order['line_items']]
+                    }]}, {}
+
+        if parts == ['fulfillments'] and method == 'POST':
+            groups = (body.get('fulfillment') or {}).get('line_items_by_fulfillment_order') or []
+            if not groups:
+                return 422, {'errors': ['line_items_by_fulfillment_order is required']}, {}
+            order_id = groups[0]['fulfillment_order_id'] - 1000000000
+            with shop.lock:
+                order = shop.orders.get(order_id)
+                if not order:
+                    return not_found
+                order['fulfillment_status'] = 'fulfilled'
+                fulfillment = {
+                    'id': shop._next('fulfillment'), 'order_id': order_id, 'status': 'success',
+                    'tracking_number': (body['fulfillment'].get('tracking_info') or {}).get('number'),
+                    'tracking_company': (body['fulfillment'].get('tracking_info') or {}).get('company')
+                }
+                shop.fulfillments[fulfillment['id']] = fulfillment
+            return 201, {'fulfillment': fulfillment}, {}
+
+        if parts[0] == 'webhooks':
+            if len(parts) == 1 and method == 'GET':
+                with shop.lock:
+                    return 200, {'webhooks': list(shop.webhooks.values())}, {}
+            if len(parts) == 1 and method == 'POST':
+                data = body.get('webhook') or {}
+                with shop.lock:
+                    webhook = {'id': shop._next('webhook'), 'topic': data.get('topic'),
+                               'address': data.get('address'), 'format': data.get('format', 'json')}
+                    shop.webhooks[webhook['id']] = webhook
+                return 201, {'webhook': webhook}, {}
+            if len(parts) == 2 and parts[1].isdigit() and method == 'DELETE':
+                with shop.lock:
+                    if shop.webhooks.pop(int(parts[1]), None) is None:
+                        return not_found
+                return 200, {}, {}
+
+        if parts == ['graphql'] and method == 'POST':
+            return self._graphql(body.get('query') or '')
+
+        return not_found
+
+    def _graphql(self, query):
+        """Sadece bulk ürün dışa aktarımı: bulkOperationRunQuery + currentBulkOperation"""
+        shop = self.server.shop
+        cost = {'requestedQueryCost': 10, 'actualQueryCost': 10,
+                'throttleStatus': {'maximumAvailable': 1000.0, 'currentlyAvailable': 990, 'restoreRate': 50.0}}
+        if 'bulkOperationRunQuery' in query:
+            with shop.lock:
+                operation_id = shop._next('bulk')
+                lines = []
+                for product in shop.products.values():
+                    lines.append(json.dumps({'id': f"gid://shopify/Product/{product['id']}",
+                                             'title': product['title'], 'status': product['status'].upper()},
+                                            ensure_ascii=False))
+                    for variant in product['variants']:
+                        lines.append(json.dumps({'id': f"gid://shopify/ProductVariant/{variant['id']}",
+                                                 'price': variant['price'], 'sku': variant['sku'],
+                                                 '__parentId': f"gid://shopify/Product/{product['id']}"},
+                                                ensure_ascii=False))
+                shop.bulk_operations[operation_id] = {'data': '\n'.join(lines) + '\n', 'objects': len(lines)}
+            operation = {'id': f'gid://shopify/BulkOperation/{operation_id}', 'status': 'CREATED'}
+            return 200, {'data': {'bulkOperationRunQuery': {'bulkOperation': operation, 'userErrors': []}},
+                         'extensions': {'cost': cost}}, {}
+        if 'currentBulkOperation' in query:
+            with shop.lock:
+                if not shop.bulk_operations:
+                    return 200, {'data': {'currentBulkOperation': None}, 'extensions': {'cost': cost}}, {}
+                operation_id = max(shop.bulk_operations)
+                operation = shop.bulk_operations[operation_id]
+            return 200, {'data': {'currentBulkOperation': {
+                'id': f'gid://shopify/BulkOperation/{operation_id}', 'status': 'COMPLETED',
+                'objectCount': str(operation['objects']),
+                'url': f'{self.server.base_url}/__fake/bulk/{operation_id}.jsonl'
+            }}, 'extensions': {'cost': cost}}, {}
+        return 200, {'errors': [{'message': 'Sahte sunucu sadece bulk işlemlerini destekler'}]}, {}
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def do_PUT(self):
+        self._handle('PUT')
+
+    def do_DELETE(self):
+        self._handle('DELETE')
+
+
+def start_fake_shopify(host='127.0.0.1', port=0, products=0, orders=0, seed=42,
+                       bucket_size=40, leak_rate=2.0, latency_ms=0, jitter_ms=0):
+    """
+    Sunucuyu arka plan thread'inde başlat. port=0 boş bir port seçer.
+
+    Returns:
+        (FakeShopifyServer, shop_url) - shop_url ShopifyAPI'ye shop_name olarak verilir
+    """
+    shop = FakeShop(products=products, orders=orders, seed=seed)
+    server = FakeShopifyServer((host, port), shop, bucket_size=bucket_size, leak_rate=leak_rate,
+                               latency_ms=latency_ms, jitter_ms=jitter_ms)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, server.base_url
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Yerel Shopify Admin API sunucusu")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--products', type=int, default=0, help='Başlangıçtaki ürün sayısı')
+    parser.add_argument('--orders', type=int, default=0, help='Başlangıçtaki sipariş sayısı')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--bucket-size', type=int, default=40, help='Çağrı kovası boyutu (Plus: 80)')
+    parser.add_argument('--leak-rate', type=float, default=2.0, help='Saniyede boşalan çağrı (Plus: 4)')
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--jitter-ms', type=float, default=0)
+    args = parser.parse_args()
+
+    shop = FakeShop(products=args.products, orders=args.orders, seed=args.seed)
+    server = FakeShopifyServer((args.host, args.port), shop, bucket_size=args.bucket_size,
+                               leak_rate=args.leak_rate, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms)
+    print(f"Sahte Shopify Admin API: {server.base_url} "
+          f"({len(shop.products)} ürün, {len(shop.orders)} sipariş, kova {args.bucket_size}/{args.leak_rate} sn)")
+    print(f"    SHOPIFY_SHOP_NAME={server.base_url} SHOPIFY_ACCESS_TOKEN=test ile kullanın")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
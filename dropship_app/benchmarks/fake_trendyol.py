@@ -0,0 +1,318 @@
+"""
+Yerel Trendyol API Sunucusu (benchmark / CI için)
+trendyol_scraper'ın kullandığı iki apigw.trendyol.com endpoint'ini taklit eder:
+
+    GET /discovery-web-searchgw-service/v2/api/infinite-scroll/sr?sellerId=&pi=
+    GET /discovery-web-productgw-service/api/productDetail/{id}
+
+Katalog seed'den türetilir (aynı seed = aynı ürünler). Ürün id'si
+satıcı_id * 1.000.000 + sıra şeklindedir. Stok/fiyat "dönem" (epoch) bazında
+değişir: ürünlerin --churn oranı her dönemde, kalanlar her 50 dönemde bir
+yeniden belirlenir. Dönem --churn-interval saniyede bir veya
+POST /__fake/advance ile ilerler.
+
+Gecikme, 5xx hata oranı, 429 oranı ve saniye başına istek limiti ayarlanabilir.
+GET /__fake/stats istek sayaçlarını döndürür.
+
+Kullanım (dropship_app dizininden):
+    python benchmarks/fake_trendyol.py --port 8765 --products 5000 --latency-ms 80
+    TRENDYOL_API_URL=http://127.0.0.1:8765 USD_TRY_RATE=35 python stock_sync.py
+
+Kod içinden:
+    server, base_url = start_fake_trendyol(products=1000, error_rate=0.05)
+    scraper = TrendyolScraper(base_api_url=base_url)
+    ...
+    server.shutdown()
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+PAGE_SIZE = 24
+ID_BLOCK = 1000000
+# Sabit ürünlerin stok/fiyatı bu kadar dönemde bir değişir
+STABLE_PERIOD = 50
+
+SEARCH_PATH = '/discovery-web-searchgw-service/v2/api/infinite-scroll/sr'
+DETAIL_PATTERN = re.compile(r'^/discovery-web-productgw-service/api/productDetail/(\d+)$')
+
+BRANDS = ['Koton', 'LC Waikiki', 'Mavi', 'DeFacto', 'Trendyol Collection', 'Penti']
+CATEGORIES = ['Tişört', 'Elbise', 'Pantolon', 'Gömlek', 'Ayakkabı', 'Çanta']
+SIZES = ['XS', 'S', 'M', 'L', 'XL']
+
+
+class FakeCatalog:
+    """Seed'den türetilen deterministik katalog ve stok/fiyat değişimi"""
+
+    def __init__(self, products=1000, sellers=1, seed=42, churn=0.1, out_of_stock_rate=0.1,
+                 churn_interval=0):
+        self.products = products
+        self.sellers = sellers
+        self.seed = seed
+        self.churn = churn
+        self.out_of_stock_rate = out_of_stock_rate
+        self.churn_interval = churn_interval
+        self._started = time.monotonic()
+        self._manual_epoch = 0
+
+    @property
+    def epoch(self):
+        auto = int((time.monotonic() - self._started) / self.churn_interval) if self.churn_interval else 0
+        return auto + self._manual_epoch
+
+    def advance(self, epochs=1):
+        self._manual_epoch += epochs
+        return self.epoch
+
+    def seller_ids(self):
+        return [100 + i for i in range(self.sellers)]
+
+    def exists(self, product_id):
+        seller_id, index = divmod(product_id, ID_BLOCK)
+        return seller_id in range(100, 100 + self.sellers) and 1 <= index <= self.products
+
+    def _base(self, product_id):
+        rng = random.Random(f'{self.seed}:{product_id}')
+        return {
+            'price': round(rng.uniform(99, 1999), 2),
+            'brand': rng.choice(BRANDS),
+            'category': rng.choice(CATEGORIES),
+            'volatile': rng.random() < self.churn,
+            'rating': round(rng.uniform(3, 5), 1),
+            'rating_count': rng.randint(0, 5000)
+        }
+
+    def state(self, product_id, epoch=None):
+        """Ürünün verilen dönemdeki stok ve fiyatı"""
+        base = self._base(product_id)
+        epoch = self.epoch if epoch is None else epoch
+        version = epoch if base['volatile'] else epoch // STABLE_PERIOD
+        if version == 0:
+            return base, True, base['price']
+        rng = random.Random(f'{self.seed}:{product_id}:{version}')
+        in_stock = rng.random() >= self.out_of_stock_rate
+        price = round(base['price'] * rng.uniform(0.9, 1.1), 2)
+        return base, in_stock, price
+
+    def search_item(self, product_id):
+        base, _, price = self.state(product_id)
+        name = f"{base['brand']} {base['category']} Model {product_id % ID_BLOCK}"
+        slug = re.sub(r'[^a-z0-9]+', '-', name.lower()).strip('-')
+        return {
+            'id': product_id,
+            'name': name,
+            'url': f"/{slug}-p-{product_id}",
+            'categoryName': base['category'],
+            'brand': {'name': base['brand']},
+            'price': {'sellingPrice': price, 'originalPrice': round(price * 1.2, 2)},
+            'ratingScore': {'averageRating': base['rating'], 'totalCount': base['rating_count']},
+            'images': [f'/ty/prod/{product_id}_{n}.jpg' for n in range(1, 4)],
+            'variants': []
+        }
+
+    def search_page(self, seller_id, page):
+        first = (page - 1) * PAGE_SIZE + 1
+        last = min(self.products, page * PAGE_SIZE)
+        return {
+            'isSuccess': True,
+            'result': {
+                'totalCount': self.products,
+                'products': [self.search_item(seller_id * ID_BLOCK + i) for i in range(first, last + 1)]
+            }
+        }
+
+    def detail(self, product_id):
+        base, in_stock, price = self.state(product_id)
+        variant_rng = random.Random(f'{self.seed}:{product_id}:{self.epoch}:variants')
+        variants = [
+            {'attributeValue': size, 'inStock': in_stock and variant_rng.random() > 0.2, 'price': price}
+            for size in SIZES
+        ]
+        return {
+            'isSuccess': True,
+            'result': {
+                'id': product_id,
+                'hasStock': in_stock,
+                'price': {'sellingPrice': price, 'originalPrice': round(price * 1.2, 2)},
+                'allVariants': variants,
+                'images': [f'/ty/prod/{product_id}_{n}.jpg' for n in range(1, 4)],
+                'description': f"{base['brand']} {base['category']}",
+                'attributes': [{'key': 'Materyal', 'value': 'Pamuk'}]
+            }
+        }
+
+
+class FakeTrendyolServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, catalog, latency_ms=0, jitter_ms=0, error_rate=0.0,
+                 throttle_rate=0.0, rps_limit=0):
+        super().__init__(address, FakeTrendyolHandler)
+        self.catalog = catalog
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.rps_limit = rps_limit
+        self.rng = random.Random(catalog.seed)
+        self.lock = threading.Lock()
+        self.stats = {'search': 0, 'detail': 0, 'not_found': 0, 'errors': 0, 'throttled': 0}
+        self._window = (0, 0)  # (saniye, istek sayısı)
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def count(self, key):
+        with self.lock:
+            self.stats[key] += 1
+
+    def fault(self):
+        """Bu istek için 429/503 döndürülecekse kodu, yoksa None"""
+        with self.lock:
+            if self.rps_limit:
+                second = int(time.monotonic())
+                window, count = self._window
+                count = count + 1 if window == second else 1
+                self._window = (second, count)
+                if count > self.rps_limit:
+                    self.stats['throttled'] += 1
+                    return 429
+            roll = self.rng.random()
+            if roll < self.throttle_rate:
+                self.stats['throttled'] += 1
+                return 429
+            if roll < self.throttle_rate + self.error_rate:
+                self.stats['errors'] += 1
+                return 503
+        return None
+
+    def delay(self):
+        if self.latency_ms or self.jitter_ms:
+            with self.lock:
+                jitter = self.rng.uniform(-self.jitter_ms, self.jitter_ms)
+            time.sleep(max(0.0, self.latency_ms + jitter) / 1000)
+
+
+class FakeTrendyolHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Başlık ve gövde ayrı yazılır; Nagle + gecikmeli ACK keep-alive'da her yanıta ~40 ms ekler
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, headers=None):
+        payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        server = self.server
+        url = urlparse(self.path)
+
+        if url.path == '/__fake/stats':
+            with server.lock:
+                stats = dict(server.stats)
+            return self._send(200, {**stats, 'epoch': server.catalog.epoch})
+
+        detail = DETAIL_PATTERN.match(url.path)
+        if url.path != SEARCH_PATH and not detail:
+            return self._send(404, {'isSuccess': False, 'error': 'not found'})
+
+        server.delay()
+        status = server.fault()
+        if status == 429:
+            return self._send(429, {'isSuccess': False, 'error': 'Too Many Requests'}, {'Retry-After': '1'})
+        if status:
+            return self._send(status, {'isSuccess': False, 'error': 'Service Unavailable'})
+
+        catalog = server.catalog
+        if detail:
+            server.count('detail')
+            product_id = int(detail.group(1))
+            if not catalog.exists(product_id):
+                server.count('not_found')
+                return self._send(404, {'isSuccess': False, 'result': None})
+            return self._send(200, catalog.detail(product_id))
+
+        server.count('search')
+        query = parse_qs(url.query)
+        try:
+            seller_id = int((query.get('sellerId') or query.get('mid') or ['0'])[0])
+            page = max(1, int((query.get('pi') or ['1'])[0]))
+        except ValueError:
+            return self._send(400, {'isSuccess': False, 'error': 'invalid query'})
+        if seller_id not in catalog.seller_ids():
+            return self._send(200, {'isSuccess': True, 'result': {'totalCount': 0, 'products': []}})
+        return self._send(200, catalog.search_page(seller_id, page))
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != '/__fake/advance':
+            return self._send(404, {'isSuccess': False, 'error': 'not found'})
+        epochs = int((parse_qs(url.query).get('epochs') or ['1'])[0])
+        self._send(200, {'epoch': self.server.catalog.advance(epochs)})
+
+
+def start_fake_trendyol(host='127.0.0.1', port=0, products=1000, sellers=1, seed=42, churn=0.1,
+                        out_of_stock_rate=0.1, churn_interval=0, latency_ms=0, jitter_ms=0,
+                        error_rate=0.0, throttle_rate=0.0, rps_limit=0):
+    """
+    Sunucuyu arka plan thread'inde başlat. port=0 boş bir port seçer.
+
+    Returns:
+        (FakeTrendyolServer, base_url) - durdurmak için server.shutdown()
+    """
+    catalog = FakeCatalog(products=products, sellers=sellers, seed=seed, churn=churn,
+                          out_of_stock_rate=out_of_stock_rate, churn_interval=churn_interval)
+    server = FakeTrendyolServer((host, port), catalog, latency_ms=latency_ms, jitter_ms=jitter_ms,
+                                error_rate=error_rate, throttle_rate=throttle_rate, rps_limit=rps_limit)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, server.base_url
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Yerel Trendyol API sunucusu")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--products', type=int, default=1000, help='Satıcı başına ürün sayısı')
+    parser.add_argument('--sellers', type=int, default=1, help='Satıcı sayısı (id 100, 101, ...)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--churn', type=float, default=0.1, help='Her dönemde stok/fiyatı değişen ürün oranı')
+    parser.add_argument('--out-of-stock-rate', type=float, default=0.1)
+    parser.add_argument('--churn-interval', type=float, default=0, help='Dönem süresi (sn, 0 = sadece elle)')
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--jitter-ms', type=float, default=0)
+    parser.add_argument('--error-rate', type=float, default=0.0, help='503 dönen istek oranı')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='429 dönen istek oranı')
+    parser.add_argument('--rps-limit', type=int, default=0, help='Saniye başına istek limiti (0 = sınırsız)')
+    args = parser.parse_args()
+
+    catalog = FakeCatalog(products=args.products, sellers=args.sellers, seed=args.seed, churn=args.churn,
+                          out_of_stock_rate=args.out_of_stock_rate, churn_interval=args.churn_interval)
+    server = FakeTrendyolServer((args.host, args.port), catalog, latency_ms=args.latency_ms,
+                                jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+                                throttle_rate=args.throttle_rate, rps_limit=args.rps_limit)
+    print(f"Sahte Trendyol API: {server.base_url} "
+          f"({args.sellers} satıcı x {args.products} ürün, satıcı id'leri {catalog.seller_ids()})")
+    print(f"    TRENDYOL_API_URL={server.base_url} USD_TRY_RATE=35 ile kullanın")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
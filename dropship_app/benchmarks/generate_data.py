@@ -0,0 +1,488 @@
+"""
+Sentetik Çok Kiracılı Veri Üretici (yük ve ölçek testleri için)
+
+Üretim verisine benzeyen bir veritabanını saniyeler içinde doldurur:
+kullanıcılar, satıcılar, Shopify mağazaları, ayarlar, images/variants JSON'lu
+ürünler, yıllara yayılmış siparişler (order_items JSON), kargo kayıtları,
+aktivite logları ve webhook logları.
+
+- Aynı --seed ve --end-date her çalıştırmada birebir aynı veriyi üretir.
+- Kiracı boyutları çarpık dağılır (Zipf): birkaç büyük kiracı verinin çoğunu taşır.
+- Ürün trendyol_id'leri fake_trendyol kataloğuyla aynı şemadadır
+  (satıcı_id * 1.000.000 + sıra); üretilen veri sahte sunucuya karşı senkronize edilebilir.
+- Satırlar tek transaction içinde, --batch-size'lık executemany parçalarıyla yazılır.
+- Hedef tabloda olmayan kolonlar (ör. henüz uygulanmamış migration'lar) atlanır.
+
+SQLite hedefi init_database + migration'larla oluşturulur. PostgreSQL hedefi
+database_postgres.engine'i (DATABASE_URL) kullanır; tabloların orada önceden
+oluşturulmuş olması gerekir.
+
+Kullanım (dropship_app dizininden):
+    python benchmarks/generate_data.py --database /tmp/load/dropship.db
+    python benchmarks/generate_data.py --database /tmp/load/dropship.db --users 50 --products 250000 --years 5
+    DATABASE_URL=postgresql://... python benchmarks/generate_data.py --postgres --reset
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from itertools import islice
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_trendyol import ID_BLOCK
+
+# Yazma sırası = yabancı anahtar sırası
+TABLES = ['users', 'sellers', 'shopify_stores', 'settings', 'products',
+          'orders', 'shipments', 'activity_logs', 'webhook_logs']
+FIRST_SELLER_ID = 100
+SHOPIFY_ID_BASE = 7000000000000
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+BRANDS = ['Koton', 'LC Waikiki', 'Mavi', 'DeFacto', 'Trendyolmilla', 'Colin\'s', 'Pierre Cardin', 'Kiğılı']
+CATEGORIES = ['Elbise', 'Tişört', 'Gömlek', 'Pantolon', 'Ceket', 'Sneaker', 'Çanta', 'Kazak']
+SIZES = ['XS', 'S', 'M', 'L', 'XL']
+COLORS = ['Siyah', 'Beyaz', 'Lacivert', 'Bej', 'Kırmızı', 'Yeşil']
+FIRST_NAMES = ['Ayşe', 'Mehmet', 'Zeynep', 'Can', 'Elif', 'Burak', 'Deniz', 'Ece', 'Emre', 'Selin']
+LAST_NAMES = ['Yılmaz', 'Kaya', 'Demir', 'Şahin', 'Çelik', 'Aydın', 'Öztürk', 'Arslan']
+CITIES = [('İstanbul', 'Kadıköy', '34710'), ('Ankara', 'Çankaya', '06690'), ('İzmir', 'Karşıyaka', '35530'),
+          ('Bursa', 'Nilüfer', '16110'), ('Antalya', 'Muratpaşa', '07100')]
+CARRIERS = ['yurtici', 'aras', 'mng', 'ptt', 'ups', 'trendyol_express']
+ACTIONS = ['seller_sync', 'shopify_sync', 'order_sync', 'bulk_sync', 'bulk_price_update',
+           'stock_sync', 'shipment_created', 'settings_updated', 'login']
+# (eşik gün, durum ağırlıkları): sipariş yaşlandıkça teslim/iptal olur
+ORDER_STATUS_BY_AGE = [
+    (3, {'pending': 5, 'processing': 3, 'purchased': 2}),
+    (10, {'processing': 1, 'purchased': 2, 'shipped': 5, 'cancelled': 1}),
+    (None, {'delivered': 17, 'cancelled': 2, 'shipped': 1})
+]
+SHIPMENT_STATUS = {'purchased': 'pending', 'shipped': 'in_transit', 'delivered': 'delivered'}
+# (tier, oran, değişim skoru aralığı) - STOCK_SYNC_CONFIG eşikleriyle uyumlu
+TIERS = [('hot', 0.05, (0.3, 0.9)), ('warm', 0.2, (0.05, 0.3)), ('cold', 0.75, (0.0, 0.05))]
+
+
+# ==================== YARDIMCILAR ====================
+
+def ts(value):
+    return value.strftime(TIMESTAMP_FORMAT)
+
+def split_skewed(total, parts, rng):
+    """total'ı parts kiracıya Zipf benzeri dağıt (her kiracı en az 1)"""
+    if parts <= 0:
+        return []
+    weights = [1 / (i + 1) for i in range(parts)]
+    rng.shuffle(weights)
+    scale = max(total - parts, 0) / sum(weights)
+    counts = [1 + int(w * scale) for w in weights]
+    counts[0] += max(total - sum(counts), 0)
+    return counts
+
+def weighted(rng, weights):
+    return rng.choices(list(weights), weights=list(weights.values()))[0]
+
+def batched(rows, size):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+# ==================== ÜRETİCİ ====================
+
+class DataGenerator:
+    """Tabloları sırayla üreten deterministik kaynak (her tablo dict satırları yield eder)"""
+
+    def __init__(self, args):
+        self.args = args
+        self.end = datetime.strptime(args.end_date, '%Y-%m-%d')
+        self.start = self.end - timedelta(days=365 * args.years)
+        self.span = (self.end - self.start).total_seconds()
+        self.user_ids = list(range(1, args.users + 1))
+        rng = random.Random(f'{args.seed}:tenants')
+        self.products_per_user = dict(zip(self.user_ids, split_skewed(args.products, args.users, rng)))
+        self.orders_per_user = dict(zip(self.user_ids, split_skewed(args.orders, args.users, rng)))
+        # Kullanıcı -> [(seller_db_id, trendyol_seller_id)], sipariş için Shopify'daki ürünler
+        self.sellers = {}
+        self.listed = {}
+        self.shop_domains = {}
+        self.order_meta = []
+
+    def rng(self, table):
+        return random.Random(f'{self.args.seed}:{table}')
+
+    def random_time(self, rng):
+        """[start, end) aralığında zaman; yakın tarihe doğru yoğunlaşır"""
+        offset = self.span * rng.random() ** 0.6
+        return self.start + timedelta(seconds=int(offset))
+
+    def users(self):
+        for user_id in self.user_ids:
+            yield {
+                'id': user_id,
+                'email': f'tenant{user_id}@example.com',
+                'password_hash': 'x' * 64,
+                'name': f'Kiracı {user_id}',
+                'is_active': True,
+                'created_at': ts(self.start),
+                'last_login': ts(self.end)
+            }
+
+    def sellers_rows(self):
+        seller_id = 0
+        for user_id in self.user_ids:
+            self.sellers[user_id] = []
+            for n in range(self.args.sellers_per_user):
+                seller_id += 1
+                trendyol_seller_id = FIRST_SELLER_ID + n
+                self.sellers[user_id].append((seller_id, trendyol_seller_id))
+                yield {
+                    'id': seller_id,
+                    'user_id': user_id,
+                    'trendyol_seller_id': trendyol_seller_id,
+                    'name': f'Satıcı {trendyol_seller_id}',
+                    'url': f'https://www.trendyol.com/magaza/satici-m-{trendyol_seller_id}',
+                    'is_active': True,
+                    'last_sync': ts(self.end),
+                    'created_at': ts(self.start)
+                }
+
+    def shopify_stores(self):
+        for user_id in self.user_ids:
+            domain = f'tenant{user_id}.myshopify.com'
+            self.shop_domains[user_id] = domain
+            yield {
+                'id': user_id,
+                'user_id': user_id,
+                'shop_name': domain,
+                'access_token': f'shpat_{user_id:032d}',
+                'store_name': f'Mağaza {user_id}',
+                'is_active': True,
+                'is_default': True,
+                'created_at': ts(self.start)
+            }
+
+    def settings(self):
+        rng = self.rng('settings')
+        row_id = 0
+        for user_id in self.user_ids:
+            values = {
+                'profit_margin': rng.choice([20, 25, 30, 40]),
+                'auto_sync': rng.random() < 0.7,
+                'sync_interval': rng.choice([30, 60, 120])
+            }
+            for key, value in values.items():
+                row_id += 1
+                yield {'id': row_id, 'user_id': user_id, 'key': key,
+                       'value': json.dumps(value), 'updated_at': ts(self.end)}
+
+    def products(self):
+        rng = self.rng('products')
+        product_id = 0
+        for user_id in self.user_ids:
+            sellers = self.sellers[user_id]
+            listed = self.listed[user_id] = []
+            for n in range(self.products_per_user[user_id]):
+                product_id += 1
+                seller_db_id, trendyol_seller_id = sellers[n % len(sellers)]
+                trendyol_id = trendyol_seller_id * ID_BLOCK + n // len(sellers) + 1
+                brand, category = rng.choice(BRANDS), rng.choice(CATEGORIES)
+                name = f'{brand} {category} Model {trendyol_id % ID_BLOCK}'
+                price = round(rng.uniform(79, 2499), 2)
+                margin = rng.choice([20, 25, 30, 40])
+                shopify_price = round(price / self.args.currency_rate * (1 + margin / 100), 2)
+                synced = rng.random() < self.args.synced_ratio
+                shopify_id = str(SHOPIFY_ID_BASE + product_id) if synced else None
+                in_stock = rng.random() < 0.9
+                tier, _, (low, high) = rng.choices(TIERS, weights=[t[1] for t in TIERS])[0]
+                created = self.random_time(rng)
+                colors = rng.sample(COLORS, rng.randint(1, 3))
+                variants = [
+                    {'attributeValue': f'{color} / {size}', 'inStock': in_stock and rng.random() > 0.2, 'price': price}
+                    for color in colors for size in SIZES
+                ]
+                images = [f'https://cdn.dsmcdn.com/ty/prod/{trendyol_id}_{k}.jpg' for k in range(1, rng.randint(3, 8))]
+                if synced:
+                    listed.append((shopify_id, name, shopify_price, variants[0]['attributeValue']))
+                yield {
+                    'id': product_id,
+                    'user_id': user_id,
+                    'trendyol_id': trendyol_id,
+                    'shopify_id': shopify_id,
+                    'seller_id': seller_db_id,
+                    'name': name,
+                    'brand_name': brand,
+                    'category_name': category,
+                    'trendyol_url': f'https://www.trendyol.com/{brand.lower().replace(" ", "-")}/urun-p-{trendyol_id}',
+                    'trendyol_price': price,
+                    'trendyol_original_price': round(price * 1.2, 2),
+                    'shopify_price': shopify_price,
+                    'profit_margin': margin,
+                    'is_synced_to_shopify': synced,
+                    'is_active': True,
+                    'stock_status': 'in_stock' if in_stock else 'out_of_stock',
+                    'images': json.dumps(images),
+                    'variants': json.dumps(variants, ensure_ascii=False),
+                    'rating_score': round(rng.uniform(3, 5), 1),
+                    'rating_count': rng.randint(0, 5000),
+                    'last_sync': ts(self.end - timedelta(minutes=rng.randint(1, 1440))),
+                    'created_at': ts(created),
+                    'updated_at': ts(created),
+                    'check_tier': tier,
+                    'change_score': round(rng.uniform(low, high), 4)
+                }
+
+    def orders(self):
+        rng = self.rng('orders')
+        order_id = 0
+        for user_id in self.user_ids:
+            listed = self.listed[user_id]
+            if not listed:
+                continue
+            for n in range(self.orders_per_user[user_id]):
+                order_id += 1
+                created = self.random_time(rng)
+                age_days = (self.end - created).days
+                status = weighted(rng, next(w for limit, w in ORDER_STATUS_BY_AGE if limit is None or age_days < limit))
+                first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+                city, province, zip_code = rng.choice(CITIES)
+                items = []
+                for shopify_id, title, price, variant_title in rng.sample(listed, min(len(listed), rng.choice([1, 1, 1, 2, 3]))):
+                    items.append({'product_id': shopify_id, 'title': title, 'variant_title': variant_title,
+                                  'sku': f'TY-{shopify_id}', 'quantity': rng.choice([1, 1, 1, 2]), 'price': price})
+                subtotal = round(sum(i['price'] * i['quantity'] for i in items), 2)
+                shipping = rng.choice([0.0, 4.99, 9.99])
+                placed = status in ('purchased', 'shipped', 'delivered')
+                self.order_meta.append((order_id, user_id, status, created))
+                yield {
+                    'id': order_id,
+                    'user_id': user_id,
+                    'shopify_order_id': str(5000000000000 + order_id),
+                    'shopify_order_number': f'#{1000 + n}',
+                    'customer_name': f'{first} {last}',
+                    'customer_email': f'musteri{order_id}@example.com',
+                    'customer_phone': f'+90555{order_id % 10000000:07d}',
+                    'shipping_address': json.dumps({
+                        'name': f'{first} {last}', 'address1': f'Atatürk Cad. No: {1 + n % 200}',
+                        'city': city, 'province': province, 'zip': zip_code, 'country': 'Turkey'
+                    }, ensure_ascii=False),
+                    'order_items': json.dumps(items, ensure_ascii=False),
+                    'total_price': round(subtotal + shipping, 2),
+                    'subtotal_price': subtotal,
+                    'shipping_price': shipping,
+                    'trendyol_order_placed': placed,
+                    'trendyol_order_id': f'TY{order_id:010d}' if placed else None,
+                    'status': status,
+                    'created_at': ts(created),
+                    'updated_at': ts(created)
+                }
+
+    def shipments(self):
+        rng = self.rng('shipments')
+        shipment_id = 0
+        for order_id, user_id, status, created in self.order_meta:
+            if status not in SHIPMENT_STATUS:
+                continue
+            carrier = rng.choice(CARRIERS)
+            # Bazı siparişlerde yeniden gönderim (birden fazla kargo kaydı)
+            for n in range(rng.choice([1, 1, 1, 1, 2])):
+                shipment_id += 1
+                shipped = created + timedelta(days=1 + n, hours=rng.randint(0, 23))
+                yield {
+                    'id': shipment_id,
+                    'user_id': user_id,
+                    'order_id': order_id,
+                    'tracking_number': f'{carrier[:3].upper()}{order_id:09d}{n}',
+                    'carrier': carrier,
+                    'status': SHIPMENT_STATUS[status],
+                    'delivery_date': ts(shipped + timedelta(days=2)) if status == 'delivered' else None,
+                    'created_at': ts(shipped),
+                    'updated_at': ts(shipped)
+                }
+
+    def activity_logs(self):
+        rng = self.rng('activity_logs')
+        for log_id in range(1, self.args.activity_logs + 1):
+            action = rng.choice(ACTIONS)
+            yield {
+                'id': log_id,
+                'user_id': rng.choice(self.user_ids),
+                'action': action,
+                'details': f'{rng.randint(1, 500)} kayıt işlendi ({action})',
+                'status': 'error' if rng.random() < 0.03 else 'success',
+                'created_at': ts(self.random_time(rng))
+            }
+
+    def webhook_logs(self):
+        rng = self.rng('webhook_logs')
+        log_id = 0
+        for order_id, user_id, status, created in self.order_meta:
+            topics = ['orders/create'] + (['orders/updated'] if status != 'pending' else [])
+            for topic in topics:
+                log_id += 1
+                yield {
+                    'id': log_id,
+                    'topic': topic,
+                    'shop_domain': self.shop_domains[user_id],
+                    'payload': json.dumps({'id': 5000000000000 + order_id, 'financial_status': 'paid',
+                                           'fulfillment_status': None if status == 'pending' else 'fulfilled'}),
+                    'status': 'failed' if rng.random() < 0.01 else 'processed',
+                    'response': json.dumps({'success': True}),
+                    'created_at': ts(created + timedelta(seconds=rng.randint(1, 30)))
+                }
+
+    def rows(self, table):
+        return getattr(self, 'sellers_rows' if table == 'sellers' else table)()
+
+
+# ==================== HEDEFLER ====================
+
+class SqliteTarget:
+    """init_database şemasına toplu yazım (yükleme süresince senkron yazma kapalı)"""
+
+    def __init__(self, path, reset):
+        import models
+        if reset and os.path.exists(path):
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+        models.DATABASE_PATH = path
+        models.init_database()
+        self.conn = models.get_db_connection()
+        self.conn.execute('PRAGMA journal_mode = WAL')
+        self.conn.execute('PRAGMA synchronous = OFF')
+        self.conn.execute('PRAGMA temp_store = MEMORY')
+        self.conn.execute('PRAGMA cache_size = -262144')
+        self.description = f'sqlite:{path}'
+
+    def columns(self, table):
+        return [row[1] for row in self.conn.execute(f'PRAGMA table_info({table})')]
+
+    def is_empty(self):
+        return self.conn.execute('SELECT COUNT(*) FROM users').fetchone()[0] == 0
+
+    def insert(self, table, columns, rows):
+        self.conn.executemany(
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+            [tuple(row.get(c) for c in columns) for row in rows]
+        )
+
+    def finish(self):
+        self.conn.commit()
+        self.conn.execute('PRAGMA optimize')
+        self.conn.close()
+
+
+class PostgresTarget:
+    """database_postgres.engine üzerinden (DATABASE_URL) toplu yazım"""
+
+    def __init__(self, reset):
+        from sqlalchemy import inspect, text
+        from database_postgres import engine
+        self.text = text
+        self.inspector = inspect(engine)
+        self.conn = engine.connect()
+        self.tx = self.conn.begin()
+        if reset:
+            self.conn.execute(text(f"TRUNCATE {', '.join(TABLES)} RESTART IDENTITY CASCADE"))
+        self.description = f'postgres:{engine.url.render_as_string(hide_password=True)}'
+
+    def columns(self, table):
+        return [c['name'] for c in self.inspector.get_columns(table)]
+
+    def is_empty(self):
+        return self.conn.execute(self.text('SELECT COUNT(*) FROM users')).scalar() == 0
+
+    def insert(self, table, columns, rows):
+        self.conn.execute(
+            self.text(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(':' + c for c in columns)})"),
+            [{c: row.get(c) for c in columns} for row in rows]
+        )
+
+    def finish(self):
+        # Açık id'lerle yazıldığı için serial sequence'ları ileri al
+        for table in TABLES:
+            self.conn.execute(self.text(
+                f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE(MAX(id), 1)) FROM {table}"
+            ))
+        self.tx.commit()
+        self.conn.close()
+
+
+def generate(target, args):
+    """Tüm tabloları sırayla üretip yaz; tablo başına (satır, süre) döndür"""
+    generator = DataGenerator(args)
+    stats = {}
+    for table in TABLES:
+        available = set(target.columns(table))
+        started = time.perf_counter()
+        count = 0
+        columns = None
+        for batch in batched(generator.rows(table), args.batch_size):
+            if columns is None:
+                columns = [c for c in batch[0] if c in available]
+            target.insert(table, columns, batch)
+            count += len(batch)
+        stats[table] = (count, time.perf_counter() - started)
+    target.finish()
+    return stats
+
+
+def build_parser():
+    """Komut satırı seçenekleri (yük testleri aynı varsayılanlarla veri üretmek için kullanır)"""
+    parser = argparse.ArgumentParser(description="Sentetik çok kiracılı veri üretici")
+    parser.add_argument('--database', help='SQLite dosyası (varsayılan: config.DATABASE_PATH)')
+    parser.add_argument('--postgres', action='store_true', help='DATABASE_URL ile PostgreSQL\'e yaz')
+    parser.add_argument('--reset', action='store_true', help='Mevcut veriyi sil (SQLite dosyası / TRUNCATE)')
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--sellers-per-user', type=int, default=5)
+    parser.add_argument('--products', type=int, default=100000, help='Toplam ürün (kiracılara çarpık dağılır)')
+    parser.add_argument('--synced-ratio', type=float, default=0.6, help='Shopify\'a yüklenmiş ürün oranı')
+    parser.add_argument('--orders', type=int, default=50000, help='Toplam sipariş')
+    parser.add_argument('--activity-logs', type=int, default=100000)
+    parser.add_argument('--years', type=int, default=3, help='Sipariş/log geçmişinin kaç yıla yayılacağı')
+    parser.add_argument('--end-date', default='2026-01-01', help='Üretilen verinin en yeni tarihi (YYYY-MM-DD)')
+    parser.add_argument('--currency-rate', type=float, default=35.0, help='Shopify fiyatı için USD/TRY kuru')
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=42)
+    return parser
+
+
+def main():
+    parser = build_parser()
+    args = parser.parse_args()
+
+    if args.users < 1 or args.sellers_per_user < 1:
+        parser.error('--users ve --sellers-per-user en az 1 olmalı')
+    if args.postgres and not os.getenv('DATABASE_URL'):
+        parser.error('--postgres için DATABASE_URL tanımlı olmalı')
+
+    if args.postgres:
+        target = PostgresTarget(args.reset)
+    else:
+        from config import DATABASE_PATH
+        target = SqliteTarget(os.path.abspath(args.database or DATABASE_PATH), args.reset)
+    if not target.is_empty():
+        print("Hedef veritabanında veri var; üzerine yazmak için --reset kullanın.")
+        sys.exit(1)
+
+    print(f"Hedef: {target.description} (seed={args.seed})")
+    started = time.perf_counter()
+    stats = generate(target, args)
+    total_rows = sum(count for count, _ in stats.values())
+    elapsed = time.perf_counter() - started
+
+    print(f"{'tablo':>15} {'satır':>10} {'süre (sn)':>10} {'satır/sn':>10}")
+    for table, (count, seconds) in stats.items():
+        print(f"{table:>15} {count:>10} {seconds:>10.2f} {count / seconds if seconds else 0:>10.0f}")
+    print(f"{'toplam':>15} {total_rows:>10} {elapsed:>10.2f} {total_rows / elapsed if elapsed else 0:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+"""
+WebSocket Fan-out Yük Testi
+api:app'i yerel olarak başlatır, binlerce /ws istemcisi açar ve gerçek
+broadcast_product_event / broadcast_order_event / broadcast_notification
+fonksiyonları üzerinden event yayınlar.
+
+Raporlanan metrikler:
+    - bağlantı kurma hızı (bağlantı/sn)
+    - fan-out gecikmesi p50/p95/p99/max (broadcast çağrısı -> istemcide alınma)
+    - bağlantı başına sunucu belleği (RSS farkı / bağlantı)
+    - düşen mesajlar (beklenen - alınan) ve sunucu kuyruk istatistikleri
+
+İstemciler ayrı süreçlerde (worker) çalışır, böylece bellek ölçümü sadece
+sunucu tarafını yansıtır. Test kendi geçici veritabanını kullanır.
+
+Kullanım (dropship_app dizininden):
+    python benchmarks/ws_load_test.py --clients 2000 --users 20 --broadcasts 50
+    python benchmarks/ws_load_test.py --clients 5000 --workers 8 --event order_created
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+
+def raise_fd_limit():
+    """Binlerce soket için açık dosya limitini mümkün olduğunca yükselt"""
+    try:
+        import resource
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if soft < hard:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    except (ImportError, ValueError, OSError):
+        pass
+
+
+def get_rss_bytes() -> int:
+    """Sürecin anlık RSS belleği (Linux /proc, yoksa ru_maxrss)"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def percentile(values, pct):
+    """Sıralı olmayan listeden yüzdelik değer"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+# ==================== İSTEMCİ WORKER ====================
+
+async def _run_clients(worker_id, url, tokens, expected, idle_timeout, connect_concurrency, results):
+    """Bir worker süreci içindeki tüm istemcileri çalıştır"""
+    import websockets
+
+    semaphore = asyncio.Semaphore(connect_concurrency)
+    sockets = []
+    connect_times = []
+    failures = 0
+
+    async def open_one(token):
+        nonlocal failures
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                ws = await websockets.connect(f"{url}?token={token}", max_size=None, ping_interval=None)
+                connect_times.append(time.perf_counter() - started)
+                sockets.append(ws)
+            except Exception:
+                failures += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(open_one(t) for t in tokens))
+    results.put(('connected', worker_id, len(sockets), failures, time.perf_counter() - started, connect_times))
+
+    latencies = []
+    received = 0
+    resyncs = 0
+
+    async def read_one(ws):
+        nonlocal received, resyncs
+        count = 0
+        try:
+            while count < expected:
+                raw = await asyncio.wait_for(ws.recv(), timeout=idle_timeout)
+                now = time.time()
+                message = json.loads(raw)
+                if message.get('type') == 'ping':
+                    # Sunucu heartbeat'ine cevap ver, yoksa idle reaper bağlantıyı kapatır
+                    await ws.send('{"type":"pong"}')
+                    continue
+                if message.get('type') == 'resync_required':
+                    resyncs += 1
+                    continue
+                data = message.get('data') or {}
+                if 'sent_at' in data:
+                    latencies.append(now - data['sent_at'])
+                    count += 1
+        except (asyncio.TimeoutError, Exception):
+            pass
+        received += count
+
+    await asyncio.gather(*(read_one(ws) for ws in sockets))
+    await asyncio.gather(*(ws.close() for ws in sockets), return_exceptions=True)
+    results.put(('done', worker_id, received, resyncs, latencies))
+
+
+def client_worker(worker_id, url, tokens, expected, idle_timeout, connect_concurrency, results):
+    """multiprocessing giriş noktası"""
+    raise_fd_limit()
+    asyncio.run(_run_clients(worker_id, url, tokens, expected, idle_timeout, connect_concurrency, results))
+
+
+# ==================== SUNUCU + BROADCAST ====================
+
+def create_users(user_count):
+    """Test kullanıcıları ve oturum token'ları oluştur"""
+    from models import User
+    tokens = []
+    for i in range(user_count):
+        email = f"wsload{i}@loadtest.local"
+        user_id = User.create(email, 'loadtest123', f"WS Load {i}")
+        if not user_id:
+            user_id = User.get_by_email(email)['id']
+        tokens.append((str(user_id), User.create_session(user_id)))
+    return tokens
+
+
+async def _wait_queue(results, timeout):
+    """multiprocessing kuyruğunu event loop'u bloklamadan bekle"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, results.get, True, timeout)
+
+
+async def run_load_test(args):
+    import uvicorn
+    from api import app
+    from websocket_manager import (
+        manager, EventTypes, broadcast_product_event, broadcast_order_event, broadcast_notification
+    )
+
+    users = create_users(args.users)
+    # Testte kullanıcı başına çok sayıda bağlantı açılır; limit yalnızca istenirse uygulanır
+    manager.max_connections_per_user = args.per_user_cap
+
+    server = uvicorn.Server(uvicorn.Config(
+        app, host='127.0.0.1', port=args.port, log_level='warning',
+        ws_max_size=16 * 1024 * 1024, ws_ping_interval=None
+    ))
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    # İstemcileri kullanıcılara ve worker'lara dağıt
+    client_tokens = [users[i % len(users)][1] for i in range(args.clients)]
+    chunks = [client_tokens[w::args.workers] for w in range(args.workers)]
+    url = f"ws://127.0.0.1:{args.port}/ws"
+
+    ctx = multiprocessing.get_context('spawn')
+    results = ctx.Queue()
+    rss_before = get_rss_bytes()
+    processes = [
+        ctx.Process(target=client_worker, args=(
+            w, url, chunk, args.broadcasts, args.idle_timeout, args.connect_concurrency, results
+        ), daemon=True)
+        for w, chunk in enumerate(chunks) if chunk
+    ]
+    connect_started = time.perf_counter()
+    for p in processes:
+        p.start()
+
+    connected = failed = 0
+    connect_times = []
+    for _ in processes:
+        _, _, ok, fail, _, times = await _wait_queue(results, args.connect_timeout)
+        connected += ok
+        failed += fail
+        connect_times.extend(times)
+    connect_elapsed = time.perf_counter() - connect_started
+    await asyncio.sleep(0.5)
+    rss_after = get_rss_bytes()
+
+    # Broadcast'leri gerçek yardımcı fonksiyonlarla yayınla
+    padding = 'x' * args.payload_bytes
+    broadcast_started = time.perf_counter()
+    for i in range(args.broadcasts):
+        if args.event == 'system_notification':
+            # Sistem geneli bildirim (kullanıcıya bağlı değil)
+            await manager.broadcast_event(EventTypes.SYSTEM_NOTIFICATION, {
+                'message': 'load test', 'sent_at': time.time(), 'padding': padding
+            })
+        else:
+            for user_id, _ in users:
+                data = {'product_id': i, 'order_id': i, 'sent_at': time.time(), 'padding': padding}
+                if args.event == 'order_created':
+                    await broadcast_order_event(EventTypes.ORDER_CREATED, data, user_id=user_id)
+                else:
+                    await broadcast_product_event(EventTypes.PRODUCT_ADDED, data, user_id=user_id)
+        await asyncio.sleep(args.interval)
+    broadcast_elapsed = time.perf_counter() - broadcast_started
+
+    received = resyncs = 0
+    latencies = []
+    for _ in processes:
+        _, _, got, worker_resyncs, worker_latencies = await _wait_queue(
+            results, args.idle_timeout * 2 + args.broadcasts * args.interval + 30
+        )
+        received += got
+        resyncs += worker_resyncs
+        latencies.extend(worker_latencies)
+
+    for p in processes:
+        p.join(timeout=5)
+    queue_stats = manager.get_queue_stats()
+    server.should_exit = True
+    await server_task
+
+    expected = connected * args.broadcasts
+    report = {
+        'clients': args.clients,
+        'users': args.users,
+        'connected': connected,
+        'connect_failures': failed,
+        'connect_rate_per_sec': round(connected / connect_elapsed, 1) if connect_elapsed else 0,
+        'connect_ms_p50': round(percentile(connect_times, 50) * 1000, 2),
+        'connect_ms_p99': round(percentile(connect_times, 99) * 1000, 2),
+        'broadcasts': args.broadcasts,
+        'broadcast_seconds': round(broadcast_elapsed, 2),
+        'expected_messages': expected,
+        'received_messages': received,
+        'dropped_messages': expected - received,
+        'client_resyncs': resyncs,
+        'latency_ms_p50': round(percentile(latencies, 50) * 1000, 2),
+        'latency_ms_p95': round(percentile(latencies, 95) * 1000, 2),
+        'latency_ms_p99': round(percentile(latencies, 99) * 1000, 2),
+        'latency_ms_max': round(max(latencies) * 1000, 2) if latencies else 0,
+        'latency_ms_mean': round(statistics.mean(latencies) * 1000, 2) if latencies else 0,
+        'server_rss_mb': round(rss_after / 1024 / 1024, 1),
+        'memory_per_connection_kb': round((rss_after - rss_before) / max(connected, 1) / 1024, 2),
+        'server_queue_stats': queue_stats
+    }
+    return report
+
+
+def print_report(report):
+    print("=" * 56)
+    print("WebSocket Fan-out Yük Testi")
+    print("=" * 56)
+    print(f"Bağlantı       : {report['connected']}/{report['clients']} ({report['connect_failures']} hata), "
+          f"{report['users']} kullanıcı")
+    print(f"Bağlantı hızı  : {report['connect_rate_per_sec']} bağlantı/sn "
+          f"(p50 {report['connect_ms_p50']} ms, p99 {report['connect_ms_p99']} ms)")
+    print(f"Fan-out gecikme: p50 {report['latency_ms_p50']} ms, p95 {report['latency_ms_p95']} ms, "
+          f"p99 {report['latency_ms_p99']} ms, max {report['latency_ms_max']} ms")
+    print(f"Mesajlar       : {report['received_messages']}/{report['expected_messages']} alındı, "
+          f"{report['dropped_messages']} düştü, {report['client_resyncs']} resync")
+    print(f"Bellek         : {report['server_rss_mb']} MB RSS, "
+          f"{report['memory_per_connection_kb']} KB/bağlantı")
+    stats = report['server_queue_stats']
+    print(f"Sunucu kuyruk  : max derinlik {stats['max_queue_depth']}, "
+          f"düşen {stats['messages_dropped']}, yavaş istemci {stats['slow_consumers_dropped']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="WebSocket fan-out yük testi")
+    parser.add_argument('--clients', type=int, default=1000, help='Toplam /ws istemcisi')
+    parser.add_argument('--users', type=int, default=10, help='İstemcilerin dağıtılacağı kullanıcı sayısı')
+    parser.add_argument('--workers', type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help='İstemci süreç sayısı')
+    parser.add_argument('--broadcasts', type=int, default=50, help='Kullanıcı başına broadcast sayısı')
+    parser.add_argument('--interval', type=float, default=0.05, help='Broadcast turları arası bekleme (sn)')
+    parser.add_argument('--payload-bytes', type=int, default=256, help='Event başına ek veri boyutu')
+    parser.add_argument('--event', default='product_added',
+                        choices=['product_added', 'order_created', 'system_notification'])
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--connect-concurrency', type=int, default=200, help='Worker başına eşzamanlı bağlantı')
+    parser.add_argument('--connect-timeout', type=float, default=300)
+    parser.add_argument('--idle-timeout', type=float, default=10, help='İstemci mesaj bekleme zaman aşımı')
+    parser.add_argument('--per-user-cap', type=int, default=0,
+                        help='Kullanıcı başına bağlantı limiti (0 = limitsiz)')
+    parser.add_argument('--json', dest='json_out', help='Sonuçları bu dosyaya JSON olarak yaz')
+    args = parser.parse_args()
+
+    raise_fd_limit()
+    # Geçici veritabanı ve static dosyalar için çalışma dizini
+    os.environ.setdefault('DATABASE_PATH', os.path.join(tempfile.mkdtemp(prefix='wsload-'), 'dropship.db'))
+    os.chdir(APP_DIR)
+
+    report = asyncio.run(run_load_test(args))
+    print_report(report)
+    if args.json_out:
+        with open(args.json_out, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -10,7 +10,9 @@ APP_VERSION = "1.0.0"
 SECRET_KEY = os.environ.get('SECRET_KEY', 'gizli-anahtar-degistirin-123!')
 
 # Veritabanı
-DATABASE_PATH = os.path.join(os.path.dirname(__file__), 'database', 'dropship.db')
+DATABASE_PATH = os.environ.get(
+    'DATABASE_PATH', os.path.join(os.path.dirname(__file__), 'database', 'dropship.db')
+)
 
 # Shopify API Ayarları
 SHOPIFY_CONFIG = {
@@ -26,6 +28,10 @@ SHOPIFY_WEBHOOK_SECRET = os.environ.get('SHOPIFY_WEBHOOK_SECRET', '')
 
 # Trendyol Ayarları
 TRENDYOL_CONFIG = {
+    # Yerel test sunucusu için değiştirilebilir (ör: benchmarks/fake_trendyol.py)
+    'api_url': os.environ.get('TRENDYOL_API_URL', 'https://apigw.trendyol.com'),
+    # Sabit dolar kuru verilirse kur sorgusu yapılmaz (ağsız çalışma)
+    'currency_rate': os.environ.get('USD_TRY_RATE'),
     'default_seller_id': None,
     'scrape_delay': 0.5,  # saniye - istekler arası bekleme
     'max_workers': 10,    # paralel istek sayısı
@@ -46,6 +52,41 @@ ORDER_AUTOMATION = {
     'auto_purchase': False,       # otomatik satın alma (dikkatli!)
 }
 
+# WebSocket Ayarları
+WEBSOCKET_CONFIG = {
+    'send_queue_size': 256,       # bağlantı başına bekleyen maksimum mesaj
+    'send_timeout': 10,           # saniye - tek mesaj gönderim zaman aşımı
+    'overflow_policy': 'resync',  # kuyruk taşınca: resync veya drop
+    'coalesce_window_ms': 250,    # stok/fiyat event'lerini birleştirme penceresi (0 = kapalı)
+    'replay_buffer_size': 500,    # kullanıcı başına saklanan son event (yeniden bağlanma için)
+    'heartbeat_interval': 30,     # saniye - sunucu ping aralığı
+    'heartbeat_timeout': 75,      # saniye - bu süre mesaj gelmezse bağlantı kapatılır
+    'max_connections_per_user': 10,  # kullanıcı başına bağlantı limiti (0 = sınırsız)
+}
+
+# Stok Senkronizasyon Ayarları
+STOCK_SYNC_CONFIG = {
+    # Değişkenlik katmanları: kontrol aralığı = kullanıcının stock_sync_interval'ı x çarpan
+    'tier_interval_multipliers': {'hot': 1, 'warm': 4, 'cold': 24},
+    'change_score_alpha': 0.3,    # değişim skoru (EWMA) için yeni gözlemin ağırlığı
+    'hot_score': 0.3,             # bu skorun üstü hot
+    'warm_score': 0.05,           # bu skorun üstü warm, altı cold
+    'sales_window_days': 7,       # son satışı bu kadar gün içinde olan ürün hot
+    # Aynı trendyol_id'yi takip eden kullanıcılar bu süre içindeki gözlemi paylaşır (saniye)
+    'observation_ttl_seconds': 300,
+}
+
+# SQL Sorgu Zamanlaması (query_log.py)
+QUERY_LOG_CONFIG = {
+    'enabled': os.environ.get('QUERY_LOG_ENABLED', '1') != '0',
+    'slow_query_ms': float(os.environ.get('SLOW_QUERY_MS', '100')),  # bu sürenin üstü planıyla loglanır
+    'sample_window': 500,         # fingerprint başına p95 için tutulan son ölçüm sayısı
+    'max_fingerprints': 1000,     # sonrası '<diğer>' altında toplanır
+    'slow_log_size': 200,         # bellekte tutulan son yavaş sorgu sayısı
+    # /api/admin/query-stats erişimi (virgülle ayrılmış e-postalar; boşsa erişim kapalı)
+    'admin_emails': [e.strip() for e in os.environ.get('ADMIN_EMAILS', '').split(',') if e.strip()],
+}
+
 # Masaüstü Uygulama Ayarları
 APP_CONFIG = {
     'theme': 'dark',              # dark veya light
@@ -493,7 +493,10 @@ class DropshipApp(ctk.CTk):
         for item in self.product_tree.get_children():
             self.product_tree.delete(item)
         
-        result = Product.get_all(page=1, per_page=500, seller_id=self.current_seller_filter)
+        result = Product.get_all(
+            page=1, per_page=500, seller_id=self.current_seller_filter,
+            fields=['name', 'brand_name', 'trendyol_price', 'profit_margin', 'is_synced_to_shopify']
+        )
         products = result['products']
         
         self.selected_products = set()
@@ -0,0 +1,323 @@
+"""
+Dropship Otomasyon Sistemi - Şema Migration'ları
+
+init_database tabloları CREATE TABLE IF NOT EXISTS ile oluşturur (sürüm 0).
+Sonraki tüm şema değişiklikleri (index, yeni kolon, trigger) buraya sıralı bir
+migration olarak eklenir; her veritabanında her migration tam olarak bir kez,
+kendi transaction'ı içinde çalışır ve schema_migrations tablosuna yazılır.
+
+Kullanım (dropship_app dizininden):
+    python migrations.py              # bekleyen migration'ları uygula
+    python migrations.py --status     # uygulanmış / bekleyen migration'lar
+    python migrations.py --explain    # sık kullanılan sorguların index kullanımını doğrula
+"""
+import argparse
+import sys
+from datetime import datetime
+
+
+# ==================== YARDIMCILAR ====================
+
+def column_exists(conn, table, column):
+    """Tabloda kolon var mı (PRAGMA table_info)"""
+    return any(row[1] == column for row in conn.execute(f'PRAGMA table_info({table})'))
+
+def add_column(conn, table, column, definition):
+    """Kolon yoksa ekle - mevcut veritabanlarında tekrar çalıştırmak güvenli"""
+    if not column_exists(conn, table, column):
+        conn.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+
+def create_index(conn, name, table, columns):
+    """Index oluştur (varsa dokunma)"""
+    conn.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})')
+
+
+# ==================== MIGRATION'LAR ====================
+
+def _001_table_counters(conn):
+    """Sayfalı listelerde COUNT(*) yerine kullanılan satır sayaçları"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS table_counters (
+            table_name TEXT NOT NULL,
+            user_id INTEGER NOT NULL,
+            row_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (table_name, user_id)
+        )
+    ''')
+    for table in ('products', 'orders'):
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {table}_count_insert AFTER INSERT ON {table}
+            BEGIN
+                INSERT INTO table_counters (table_name, user_id, row_count)
+                VALUES ('{table}', COALESCE(NEW.user_id, 0), 1)
+                ON CONFLICT(table_name, user_id) DO UPDATE SET row_count = row_count + 1;
+            END
+        ''')
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {table}_count_delete AFTER DELETE ON {table}
+            BEGIN
+                UPDATE table_counters SET row_count = row_count - 1
+                WHERE table_name = '{table}' AND user_id = COALESCE(OLD.user_id, 0);
+            END
+        ''')
+        # Trigger'lardan önce eklenmiş satırlar için başlangıç değeri
+        conn.execute(f'''
+            INSERT OR IGNORE INTO table_counters (table_name, user_id, row_count)
+            SELECT '{table}', COALESCE(user_id, 0), COUNT(*) FROM {table} GROUP BY COALESCE(user_id, 0)
+        ''')
+
+def _002_hot_query_indexes(conn):
+    """Liste, senkronizasyon ve kargo sorgularının kullandığı index'ler"""
+    # Ürün listesi (user_id filtresi + created_at, id sıralaması; id rowid olduğu için index'te)
+    create_index(conn, 'idx_products_user_created', 'products', 'user_id, created_at')
+    create_index(conn, 'idx_products_seller_created', 'products', 'seller_id, created_at')
+    create_index(conn, 'idx_products_trendyol_id', 'products', 'trendyol_id')
+    create_index(conn, 'idx_products_shopify_id', 'products', 'shopify_id')
+    create_index(conn, 'idx_products_synced', 'products', 'is_synced_to_shopify')
+    # Sipariş listesi (durum filtreli ve filtresiz) + bekleyen sipariş kontrolü
+    create_index(conn, 'idx_orders_user_status_created', 'orders', 'user_id, status, created_at')
+    create_index(conn, 'idx_orders_user_created', 'orders', 'user_id, created_at')
+    create_index(conn, 'idx_orders_status_created', 'orders', 'status, created_at')
+    # Siparişin son kargosu ve kullanıcının kargo listesi
+    create_index(conn, 'idx_shipments_order_created', 'shipments', 'order_id, created_at')
+    create_index(conn, 'idx_shipments_user_created', 'shipments', 'user_id, created_at')
+    create_index(conn, 'idx_activity_logs_user_created', 'activity_logs', 'user_id, created_at')
+
+def _003_sync_checkpoints(conn):
+    """Uzun süren toplu işlerin (stok senkronizasyonu) kaldığı yer"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS sync_checkpoints (
+            job TEXT NOT NULL,
+            user_id INTEGER NOT NULL DEFAULT 0,
+            last_id INTEGER NOT NULL DEFAULT 0,
+            processed INTEGER NOT NULL DEFAULT 0,
+            started_at TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (job, user_id)
+        )
+    ''')
+
+def _004_stock_check_tiers(conn):
+    """Ürün bazlı değişkenlik katmanı ve bir sonraki stok kontrol zamanı"""
+    add_column(conn, 'products', 'check_tier', "TEXT DEFAULT 'warm'")
+    add_column(conn, 'products', 'change_score', 'REAL DEFAULT 0')
+    add_column(conn, 'products', 'next_check_at', 'TIMESTAMP')
+    add_column(conn, 'products', 'last_changed_at', 'TIMESTAMP')
+    add_column(conn, 'products', 'last_sold_at', 'TIMESTAMP')
+
+def _005_trendyol_observations(conn):
+    """Kullanıcılar arası paylaşılan son Trendyol stok/fiyat gözlemi"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS trendyol_observations (
+            trendyol_id INTEGER PRIMARY KEY,
+            in_stock BOOLEAN NOT NULL,
+            price REAL,
+            original_price REAL,
+            variants TEXT,
+            observed_at TIMESTAMP NOT NULL
+        )
+    ''')
+
+def _006_synced_products_by_user(conn):
+    """Kullanıcı bazlı senkronize ürün taraması (stok senkronizasyonu, zamanlayıcı)"""
+    create_index(conn, 'idx_products_user_synced', 'products', 'user_id, is_synced_to_shopify, id')
+    # Sadece kontrol zamanı gelenler (due_only turları)
+    create_index(conn, 'idx_products_user_due', 'products', 'user_id, is_synced_to_shopify, next_check_at, id')
+
+def _007_orders_created_index(conn):
+    """Kullanıcı filtresiz sipariş listesi (masaüstü uygulaması)"""
+    create_index(conn, 'idx_orders_created', 'orders', 'created_at')
+
+
+# (sürüm, açıklama, fonksiyon) - sadece sona ekleyin, mevcut olanları değiştirmeyin
+MIGRATIONS = [
+    (1, 'table_counters ve sayaç trigger\'ları', _001_table_counters),
+    (2, 'sık kullanılan sorgular için index\'ler', _002_hot_query_indexes),
+    (3, 'sync_checkpoints tablosu', _003_sync_checkpoints),
+    (4, 'ürün stok kontrol katmanları', _004_stock_check_tiers),
+    (5, 'trendyol_observations tablosu', _005_trendyol_observations),
+    (6, 'kullanıcı bazlı senkronize ürün index\'leri', _006_synced_products_by_user),
+    (7, 'filtresiz sipariş listesi index\'i', _007_orders_created_index),
+]
+
+
+# ==================== ÇALIŞTIRICI ====================
+
+def _ensure_migrations_table(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            description TEXT,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.commit()
+
+def get_applied_versions(conn):
+    """Uygulanmış migration sürümleri"""
+    _ensure_migrations_table(conn)
+    return {row[0] for row in conn.execute('SELECT version FROM schema_migrations')}
+
+def run_migrations(conn):
+    """
+    Bekleyen migration'ları sırayla uygula. Her migration BEGIN IMMEDIATE ile
+    yazma kilidi alır; aynı anda başlayan ikinci süreç kilidi bekler, ardından
+    sürümün zaten uygulandığını görüp atlar. Hata olursa migration geri alınır.
+    """
+    applied = get_applied_versions(conn)
+    newly_applied = []
+
+    for version, description, migrate in MIGRATIONS:
+        if version in applied:
+            continue
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            if conn.execute('SELECT 1 FROM schema_migrations WHERE version = ?', (version,)).fetchone():
+                conn.rollback()
+                continue
+            migrate(conn)
+            conn.execute(
+                'INSERT INTO schema_migrations (version, description, applied_at) VALUES (?, ?, ?)',
+                (version, description, datetime.now())
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        newly_applied.append(version)
+        print(f"✅ Migration {version:03d} uygulandı: {description}")
+
+    return newly_applied
+
+
+# ==================== SORGU PLANI KONTROLÜ ====================
+
+# Order._LATEST_SHIPMENT_QUERY dış sorgusu: en fazla per_page satırlık sayfa
+# (co-routine) taranıp sıralanır; tablo taraması değildir
+PAGE_STEPS = ('SCAN page', 'USE TEMP B-TREE FOR ORDER BY')
+
+def hot_queries():
+    """
+    Modellerdeki sık kullanılan sorgular (isim, sorgu, parametreler, izin verilen
+    adımlar). Liste, keyset ve senkronizasyon sorguları modellerin kendi sorgu
+    üreticilerinden alınır; parametreler yalnızca plan içindir.
+    """
+    from models import Product, Order, keyset_page
+
+    position = ('2025-01-01', 100)
+    due_before = '2025-01-01'
+    queries = []
+
+    def add(name, query, params=(), allowed=()):
+        queries.append((name, query, tuple(params), allowed))
+
+    def add_page(name, query, params, **page):
+        add(name, *keyset_page(query, params, **page))
+
+    add_page('Product.get_all', *Product._list_filter(user_id=1), per_page=20)
+    add_page('Product.get_all (cursor)', *Product._list_filter(user_id=1), position=position, per_page=20)
+    add_page('Product.get_all (alanlar)',
+             *Product._list_filter(Product._select_columns(Product.COLUMNS), user_id=1), per_page=20)
+    add_page('Product.get_all (seller)', *Product._list_filter(user_id=1, seller_id=1), per_page=20)
+    add('Product.get_all (seller, toplam)', *Product._list_filter('COUNT(*)', user_id=1, seller_id=1))
+    add('Product.create_or_update', 'SELECT id FROM products WHERE trendyol_id = ? AND user_id = ?', (1, 1))
+    add('Product.get_by_trendyol_id', 'SELECT * FROM products WHERE trendyol_id = ?', (1,))
+
+    for name, user_id, due in (
+        ('Product.iter_synced_products', None, None),
+        ('Product.iter_synced_products (kullanıcı)', 1, None),
+        ('Product.iter_synced_products (sırası gelen)', 1, due_before),
+    ):
+        query, params = Product._synced_query(user_id, due)
+        add(name, query, (0, *params, 1000))
+
+    query, params = Product._due_filter(1, due_before)
+    add('Product.count (sırası gelen)',
+        f'SELECT COUNT(*) FROM products WHERE is_synced_to_shopify = 1 AND user_id = ?{query}', (1, *params))
+    add('Product.count (synced)',
+        'SELECT COUNT(*) FROM products WHERE is_synced_to_shopify = 1 AND user_id = ?', (1,))
+    add('Product.get_synced_user_ids',
+        'SELECT id FROM users u WHERE EXISTS (SELECT 1 FROM products p WHERE p.user_id = u.id '
+        'AND p.is_synced_to_shopify = 1)')
+    add('Product.mark_sold',
+        'UPDATE products SET last_sold_at = ? WHERE shopify_id IN (?, ?) AND user_id = ?',
+        ('2025-01-01', '1', '2', 1))
+    add('Product.mark_due_by_trendyol_id',
+        'UPDATE products SET next_check_at = ? WHERE trendyol_id = ? AND is_synced_to_shopify = 1 '
+        'AND user_id != ?', ('2025-01-01', 1, 1))
+    add('TrendyolObservation.get',
+        'SELECT * FROM trendyol_observations WHERE trendyol_id = ? AND observed_at >= ?', (1, '2025-01-01'))
+
+    # Son kargo alt sorgusu Order._LATEST_SHIPMENT_QUERY içinden gelir
+    add('Order.get_all', *Order._list_query(user_id=1), allowed=PAGE_STEPS)
+    add('Order.get_all (cursor)', *Order._list_query(user_id=1, position=position), allowed=PAGE_STEPS)
+    add('Order.get_all (status)', *Order._list_query(status='pending', user_id=1), allowed=PAGE_STEPS)
+    add('Order.get_all (filtresiz)', *Order._list_query(), allowed=PAGE_STEPS)
+    add('Order.get_pending_orders',
+        "SELECT * FROM orders WHERE status = 'pending' AND user_id = ? ORDER BY created_at ASC", (1,))
+    add('Order.get_pending_orders (tümü)',
+        "SELECT * FROM orders WHERE status = 'pending' ORDER BY created_at ASC")
+    add('Shipment.get_by_order', 'SELECT * FROM shipments WHERE order_id = ? AND user_id = ?', (1, 1))
+    add('Shipment.get_all',
+        'SELECT s.*, o.shopify_order_number, o.customer_name FROM shipments s '
+        'LEFT JOIN orders o ON s.order_id = o.id WHERE s.user_id = ? ORDER BY s.created_at DESC LIMIT ?',
+        (1, 50))
+    add('ActivityLog.get_recent',
+        'SELECT * FROM activity_logs WHERE user_id = ? ORDER BY created_at DESC LIMIT ?', (1, 10))
+    return queries
+
+def explain_hot_queries(conn):
+    """
+    hot_queries() için EXPLAIN QUERY PLAN çıktısı. Tablo taraması (index'siz SCAN)
+    veya sıralama için geçici B-tree kullanan sorgular başarısız sayılır. Sorgu
+    için izin verilen adımlar (allowed) her biri bir kez olmak üzere hariç tutulur.
+    """
+    results = []
+    for name, query, params, allowed in hot_queries():
+        plan = [row[3] for row in conn.execute(f'EXPLAIN QUERY PLAN {query}', params)]
+        remaining = list(allowed)
+        problems = []
+        for step in plan:
+            if not ((step.startswith('SCAN') and 'INDEX' not in step) or 'TEMP B-TREE' in step):
+                continue
+            if step in remaining:
+                remaining.remove(step)
+            else:
+                problems.append(step)
+        results.append({'name': name, 'plan': plan, 'ok': not problems})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Veritabanı migration'ları")
+    parser.add_argument('--status', action='store_true', help='Migration durumunu göster')
+    parser.add_argument('--explain', action='store_true', help='Sorgu planlarını kontrol et')
+    args = parser.parse_args()
+
+    from models import get_db_connection, init_database
+
+    init_database()
+    conn = get_db_connection()
+    try:
+        if args.status:
+            applied = get_applied_versions(conn)
+            for version, description, _ in MIGRATIONS:
+                mark = '✅' if version in applied else '⏳'
+                print(f"{mark} {version:03d} {description}")
+        elif args.explain:
+            failed = 0
+            for result in explain_hot_queries(conn):
+                mark = '✅' if result['ok'] else '❌'
+                print(f"{mark} {result['name']}")
+                for step in result['plan']:
+                    print(f"      {step}")
+                failed += not result['ok']
+            if failed:
+                print(f"\n{failed} sorgu index kullanmıyor")
+                sys.exit(1)
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
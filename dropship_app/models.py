@@ -4,18 +4,80 @@ Dropship Otomasyon Sistemi - Veritabanı Modelleri
 import sqlite3
 import os
 import json
+import base64
 import hashlib
 import secrets
 from datetime import datetime, timedelta
-from config import DATABASE_PATH
+from config import DATABASE_PATH, QUERY_LOG_CONFIG
+from migrations import run_migrations
+from query_log import InstrumentedConnection
 
 def get_db_connection():
-    """Veritabanı bağlantısı al"""
+    """Veritabanı bağlantısı al (QUERY_LOG_CONFIG açıksa her ifade zamanlanır)"""
     os.makedirs(os.path.dirname(DATABASE_PATH), exist_ok=True)
-    conn = sqlite3.connect(DATABASE_PATH)
+    factory = InstrumentedConnection if QUERY_LOG_CONFIG['enabled'] else sqlite3.Connection
+    conn = sqlite3.connect(DATABASE_PATH, factory=factory)
     conn.row_factory = sqlite3.Row
     return conn
 
+
+# Sayfalama sırası: en yeni önce, aynı zamanda eklenenler id ile ayrılır
+KEYSET_ORDER = 'ORDER BY created_at DESC, id DESC'
+
+def encode_cursor(created_at, row_id):
+    """(created_at, id) konumunu opak bir cursor string'ine çevir"""
+    raw = json.dumps([str(created_at), row_id], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """Cursor string'ini (created_at, id) çiftine çevir, bozuksa ValueError"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return str(created_at), int(row_id)
+    except Exception:
+        raise ValueError('Geçersiz cursor')
+
+def keyset_page(query, params, position=None, page=1, per_page=50):
+    """
+    Filtre sorgusuna sıralama ve sayfa sınırı ekle. position (decode_cursor
+    çıktısı) verilirse (created_at, id) keyset, yoksa LIMIT/OFFSET.
+    """
+    params = list(params)
+    if position:
+        query += f' AND (created_at, id) < (?, ?) {KEYSET_ORDER} LIMIT ?'
+        params.extend([*position, per_page])
+    else:
+        query += f' {KEYSET_ORDER} LIMIT ? OFFSET ?'
+        params.extend([per_page, (page - 1) * per_page])
+    return query, params
+
+def next_cursor(rows, per_page):
+    """Sayfa doluysa son satırdan bir sonraki sayfanın cursor'ını üret"""
+    if len(rows) < per_page or not rows:
+        return None
+    last = rows[-1]
+    return encode_cursor(last['created_at'], last['id'])
+
+def get_row_count(table_name, user_id=None, conn=None):
+    """Trigger'larla güncel tutulan sayaçtan satır sayısı (COUNT(*) taraması yok)"""
+    own_conn = conn is None
+    conn = conn or get_db_connection()
+    if user_id:
+        row = conn.execute(
+            'SELECT row_count FROM table_counters WHERE table_name = ? AND user_id = ?',
+            (table_name, user_id)
+        ).fetchone()
+        total = row[0] if row else 0
+    else:
+        total = conn.execute(
+            'SELECT COALESCE(SUM(row_count), 0) FROM table_counters WHERE table_name = ?',
+            (table_name,)
+        ).fetchone()[0]
+    if own_conn:
+        conn.close()
+    return total
+
 def init_database():
     """Veritabanı tablolarını oluştur"""
     conn = get_db_connection()
@@ -241,6 +303,9 @@ def init_database():
     ''')
     
     conn.commit()
+    
+    # Index'ler, sayaçlar ve sonraki şema değişiklikleri
+    run_migrations(conn)
     conn.close()
     print("Veritabanı başarıyla oluşturuldu!")
 
@@ -463,9 +528,77 @@ class Seller:
             conn.close()
 
 
+class ProductRecord:
+    """
+    Toplu işler (stok senkronizasyonu, export) için hafif ürün kaydı.
+    __slots__ sayesinde satır başına dict yükü yok; get() ve [] ile
+    dict gibi okunabildiği için mevcut kodla uyumludur.
+    """
+    FIELDS = (
+        'id', 'user_id', 'trendyol_id', 'shopify_id', 'name', 'trendyol_price',
+        'shopify_price', 'profit_margin', 'stock_status', 'is_active', 'last_sync',
+        'check_tier', 'change_score', 'last_sold_at'
+    )
+    __slots__ = FIELDS
+    
+    def __init__(self, *values):
+        for name, value in zip(self.FIELDS, values):
+            setattr(self, name, value)
+    
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key)
+    
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+    
+    def to_dict(self):
+        return {name: getattr(self, name, None) for name in self.FIELDS}
+    
+    def __repr__(self):
+        return f"ProductRecord(id={self.id}, trendyol_id={self.trendyol_id}, name={self.name!r})"
+
+
 class Product:
     """Ürün modeli"""
     
+    # fields= projeksiyonunda izin verilen kolonlar (yeni kolon eklenince buraya da ekleyin)
+    COLUMNS = (
+        'id', 'user_id', 'trendyol_id', 'shopify_id', 'seller_id', 'name', 'brand_name',
+        'category_name', 'trendyol_url', 'trendyol_price', 'trendyol_original_price',
+        'shopify_price', 'profit_margin', 'is_synced_to_shopify', 'is_active', 'stock_status',
+        'images', 'variants', 'rating_score', 'rating_count', 'last_sync', 'created_at', 'updated_at',
+        'check_tier', 'change_score', 'next_check_at', 'last_changed_at', 'last_sold_at'
+    )
+    JSON_COLUMNS = ('images', 'variants')
+    
+    @staticmethod
+    def _select_columns(fields=None):
+        """
+        SELECT listesi. fields verilmezse tüm kolonlar; verilirse sadece istenenler
+        (sayfalama için id ve created_at her zaman dahil). Bilinmeyen kolon ValueError.
+        """
+        if not fields:
+            return '*'
+        if isinstance(fields, str):
+            fields = [f.strip() for f in fields.split(',') if f.strip()]
+        unknown = [f for f in fields if f not in Product.COLUMNS]
+        if unknown:
+            raise ValueError(f"Geçersiz alan: {', '.join(unknown)}")
+        selected = ['id', 'created_at'] + [f for f in fields if f not in ('id', 'created_at')]
+        return ', '.join(dict.fromkeys(selected))
+    
+    @staticmethod
+    def _from_row(row):
+        """Satırı dict'e çevir; JSON kolonları sadece seçildiyse decode edilir"""
+        prod = dict(row)
+        for column in Product.JSON_COLUMNS:
+            if column in prod:
+                prod[column] = json.loads(prod[column]) if prod[column] else []
+        return prod
+    
     @staticmethod
     def create_or_update(data, user_id=None):
         conn = get_db_connection()
@@ -522,11 +655,9 @@ class Product:
         return product_id
     
     @staticmethod
-    def get_all(page=1, per_page=50, seller_id=None, synced_only=False, user_id=None):
-        conn = get_db_connection()
-        offset = (page - 1) * per_page
-        
-        query = 'SELECT * FROM products WHERE 1=1'
+    def _list_filter(columns='*', user_id=None, seller_id=None, synced_only=False):
+        """Ürün listesi / sayımı için filtre sorgusu ve parametreleri"""
+        query = f'SELECT {columns} FROM products WHERE 1=1'
         params = []
         
         if user_id:
@@ -540,53 +671,57 @@ class Product:
         if synced_only:
             query += ' AND is_synced_to_shopify = 1'
         
-        query += ' ORDER BY created_at DESC LIMIT ? OFFSET ?'
-        params.extend([per_page, offset])
+        return query, params
+    
+    @staticmethod
+    def get_all(page=1, per_page=50, seller_id=None, synced_only=False, user_id=None,
+                cursor=None, include_total=True, fields=None):
+        """
+        Ürün listesi. cursor verilirse OFFSET yerine (created_at, id) keyset sayfalama
+        kullanılır; derin sayfalar da ilk sayfa kadar hızlıdır. Yanıttaki next_cursor
+        bir sonraki sayfayı getirir. include_total=False ise toplam hiç hesaplanmaz.
+        fields verilirse sadece o kolonlar okunur (ör. liste ekranında variants yok).
+        """
+        columns = Product._select_columns(fields)
+        position = decode_cursor(cursor) if cursor else None
+        filter_query, filter_params = Product._list_filter(columns, user_id, seller_id, synced_only)
+        query, params = keyset_page(filter_query, filter_params, position, page, per_page)
         
+        conn = get_db_connection()
         products = conn.execute(query, params).fetchall()
         
-        # Toplam sayı
-        count_query = 'SELECT COUNT(*) FROM products WHERE 1=1'
-        count_params = []
-        if user_id:
-            count_query += ' AND user_id = ?'
-            count_params.append(user_id)
-        if seller_id:
-            count_query += ' AND seller_id = ?'
-            count_params.append(seller_id)
-        total = conn.execute(count_query, count_params).fetchone()[0]
+        # Toplam sayı - filtre yoksa sayaç tablosundan
+        total = None
+        if include_total:
+            if seller_id or synced_only:
+                count_query, _ = Product._list_filter('COUNT(*)', user_id, seller_id, synced_only)
+                total = conn.execute(count_query, filter_params).fetchone()[0]
+            else:
+                total = get_row_count('products', user_id, conn)
         
         conn.close()
         
-        result = []
-        for p in products:
-            prod = dict(p)
-            prod['images'] = json.loads(prod['images']) if prod['images'] else []
-            prod['variants'] = json.loads(prod['variants']) if prod['variants'] else []
-            result.append(prod)
+        result = [Product._from_row(p) for p in products]
         
         return {
             'products': result,
             'total': total,
             'page': page,
             'per_page': per_page,
-            'total_pages': (total + per_page - 1) // per_page
+            'total_pages': (total + per_page - 1) // per_page if total is not None else None,
+            'next_cursor': next_cursor(result, per_page)
         }
     
     @staticmethod
-    def get_by_id(product_id, user_id=None):
+    def get_by_id(product_id, user_id=None, fields=None):
+        columns = Product._select_columns(fields)
         conn = get_db_connection()
         if user_id:
-            product = conn.execute('SELECT * FROM products WHERE id = ? AND user_id = ?', (product_id, user_id)).fetchone()
+            product = conn.execute(f'SELECT {columns} FROM products WHERE id = ? AND user_id = ?', (product_id, user_id)).fetchone()
         else:
-            product = conn.execute('SELECT * FROM products WHERE id = ?', (product_id,)).fetchone()
+            product = conn.execute(f'SELECT {columns} FROM products WHERE id = ?', (product_id,)).fetchone()
         conn.close()
-        if product:
-            prod = dict(product)
-            prod['images'] = json.loads(prod['images']) if prod['images'] else []
-            prod['variants'] = json.loads(prod['variants']) if prod['variants'] else []
-            return prod
-        return None
+        return Product._from_row(product) if product else None
     
     @staticmethod
     def update_shopify_sync(product_id, shopify_id, shopify_price):
@@ -634,7 +769,8 @@ class Product:
         conn.close()
     
     @staticmethod
-    def update_stock_status(product_id, in_stock: bool, trendyol_price: float = None):
+    def update_stock_status(product_id, in_stock: bool, trendyol_price: float = None,
+                            schedule: dict = None):
         """
         Ürünün stok durumunu güncelle
         
@@ -642,28 +778,37 @@ class Product:
             product_id: Ürün ID
             in_stock: Stokta var mı
             trendyol_price: Güncel Trendyol fiyatı
+            schedule: Kontrol planı (check_tier, change_score, next_check_at, changed)
         """
         conn = get_db_connection()
         stock_status = 'in_stock' if in_stock else 'out_of_stock'
+        now = datetime.now()
         
+        sets = ['stock_status = ?', 'is_active = ?', 'last_sync = ?', 'updated_at = ?']
+        params = [stock_status, in_stock, now, now]
         if trendyol_price:
-            conn.execute('''
-                UPDATE products SET 
-                    stock_status = ?, trendyol_price = ?,
-                    is_active = ?, last_sync = ?, updated_at = ?
-                WHERE id = ?
-            ''', (stock_status, trendyol_price, in_stock, datetime.now(), datetime.now(), product_id))
-        else:
-            conn.execute('''
-                UPDATE products SET 
-                    stock_status = ?, is_active = ?, 
-                    last_sync = ?, updated_at = ?
-                WHERE id = ?
-            ''', (stock_status, in_stock, datetime.now(), datetime.now(), product_id))
+            sets.append('trendyol_price = ?')
+            params.append(trendyol_price)
+        if schedule:
+            sets += ['check_tier = ?', 'change_score = ?', 'next_check_at = ?']
+            params += [schedule['check_tier'], schedule['change_score'], schedule['next_check_at']]
+            if schedule.get('changed'):
+                sets.append('last_changed_at = ?')
+                params.append(now)
+        
+        conn.execute(f'UPDATE products SET {", ".join(sets)} WHERE id = ?', [*params, product_id])
         
         conn.commit()
         conn.close()
     
+    @staticmethod
+    def reschedule_check(product_id, next_check_at):
+        """Sadece bir sonraki stok kontrol zamanını değiştir (stok durumu korunur)"""
+        conn = get_db_connection()
+        conn.execute('UPDATE products SET next_check_at = ? WHERE id = ?', (next_check_at, product_id))
+        conn.commit()
+        conn.close()
+    
     @staticmethod
     def bulk_update_stock(stock_updates: list):
         """
@@ -693,16 +838,149 @@ class Product:
     
     @staticmethod
     def get_synced_products():
-        """Shopify'a senkronize edilmiş tüm ürünleri getir"""
+        """Shopify'a senkronize edilmiş tüm ürünleri getir (ProductRecord listesi)"""
+        return list(Product.iter_synced_products())
+    
+    @staticmethod
+    def iter_synced_products(batch_size=1000, user_id=None, after_id=0, due_before=None):
+        """
+        Senkronize ürünleri id sırasıyla, batch_size'lık parçalar halinde üret.
+        Her parça kısa ömürlü ayrı bir sorgudur (id > son id); uzun süren işlerde
+        okuma kilidi tutulmaz ve bellekte tek seferde en fazla bir parça bulunur.
+        due_before verilirse sadece kontrol zamanı gelmiş ürünler döner.
+        """
+        query, params = Product._synced_query(user_id, due_before)
+        
+        last_id = after_id
+        while True:
+            conn = get_db_connection()
+            conn.row_factory = None
+            rows = conn.execute(query, [last_id, *params, batch_size]).fetchall()
+            conn.close()
+            for row in rows:
+                yield ProductRecord(*row)
+            if len(rows) < batch_size:
+                break
+            last_id = rows[-1][0]
+    
+    @staticmethod
+    def _synced_query(user_id=None, due_before=None):
+        """
+        iter_synced_products parça sorgusu; parametreler [son id, *params, batch_size]
+        sırasıyla verilir
+        """
+        columns = ', '.join(ProductRecord.FIELDS)
+        query = f'SELECT {columns} FROM products WHERE is_synced_to_shopify = 1 AND id > ?'
+        params = []
+        if user_id:
+            query += ' AND user_id = ?'
+            params.append(user_id)
+        if due_before:
+            clause, due_params = Product._due_filter(user_id, due_before)
+            query += clause
+            params.extend(due_params)
+        return query + ' ORDER BY id LIMIT ?', params
+    
+    @staticmethod
+    def _due_filter(user_id, due_before):
+        """
+        Kontrol zamanı gelmiş ürünler için filtre ve parametreleri.
+        'next_check_at IS NULL OR next_check_at <= ?' index kullanamaz; kullanıcı
+        verildiğinde iki dal idx_products_user_due üzerinde ayrı ayrı aranıp
+        birleştirilir.
+        """
+        if not user_id:
+            return ' AND (next_check_at IS NULL OR next_check_at <= ?)', [due_before]
+        scope = 'is_synced_to_shopify = 1 AND user_id = ?'
+        clause = (
+            f' AND id IN (SELECT id FROM products WHERE {scope} AND next_check_at IS NULL'
+            f' UNION ALL SELECT id FROM products WHERE {scope} AND next_check_at <= ?)'
+        )
+        return clause, [user_id, user_id, due_before]
+    
+    @staticmethod
+    def get_tier_counts(user_id=None):
+        """Senkronize ürünlerin değişkenlik katmanlarına dağılımı"""
         conn = get_db_connection()
-        products = conn.execute('''
-            SELECT id, trendyol_id, shopify_id, name, trendyol_price, 
-                   shopify_price, stock_status, last_sync
-            FROM products 
-            WHERE is_synced_to_shopify = 1
+        query = 'SELECT COALESCE(check_tier, \'warm\'), COUNT(*) FROM products WHERE is_synced_to_shopify = 1'
+        params = []
+        if user_id:
+            query += ' AND user_id = ?'
+            params.append(user_id)
+        rows = conn.execute(query + ' GROUP BY 1', params).fetchall()
+        conn.close()
+        return {tier: count for tier, count in rows}
+    
+    @staticmethod
+    def mark_sold(shopify_product_ids, user_id=None):
+        """Siparişteki ürünlerin son satış zamanını işaretle (stok kontrol sıklığı için)"""
+        ids = [str(pid) for pid in shopify_product_ids if pid]
+        if not ids:
+            return
+        placeholders = ','.join('?' * len(ids))
+        query = f'UPDATE products SET last_sold_at = ? WHERE shopify_id IN ({placeholders})'
+        params = [datetime.now(), *ids]
+        if user_id:
+            query += ' AND user_id = ?'
+            params.append(user_id)
+        conn = get_db_connection()
+        conn.execute(query, params)
+        conn.commit()
+        conn.close()
+    
+    @staticmethod
+    def mark_due_by_trendyol_id(trendyol_id, exclude_user_id=None):
+        """
+        Aynı Trendyol ürününü takip eden diğer kullanıcıların kayıtlarını hemen
+        kontrole al (paylaşılan gözlemde değişiklik olduğunda). Kaç satır
+        etkilendiğini döndürür.
+        """
+        query = 'UPDATE products SET next_check_at = ? WHERE trendyol_id = ? AND is_synced_to_shopify = 1'
+        params = [datetime.now(), trendyol_id]
+        if exclude_user_id:
+            query += ' AND user_id != ?'
+            params.append(exclude_user_id)
+        conn = get_db_connection()
+        updated = conn.execute(query, params).rowcount
+        conn.commit()
+        conn.close()
+        return updated
+    
+    @staticmethod
+    def get_synced_user_ids():
+        """
+        Shopify'a senkronize ürünü olan kullanıcılar. Zamanlayıcı bunu 30 sn'de bir
+        çağırır; products üzerinde DISTINCT taraması yerine kullanıcı başına tek
+        index araması yapılır (idx_products_user_synced).
+        """
+        conn = get_db_connection()
+        rows = conn.execute('''
+            SELECT id FROM users u
+            WHERE EXISTS (
+                SELECT 1 FROM products p WHERE p.user_id = u.id AND p.is_synced_to_shopify = 1
+            )
         ''').fetchall()
         conn.close()
-        return [dict(p) for p in products]
+        return [row[0] for row in rows]
+    
+    @staticmethod
+    def count(user_id=None, synced_only=False, due_before=None):
+        """Ürün sayısı - filtre yoksa sayaç tablosundan okunur"""
+        if not synced_only and not due_before:
+            return get_row_count('products', user_id)
+        conn = get_db_connection()
+        query = 'SELECT COUNT(*) FROM products WHERE is_synced_to_shopify = 1'
+        params = []
+        if user_id:
+            query += ' AND user_id = ?'
+            params.append(user_id)
+        if due_before:
+            clause, due_params = Product._due_filter(user_id, due_before)
+            query += clause
+            params.extend(due_params)
+        total = conn.execute(query, params).fetchone()[0]
+        conn.close()
+        return total
     
     @staticmethod
     def get_out_of_stock_products():
@@ -716,20 +994,16 @@ class Product:
         return [dict(p) for p in products]
     
     @staticmethod
-    def get_by_trendyol_id(trendyol_id):
+    def get_by_trendyol_id(trendyol_id, fields=None):
         """Trendyol ID ile ürün getir"""
+        columns = Product._select_columns(fields)
         conn = get_db_connection()
         product = conn.execute(
-            'SELECT * FROM products WHERE trendyol_id = ?', 
+            f'SELECT {columns} FROM products WHERE trendyol_id = ?', 
             (trendyol_id,)
         ).fetchone()
         conn.close()
-        if product:
-            prod = dict(product)
-            prod['images'] = json.loads(prod['images']) if prod['images'] else []
-            prod['variants'] = json.loads(prod['variants']) if prod['variants'] else []
-            return prod
-        return None
+        return Product._from_row(product) if product else None
 
 
 class Order:
@@ -760,83 +1034,119 @@ class Order:
         order_id = cursor.lastrowid
         conn.commit()
         conn.close()
+        
+        # Satılan ürünler daha sık stok kontrolüne alınır
+        Product.mark_sold(
+            [item.get('product_id') for item in data.get('order_items', []) if isinstance(item, dict)],
+            user_id=user_id
+        )
         return order_id
     
+    # Her siparişin en son kargo kaydı - tek sorguda, sipariş başına ayrı SELECT yok.
+    # En son kargonun id'si shipments(order_id, created_at) index'inden okunur.
+    _LATEST_SHIPMENT_QUERY = '''
+        SELECT page.*,
+               s.tracking_number AS _shipment_tracking_number,
+               s.carrier AS _shipment_carrier,
+               s.tracking_url AS _shipment_tracking_url,
+               s.status AS _shipment_status
+        FROM ({page_query}) AS page
+        LEFT JOIN shipments s ON s.id = (
+            SELECT id FROM shipments
+            WHERE order_id = page.id
+            ORDER BY created_at DESC, id DESC
+            LIMIT 1
+        )
+        {order_by}
+    '''
+    
     @staticmethod
-    def get_all(status=None, page=1, per_page=20, user_id=None):
-        conn = get_db_connection()
-        offset = (page - 1) * per_page
+    def _from_row(row, decode_json=True):
+        """Sipariş satırını dict'e çevir, kargo kolonlarını sipariş alanlarına taşı"""
+        order = dict(row)
+        tracking_number = order.pop('_shipment_tracking_number', None)
+        carrier = order.pop('_shipment_carrier', None)
+        tracking_url = order.pop('_shipment_tracking_url', None)
+        shipment_status = order.pop('_shipment_status', None)
+        
+        if decode_json:
+            order['shipping_address'] = json.loads(order['shipping_address']) if order['shipping_address'] else {}
+            order['order_items'] = json.loads(order['order_items']) if order['order_items'] else []
         
-        query = 'SELECT * FROM orders WHERE 1=1'
+        # Kargo bilgisini ekle (tracking_number NOT NULL, kargo yoksa None gelir)
+        if tracking_number is not None:
+            order['tracking_number'] = tracking_number
+            order['carrier'] = carrier
+            order['carrier_name'] = Shipment.CARRIERS.get(carrier or '', {}).get('name', '')
+            order['tracking_url'] = tracking_url
+            order['shipment_status'] = shipment_status
+        return order
+    
+    @staticmethod
+    def _list_query(status=None, user_id=None, position=None, page=1, per_page=20):
+        """Sipariş listesi sorgusu (sayfa + son kargo) ve parametreleri"""
+        page_query = 'SELECT * FROM orders WHERE 1=1'
         params = []
         
         if user_id:
-            query += ' AND user_id = ?'
+            page_query += ' AND user_id = ?'
             params.append(user_id)
         
         if status:
-            query += ' AND status = ?'
+            page_query += ' AND status = ?'
             params.append(status)
         
-        query += ' ORDER BY created_at DESC LIMIT ? OFFSET ?'
-        params.extend([per_page, offset])
+        page_query, params = keyset_page(page_query, params, position, page, per_page)
+        query = Order._LATEST_SHIPMENT_QUERY.format(
+            page_query=page_query, order_by='ORDER BY page.created_at DESC, page.id DESC'
+        )
+        return query, params
+    
+    @staticmethod
+    def get_all(status=None, page=1, per_page=20, user_id=None, decode_json=True, cursor=None):
+        """
+        Sipariş listesi (son kargo bilgisiyle birlikte).
+        decode_json=False ise shipping_address / order_items ham JSON string olarak kalır;
+        sadece sayım veya özet gereken yerlerde decode maliyetinden kaçınılır.
+        cursor verilirse OFFSET yerine (created_at, id) keyset sayfalama kullanılır.
+        """
+        position = decode_cursor(cursor) if cursor else None
+        query, params = Order._list_query(status, user_id, position, page, per_page)
         
+        conn = get_db_connection()
         orders = conn.execute(query, params).fetchall()
-        
-        result = []
-        for o in orders:
-            order = dict(o)
-            order['shipping_address'] = json.loads(order['shipping_address']) if order['shipping_address'] else {}
-            order['order_items'] = json.loads(order['order_items']) if order['order_items'] else []
-            
-            # Kargo bilgisini ekle
-            shipment = conn.execute(
-                'SELECT * FROM shipments WHERE order_id = ? ORDER BY created_at DESC LIMIT 1',
-                (order['id'],)
-            ).fetchone()
-            if shipment:
-                shipment_data = dict(shipment)
-                order['tracking_number'] = shipment_data.get('tracking_number')
-                order['carrier'] = shipment_data.get('carrier')
-                order['carrier_name'] = Shipment.CARRIERS.get(shipment_data.get('carrier', ''), {}).get('name', '')
-                order['tracking_url'] = shipment_data.get('tracking_url')
-                order['shipment_status'] = shipment_data.get('status')
-            
-            result.append(order)
-        
         conn.close()
-        return result
+        return [Order._from_row(o, decode_json) for o in orders]
+    
+    @staticmethod
+    def count(status=None, user_id=None):
+        """Sipariş sayısı - durum filtresi yoksa sayaç tablosundan okunur"""
+        if not status:
+            return get_row_count('orders', user_id)
+        conn = get_db_connection()
+        query = 'SELECT COUNT(*) FROM orders WHERE status = ?'
+        params = [status]
+        if user_id:
+            query += ' AND user_id = ?'
+            params.append(user_id)
+        total = conn.execute(query, params).fetchone()[0]
+        conn.close()
+        return total
     
     @staticmethod
     def get_by_id(order_id, user_id=None):
         conn = get_db_connection()
         if user_id:
-            order = conn.execute('SELECT * FROM orders WHERE id = ? AND user_id = ?', (order_id, user_id)).fetchone()
+            page_query = 'SELECT * FROM orders WHERE id = ? AND user_id = ?'
+            params = (order_id, user_id)
         else:
-            order = conn.execute('SELECT * FROM orders WHERE id = ?', (order_id,)).fetchone()
+            page_query = 'SELECT * FROM orders WHERE id = ?'
+            params = (order_id,)
         
-        if order:
-            o = dict(order)
-            o['shipping_address'] = json.loads(o['shipping_address']) if o['shipping_address'] else {}
-            o['order_items'] = json.loads(o['order_items']) if o['order_items'] else []
-            
-            # Kargo bilgisini ekle
-            shipment = conn.execute(
-                'SELECT * FROM shipments WHERE order_id = ? ORDER BY created_at DESC LIMIT 1',
-                (order_id,)
-            ).fetchone()
-            if shipment:
-                shipment_data = dict(shipment)
-                o['tracking_number'] = shipment_data.get('tracking_number')
-                o['carrier'] = shipment_data.get('carrier')
-                o['carrier_name'] = Shipment.CARRIERS.get(shipment_data.get('carrier', ''), {}).get('name', '')
-                o['tracking_url'] = shipment_data.get('tracking_url')
-                o['shipment_status'] = shipment_data.get('status')
-            
-            conn.close()
-            return o
+        query = Order._LATEST_SHIPMENT_QUERY.format(page_query=page_query, order_by='')
+        order = conn.execute(query, params).fetchone()
         conn.close()
-        return None
+        return Order._from_row(order) if order else None
     
     @staticmethod
     def update_status(order_id, status, notes=None, user_id=None):
@@ -1073,6 +1383,92 @@ class Settings:
         return result
 
 
+class SyncCheckpoint:
+    """Toplu işlerin kaldığı son id (çökme / yeniden başlatma sonrası devam için)"""
+    
+    @staticmethod
+    def get(job, user_id=None):
+        conn = get_db_connection()
+        row = conn.execute(
+            'SELECT * FROM sync_checkpoints WHERE job = ? AND user_id = ?',
+            (job, user_id or 0)
+        ).fetchone()
+        conn.close()
+        return dict(row) if row else None
+    
+    @staticmethod
+    def save(job, last_id, processed=0, started_at=None, user_id=None):
+        conn = get_db_connection()
+        conn.execute('''
+            INSERT INTO sync_checkpoints (job, user_id, last_id, processed, started_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(job, user_id) DO UPDATE SET
+                last_id = excluded.last_id, processed = excluded.processed,
+                started_at = COALESCE(sync_checkpoints.started_at, excluded.started_at),
+                updated_at = excluded.updated_at
+        ''', (job, user_id or 0, last_id, processed, started_at, datetime.now()))
+        conn.commit()
+        conn.close()
+    
+    @staticmethod
+    def clear(job, user_id=None):
+        conn = get_db_connection()
+        conn.execute('DELETE FROM sync_checkpoints WHERE job = ? AND user_id = ?', (job, user_id or 0))
+        conn.commit()
+        conn.close()
+
+
+class TrendyolObservation:
+    """trendyol_id başına son stok/fiyat gözlemi (tüm kullanıcılar için ortak)"""
+    
+    @staticmethod
+    def get(trendyol_id, max_age_seconds):
+        """max_age_seconds'tan eski değilse gözlemi döndür, yoksa None"""
+        conn = get_db_connection()
+        row = conn.execute(
+            'SELECT * FROM trendyol_observations WHERE trendyol_id = ? AND observed_at >= ?',
+            (trendyol_id, datetime.now() - timedelta(seconds=max_age_seconds))
+        ).fetchone()
+        conn.close()
+        if not row:
+            return None
+        return {
+            'in_stock': bool(row['in_stock']),
+            'price': row['price'] or 0,
+            'original_price': row['original_price'] or 0,
+            'variants': json.loads(row['variants']) if row['variants'] else [],
+            'last_checked': str(row['observed_at'])
+        }
+    
+    @staticmethod
+    def save(trendyol_id, stock_info):
+        """
+        Gözlemi kaydet. Önceki gözleme göre stok durumu veya fiyat değiştiyse
+        True döner (ilk gözlemde False). Fiyatsız sonuç (ör. ürün kaldırılmış)
+        fiyat değişikliği sayılmaz.
+        """
+        in_stock = bool(stock_info.get('in_stock'))
+        price = stock_info.get('price') or 0
+        conn = get_db_connection()
+        previous = conn.execute(
+            'SELECT in_stock, price FROM trendyol_observations WHERE trendyol_id = ?', (trendyol_id,)
+        ).fetchone()
+        conn.execute('''
+            INSERT INTO trendyol_observations (trendyol_id, in_stock, price, original_price, variants, observed_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(trendyol_id) DO UPDATE SET
+                in_stock = excluded.in_stock, price = excluded.price,
+                original_price = excluded.original_price, variants = excluded.variants,
+                observed_at = excluded.observed_at
+        ''', (trendyol_id, in_stock, price, stock_info.get('original_price'),
+              json.dumps(stock_info.get('variants') or [], ensure_ascii=False), datetime.now()))
+        conn.commit()
+        conn.close()
+        if not previous:
+            return False
+        return bool(previous['in_stock']) != in_stock or (price > 0 and abs((previous['price'] or 0) - price) > 0.01)
+
+
 class ActivityLog:
     """Aktivite log modeli"""
     
@@ -0,0 +1,307 @@
+"""
+SQL Sorgu Zamanlaması ve Yavaş Sorgu Logu
+models.get_db_connection'ın döndürdüğü bağlantılardaki her ifadeyi zamanlar
+
+Her ifade (execute + o ifadeye ait fetchone/fetchmany/fetchall süresi) bir
+fingerprint'e indirgenir: yorumlar atılır, string/sayı literal'leri ve
+IN (?, ?, ...) listeleri tek '?' olur, boşluklar sadeleşir. Fingerprint başına
+sayı, toplam/maksimum süre ve son N ölçümden p95 tutulur. Eşiği aşan ifadeler
+sorgu planıyla (EXPLAIN QUERY PLAN) birlikte loglanır.
+
+İstatistikler süreç başınadır; birden fazla uvicorn worker'ı varsa her biri
+kendi sayılarını tutar.
+
+Not: satır satır iterasyon (for row in cursor) zamanlanmaz; satır başına
+Python çağrısı maliyeti eklememek için yalnızca fetch* metotları ölçülür.
+"""
+import hashlib
+import logging
+import re
+import sqlite3
+import threading
+import time
+import weakref
+from collections import deque
+from datetime import datetime
+from functools import lru_cache
+from config import QUERY_LOG_CONFIG
+
+logger = logging.getLogger(__name__)
+
+_COMMENT = re.compile(r'--[^\n]*|/\*.*?\*/', re.S)
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_SPACE = re.compile(r'\s+')
+# EXPLAIN QUERY PLAN yalnızca bu ifadeler için çalıştırılır
+EXPLAINABLE = ('SELECT', 'WITH', 'UPDATE', 'DELETE', 'INSERT')
+OTHER_FINGERPRINT = '<diğer>'
+
+
+@lru_cache(maxsize=4096)
+def normalize_sql(sql):
+    """SQL'i literal'lerden arındırılmış fingerprint metnine çevir"""
+    text = _COMMENT.sub(' ', sql)
+    text = _STRING.sub('?', text)
+    text = _NUMBER.sub('?', text)
+    text = _SPACE.sub(' ', text).strip()
+    return _IN_LIST.sub('(?)', text)
+
+def fingerprint_id(fingerprint):
+    """Fingerprint için kısa, kararlı kimlik (log ve endpoint'te referans)"""
+    return hashlib.md5(fingerprint.encode('utf-8')).hexdigest()[:12]
+
+def explain_plan(conn, sql, params):
+    """İfadenin sorgu planı (detay satırları); planlanamıyorsa None"""
+    if params is None or not sql.lstrip().upper().startswith(EXPLAINABLE):
+        return None
+    try:
+        # Düz sqlite3.Cursor: plan sorgusu istatistiklere yazılmaz
+        rows = sqlite3.Cursor(conn).execute(f'EXPLAIN QUERY PLAN {sql}', params).fetchall()
+    except sqlite3.Error:
+        return None
+    return [row[3] for row in rows]
+
+
+class QueryStat:
+    """Tek fingerprint'in birikmiş istatistiği"""
+    __slots__ = ('id', 'fingerprint', 'count', 'total_ms', 'max_ms', 'slow_count', 'samples', 'plan', 'last_seen')
+    
+    def __init__(self, fingerprint, window):
+        self.id = fingerprint_id(fingerprint)
+        self.fingerprint = fingerprint
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.slow_count = 0
+        self.samples = deque(maxlen=window)
+        self.plan = None
+        self.last_seen = None
+    
+    def to_dict(self):
+        ordered = sorted(self.samples)
+        p95 = ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))] if ordered else 0.0
+        return {
+            'id': self.id,
+            'fingerprint': self.fingerprint,
+            'count': self.count,
+            'total_ms': round(self.total_ms, 2),
+            'mean_ms': round(self.total_ms / self.count, 3) if self.count else 0.0,
+            'p95_ms': round(p95, 3),
+            'max_ms': round(self.max_ms, 3),
+            'slow_count': self.slow_count,
+            'plan': self.plan,
+            'last_seen': datetime.fromtimestamp(self.last_seen).isoformat() if self.last_seen else None
+        }
+
+
+class QueryStats:
+    """
+    Süreç geneli sorgu istatistikleri
+    
+    Tüm bağlantılar aynı nesneye yazar (thread-safe). Fingerprint sayısı
+    max_fingerprints ile sınırlıdır; sonrası '<diğer>' altında toplanır.
+    """
+    
+    SORT_KEYS = ('total_ms', 'count', 'p95_ms', 'max_ms', 'mean_ms', 'slow_count')
+    
+    def __init__(self, slow_query_ms=None, window=None, max_fingerprints=None, slow_log_size=None):
+        self.slow_query_ms = QUERY_LOG_CONFIG['slow_query_ms'] if slow_query_ms is None else slow_query_ms
+        self.window = window or QUERY_LOG_CONFIG['sample_window']
+        self.max_fingerprints = max_fingerprints or QUERY_LOG_CONFIG['max_fingerprints']
+        self.slow_log = deque(maxlen=slow_log_size or QUERY_LOG_CONFIG['slow_log_size'])
+        self._stats = {}
+        self._lock = threading.Lock()
+        self.since = datetime.now().isoformat()
+    
+    def record(self, sql, elapsed_ms, params=None, conn=None):
+        """Tamamlanan bir ifadeyi kaydet; eşiği aşarsa planıyla logla"""
+        fingerprint = normalize_sql(sql)
+        with self._lock:
+            stat = self._stats.get(fingerprint)
+            if stat is None:
+                if len(self._stats) >= self.max_fingerprints:
+                    fingerprint = OTHER_FINGERPRINT
+                    stat = self._stats.get(fingerprint)
+                if stat is None:
+                    stat = self._stats[fingerprint] = QueryStat(fingerprint, self.window)
+            stat.count += 1
+            stat.total_ms += elapsed_ms
+            stat.max_ms = max(stat.max_ms, elapsed_ms)
+            stat.samples.append(elapsed_ms)
+            stat.last_seen = time.time()
+            slow = elapsed_ms >= self.slow_query_ms
+            if slow:
+                stat.slow_count += 1
+            needs_plan = slow and stat.plan is None and conn is not None
+        
+        if not slow:
+            return
+        # Plan fingerprint başına bir kez çıkarılır (kilit dışında, aynı bağlantıda)
+        if needs_plan:
+            stat.plan = explain_plan(conn, sql, params)
+        plan = ' / '.join(stat.plan) if stat.plan else '-'
+        self.slow_log.append({
+            'id': stat.id,
+            'fingerprint': fingerprint,
+            'ms': round(elapsed_ms, 2),
+            'at': datetime.now().isoformat(),
+            'plan': stat.plan
+        })
+        logger.warning(f"🐢 Yavaş sorgu {elapsed_ms:.1f} ms [{stat.id}]: {fingerprint[:500]} | plan: {plan}")
+    
+    def get_stats(self, sort='total_ms', limit=50):
+        """En maliyetli fingerprint'ler + özet"""
+        if sort not in self.SORT_KEYS:
+            raise ValueError(f"Geçersiz sıralama: {sort} ({', '.join(self.SORT_KEYS)})")
+        with self._lock:
+            entries = [stat.to_dict() for stat in self._stats.values()]
+            slow = list(self.slow_log)
+        total_ms = sum(e['total_ms'] for e in entries)
+        for entry in entries:
+            entry['share'] = round(entry['total_ms'] / total_ms, 4) if total_ms else 0.0
+        entries.sort(key=lambda e: e[sort], reverse=True)
+        return {
+            'enabled': QUERY_LOG_CONFIG['enabled'],
+            'since': self.since,
+            'slow_query_ms': self.slow_query_ms,
+            'statements': sum(e['count'] for e in entries),
+            'total_ms': round(total_ms, 2),
+            'fingerprints': len(entries),
+            'queries': entries[:limit],
+            'slow_queries': slow[-limit:][::-1]
+        }
+    
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self.slow_log.clear()
+            self.since = datetime.now().isoformat()
+
+
+query_stats = QueryStats()
+
+
+# ==================== BAĞLANTI KATMANI ====================
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """
+    İfade süresini (execute + fetch*) toplayıp query_stats'a yazan cursor
+    
+    İfade; sonuç tükenince (fetchall, boş fetchone/fetchmany), cursor yeni bir
+    ifade çalıştırınca, kapanınca veya bağlantı kapanınca kaydedilir.
+    """
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._sql = None
+        self._params = None
+        self._elapsed = 0.0
+    
+    def _start(self, sql, params):
+        self._finish()
+        self._sql = sql
+        self._params = params
+        self._elapsed = 0.0
+    
+    def _finish(self):
+        sql = getattr(self, '_sql', None)
+        if sql is None:
+            return
+        self._sql = None
+        query_stats.record(sql, self._elapsed * 1000, self._params, self.connection)
+    
+    def execute(self, sql, parameters=()):
+        self._start(sql, parameters)
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._elapsed += time.perf_counter() - started
+    
+    def executemany(self, sql, seq_of_parameters):
+        self._start(sql, None)
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._elapsed += time.perf_counter() - started
+    
+    def executescript(self, sql_script):
+        self._start(sql_script, None)
+        started = time.perf_counter()
+        try:
+            return super().executescript(sql_script)
+        finally:
+            self._elapsed += time.perf_counter() - started
+            self._finish()
+    
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        self._elapsed += time.perf_counter() - started
+        if row is None:
+            self._finish()
+        return row
+    
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        started = time.perf_counter()
+        rows = super().fetchmany(size)
+        self._elapsed += time.perf_counter() - started
+        if len(rows) < size:
+            self._finish()
+        return rows
+    
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self._elapsed += time.perf_counter() - started
+        self._finish()
+        return rows
+    
+    def close(self):
+        self._finish()
+        super().close()
+    
+    def __del__(self):
+        try:
+            self._finish()
+        except Exception:
+            pass
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """sqlite3.connect(..., factory=InstrumentedConnection) - execute* ve commit zamanlanır"""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._cursors = weakref.WeakSet()
+    
+    def cursor(self, factory=None):
+        cursor = super().cursor(factory or InstrumentedCursor)
+        if isinstance(cursor, InstrumentedCursor):
+            self._cursors.add(cursor)
+        return cursor
+    
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+    
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+    
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+    
+    def commit(self):
+        if not self.in_transaction:
+            return super().commit()
+        started = time.perf_counter()
+        super().commit()
+        query_stats.record('COMMIT', (time.perf_counter() - started) * 1000)
+    
+    def close(self):
+        # Açık cursor'lardaki ifadeler plan çıkarılabilirken kaydedilsin
+        for cursor in list(self._cursors):
+            cursor._finish()
+        super().close()
@@ -18,7 +18,9 @@ class ShopifyAPI:
         self.shop_name = shop_name or SHOPIFY_CONFIG['shop_name']
         self.access_token = access_token or SHOPIFY_CONFIG['access_token']
         self.api_version = SHOPIFY_CONFIG['api_version']
-        self.base_url = f"https://{self.shop_name}/admin/api/{self.api_version}"
+        # Şemalı adres (ör: http://127.0.0.1:8766) yerel test sunucusu için olduğu gibi kullanılır
+        shop_url = self.shop_name if '://' in self.shop_name else f"https://{self.shop_name}"
+        self.base_url = f"{shop_url.rstrip('/')}/admin/api/{self.api_version}"
         
         self.headers = {
             'Content-Type': 'application/json',
@@ -1,30 +1,363 @@
 """
 Canlı Stok Senkronizasyon Modülü
 Trendyol'dan stok bilgilerini çeker ve Shopify'ı günceller
+
+Otomatik senkronizasyon kullanıcı (tenant) bazlıdır: her kullanıcının kendi
+stock_sync_interval ayarı vardır ve sırası gelen kullanıcılar ağırlıklı adil
+kuyrukta (deficit round robin) sırayla işlenir. Her turda kullanıcı başına
+en fazla FAIR_QUANTUM * ağırlık ürün kontrol edilir; 50 bin ürünlü bir
+katalog küçük bir kullanıcının senkronizasyonunu bekletmez.
+
+Zamanlayıcı her turda sadece kontrol zamanı gelmiş ürünlere bakar. Ürünler
+değişkenliklerine göre hot/warm/cold katmanlarına ayrılır: stok/fiyatı sık
+değişen veya yakın zamanda satılan ürünler her aralıkta, hiç değişmeyenler
+STOCK_SYNC_CONFIG'teki çarpan kadar seyrek kontrol edilir.
+
+Trendyol gözlemleri trendyol_id bazında tüm kullanıcılar arasında paylaşılır:
+aynı ürünü takip eden kullanıcılar TTL süresi içinde tek bir productDetail
+isteğinin sonucunu kullanır. Trendyol'a giden istek sayısı kullanıcı x ürün
+değil, benzersiz ürün sayısıyla büyür.
+
+Stok durumu öğrenilemeyen ürünler ("unknown") için stok/fiyat ne veritabanına ne
+de Shopify'a yazılır; sadece next_check_at şimdiye çekilir ki checkpoint'ten devam
+eden veya tüm katalogu tarayan bir çalışmada atlansalar da bir sonraki turda
+tekrar kontrol edilsinler. Trendyol devre kesicisi açıldığında senkronizasyon durur
+ve devre tekrar denemeye izin verince kaldığı yerden devam eder.
 """
 import threading
 import time
 import logging
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from typing import Callable, Optional
 
-from trendyol_scraper import get_scraper
-from shopify_api import get_shopify_api
-from models import Product, ActivityLog, Settings
+from trendyol_scraper import get_scraper, is_unknown
+from shopify_api import get_shopify_api, ShopifyAPI
+from models import Product, ActivityLog, Settings, SyncCheckpoint, ShopifyStore, TrendyolObservation
+from config import STOCK_SYNC_CONFIG
 
 logger = logging.getLogger(__name__)
 
+# sync_checkpoints tablosundaki iş adları: tam senkronizasyon (manuel) ve sadece
+# zamanı gelen ürünler (zamanlayıcı) ayrı; biri yarıda kalırsa diğeri onun
+# kaldığı id'den devam edip aradaki ürünleri atlamaz
+CHECKPOINT_JOB = 'stock_sync'
+CHECKPOINT_JOB_DUE = 'stock_sync_due'
+# Kaç üründe bir kaldığı yer kaydedilir (çökmede en fazla bu kadar ürün tekrar kontrol edilir)
+CHECKPOINT_EVERY = 25
+# Ürünler veritabanından bu boyutta parçalarla okunur
+SYNC_BATCH_SIZE = 500
+# Sonuçta tutulan en fazla detay satırı (büyük kataloglarda bellek sınırlı kalsın)
+MAX_RESULT_DETAILS = 200
+# Adil kuyrukta bir turda ağırlık başına kontrol edilen ürün sayısı
+FAIR_QUANTUM = 20
+# Kullanıcı ağırlığı sınırları (stock_sync_weight ayarı)
+MIN_WEIGHT, MAX_WEIGHT = 1, 10
+# Sırası gelen kullanıcılar için kontrol aralığı (saniye)
+SCHEDULE_CHECK_SECONDS = 30
+# Trendyol'a giden her stok isteğinden sonra bekleme (saniye)
+REQUEST_DELAY = 0.2
+# Değişkenlik katmanları (sık değişenden seyreğe)
+CHECK_TIERS = ('hot', 'warm', 'cold')
+
+
+def _parse_time(value) -> Optional[datetime]:
+    if not value or isinstance(value, datetime):
+        return value or None
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+
+
+def assign_tier(change_score: float, last_sold_at=None, now: Optional[datetime] = None) -> str:
+    """
+    Ürünün değişkenlik katmanı: yakın zamanda satılan veya değişim skoru
+    yüksek ürün hot, skoru çok düşük olan cold, arası warm.
+    """
+    now = now or datetime.now()
+    sold = _parse_time(last_sold_at)
+    if sold and now - sold <= timedelta(days=STOCK_SYNC_CONFIG['sales_window_days']):
+        return 'hot'
+    if change_score >= STOCK_SYNC_CONFIG['hot_score']:
+        return 'hot'
+    if change_score >= STOCK_SYNC_CONFIG['warm_score']:
+        return 'warm'
+    return 'cold'
+
+
+def next_check_time(tier: str, interval_minutes: int, now: Optional[datetime] = None) -> datetime:
+    """Katmanın çarpanına göre bir sonraki kontrol zamanı"""
+    multiplier = STOCK_SYNC_CONFIG['tier_interval_multipliers'].get(tier, 1)
+    return (now or datetime.now()) + timedelta(minutes=interval_minutes * multiplier)
+
+
+def empty_tier_stats() -> dict:
+    """Katman başına kontrol ve değişiklik sayaçları"""
+    return {tier: {'checks': 0, 'changes': 0} for tier in CHECK_TIERS}
+
+
+def merge_tier_stats(target: dict, source: dict):
+    for tier, stats in source.items():
+        bucket = target.setdefault(tier, {'checks': 0, 'changes': 0})
+        bucket['checks'] += stats['checks']
+        bucket['changes'] += stats['changes']
+
+
+class TenantSyncRun:
+    """
+    Bir kullanıcının (veya user_id=None ile tüm ürünlerin) devam eden senkronizasyonu.
+    step() ile parça parça ilerletilir; tamamlanınca done=True olur.
+    """
+    
+    def __init__(self, manager: 'StockSyncManager', user_id: Optional[int] = None,
+                 resume: bool = True, progress_callback: Optional[Callable] = None,
+                 due_only: bool = False):
+        """
+        Args:
+            due_only: Sadece kontrol zamanı gelmiş ürünler (zamanlayıcı). False ise
+                tüm senkronize ürünler kontrol edilir (manuel senkronizasyon).
+        """
+        self.manager = manager
+        self.scraper = manager.scraper
+        self.user_id = user_id
+        self.progress_callback = progress_callback
+        self.checkpoint_job = CHECKPOINT_JOB_DUE if due_only else CHECKPOINT_JOB
+        
+        checkpoint = SyncCheckpoint.get(self.checkpoint_job, user_id) if resume else None
+        self.after_id = checkpoint['last_id'] if checkpoint else 0
+        self.processed = checkpoint['processed'] if checkpoint else 0
+        self.started_at = checkpoint['started_at'] if checkpoint else datetime.now()
+        
+        # Çalışma başındaki an; bu andan sonra zamanı gelenler bir sonraki tura kalır
+        self.due_before = datetime.now() if due_only else None
+        
+        # İlerleme için toplam (satırları yüklemeden sayılır)
+        self.total = Product.count(user_id=user_id, synced_only=True, due_before=self.due_before)
+        self.done = not self.total
+        
+        self.results = {
+            'total_checked': 0,
+            'in_stock': 0,
+            'out_of_stock': 0,
+            'price_changes': 0,
+            'shopify_updated': 0,
+            'shopify_failed': 0,
+            'errors': 0,
+            'unknown': 0,
+            'resumed_from_id': self.after_id,
+            'details': []
+        }
+        self.tier_stats = empty_tier_stats()
+        
+        self.shopify_api = self._get_shopify_api()
+        # Trendyol devre kesicisi açıldığı için durduruldu
+        self.paused = False
+        
+        # Ayarlar tüm çalışma boyunca aynı - ürün başına okunmaz
+        self.hide_out_of_stock = Settings.get('hide_out_of_stock', True, user_id=user_id)
+        self.auto_price_update = Settings.get('auto_price_update', True, user_id=user_id)
+        self.default_margin = Settings.get('profit_margin', 50, user_id=user_id)
+        try:
+            self.interval_minutes = max(1, int(Settings.get(
+                'stock_sync_interval', manager.sync_interval // 60, user_id=user_id
+            )))
+        except (TypeError, ValueError):
+            self.interval_minutes = manager.sync_interval // 60
+        
+        self._products = Product.iter_synced_products(
+            batch_size=SYNC_BATCH_SIZE, user_id=user_id, after_id=self.after_id,
+            due_before=self.due_before
+        )
+    
+    def _get_shopify_api(self):
+        """Kullanıcının varsayılan mağazası, yoksa genel yapılandırma"""
+        try:
+            if self.user_id:
+                store = ShopifyStore.get_default(self.user_id)
+                if store:
+                    return ShopifyAPI(store['shop_name'], store['access_token'])
+            return get_shopify_api()
+        except Exception as e:
+            logger.warning(f"Shopify API bağlantısı kurulamadı: {e}")
+            return None
+    
+    def _add_detail(self, product_name: str, action: str):
+        if len(self.results['details']) < MAX_RESULT_DETAILS:
+            self.results['details'].append({'product': product_name, 'action': action})
+    
+    def step(self, limit: int) -> int:
+        """En fazla limit ürün kontrol et, kontrol edilen sayıyı döndür"""
+        count = 0
+        self.paused = False
+        while count < limit and not self.done:
+            if self.scraper.stock_circuit.retry_after() > 0:
+                self.paused = True
+                break
+            
+            product = next(self._products, None)
+            if product is None:
+                self.done = True
+                break
+            
+            self.processed += 1
+            count += 1
+            self._check_product(product)
+            
+            self.after_id = product['id']
+            if self.processed % CHECKPOINT_EVERY == 0:
+                self.save_checkpoint()
+        return count
+    
+    def save_checkpoint(self):
+        """Kaldığı id'yi bu çalışma türünün checkpoint'ine yaz"""
+        SyncCheckpoint.save(self.checkpoint_job, self.after_id, self.processed,
+                            self.started_at, user_id=self.user_id)
+    
+    def _check_product(self, product):
+        """Tek ürünün stok/fiyat kontrolü ve gerekiyorsa Shopify güncellemesi"""
+        results = self.results
+        shopify_api = self.shopify_api
+        try:
+            trendyol_id = product.get('trendyol_id')
+            shopify_id = product.get('shopify_id')
+            product_name = product.get('name', 'Bilinmeyen')
+            old_price = product.get('trendyol_price', 0)
+            
+            if self.progress_callback:
+                self.progress_callback(self.processed, self.total, product_name)
+            
+            # Trendyol'dan canlı stok bilgisi al (taze ortak gözlem varsa o kullanılır)
+            stock_info = self.manager.get_stock_observation(trendyol_id, user_id=self.user_id)
+            
+            # Bilinmiyor: eski durum korunur, Shopify'a dokunulmaz. Checkpoint bu ürünü
+            # geçse de bir sonraki sırası gelenler turunda tekrar kontrol edilir
+            # (bu turun due_before'undan sonra olduğu için aynı turda tekrar seçilmez)
+            if is_unknown(stock_info):
+                Product.reschedule_check(product['id'], datetime.now())
+                results['unknown'] += 1
+                self._add_detail(product_name, f"Stok bilgisi alınamadı ({stock_info.get('error', 'bilinmiyor')})")
+                return
+            
+            in_stock = stock_info.get('in_stock', False)
+            new_price = stock_info.get('price', 0)
+            
+            # Değişkenlik: stok durumu veya fiyat değiştiyse skor artar, değişmediyse söner
+            changed = (
+                in_stock != (product.get('stock_status') == 'in_stock')
+                or (new_price > 0 and abs(new_price - (old_price or 0)) > 0.01)
+            )
+            now = datetime.now()
+            tier = product.get('check_tier') or 'warm'
+            alpha = STOCK_SYNC_CONFIG['change_score_alpha']
+            change_score = alpha * changed + (1 - alpha) * (product.get('change_score') or 0)
+            new_tier = assign_tier(change_score, product.get('last_sold_at'), now)
+            
+            # Veritabanını güncelle
+            Product.update_stock_status(product['id'], in_stock, new_price, schedule={
+                'check_tier': new_tier,
+                'change_score': round(change_score, 4),
+                'next_check_at': next_check_time(new_tier, self.interval_minutes, now),
+                'changed': changed
+            })
+            
+            results['total_checked'] += 1
+            # Ürünü kontrole seçen katmanın isabet oranı için
+            stats = self.tier_stats.setdefault(tier, {'checks': 0, 'changes': 0})
+            stats['checks'] += 1
+            stats['changes'] += changed
+            
+            if in_stock:
+                results['in_stock'] += 1
+            else:
+                results['out_of_stock'] += 1
+                
+                # Shopify'da ürünü gizle (ayar aktifse)
+                if shopify_api and shopify_id and self.hide_out_of_stock:
+                    try:
+                        # Hata durumunda None döner (ör. 429 çağrı limiti)
+                        if shopify_api.set_product_status(shopify_id, active=False) is not None:
+                            results['shopify_updated'] += 1
+                            self._add_detail(product_name, 'Stokta yok - Shopify\'da gizlendi')
+                        else:
+                            results['shopify_failed'] += 1
+                            self._add_detail(product_name, 'Stokta yok (Shopify güncellenemedi)')
+                    except Exception as e:
+                        results['shopify_failed'] += 1
+                        logger.error(f"Shopify güncelleme hatası: {e}")
+            
+            # Fiyat değişikliği kontrolü
+            if new_price > 0 and abs(new_price - old_price) > 0.01:
+                results['price_changes'] += 1
+                
+                # Yeni Shopify fiyatını hesapla ve güncelle (ayar aktifse)
+                if shopify_api and shopify_id and in_stock and self.auto_price_update:
+                    try:
+                        # Kar marjını al
+                        profit_margin = product.get('profit_margin') or self.default_margin
+                        
+                        # Yeni fiyatı hesapla (kar marjı + USD dönüşümü)
+                        new_shopify_price = self.scraper.calculate_shopify_price(
+                            new_price,
+                            profit_margin=profit_margin,
+                            to_usd=True
+                        )
+                        
+                        old_shopify_price = product.get('shopify_price') or 0
+                        
+                        # Shopify'da fiyatı güncelle (hata durumunda None döner)
+                        if not shopify_api.update_product_inventory_and_price(
+                            shopify_id,
+                            price=new_shopify_price
+                        ):
+                            raise RuntimeError(f"Shopify ürünü {shopify_id} güncellenemedi")
+                        
+                        # Veritabanında Shopify fiyatını güncelle
+                        Product.update_shopify_price(product['id'], new_shopify_price)
+                        
+                        results['shopify_updated'] += 1
+                        self._add_detail(product_name, f'Fiyat güncellendi: {old_price}₺→{new_price}₺ (Shopify: ${old_shopify_price:.2f}→${new_shopify_price:.2f})')
+                        logger.info(f"Fiyat güncellendi: {product_name} - Shopify: ${new_shopify_price:.2f}")
+                    except Exception as e:
+                        results['shopify_failed'] += 1
+                        logger.error(f"Shopify fiyat güncelleme hatası: {e}")
+                        self._add_detail(product_name, f'Fiyat değişti: {old_price}₺ → {new_price}₺ (Shopify güncellenemedi)')
+                else:
+                    self._add_detail(product_name, f'Fiyat değişti: {old_price}₺ → {new_price}₺')
+            
+            # Rate limiting (sadece Trendyol'a istek gittiyse)
+            if not stock_info.get('cached'):
+                time.sleep(REQUEST_DELAY)
+        
+        except Exception as e:
+            results['errors'] += 1
+            logger.error(f"Ürün senkronizasyon hatası: {e}")
+    
+    def finish(self) -> dict:
+        """Checkpoint'i temizle ve aktivite logu yaz"""
+        # Tamamlandı - bir sonraki çalışma baştan başlar
+        SyncCheckpoint.clear(self.checkpoint_job, self.user_id)
+        
+        results = self.results
+        ActivityLog.create(
+            action='stock_sync',
+            details=f"Kontrol: {results['total_checked']}, Stokta yok: {results['out_of_stock']}, Fiyat değişimi: {results['price_changes']}",
+            status='success' if results['errors'] == 0 else 'warning',
+            user_id=self.user_id
+        )
+        return results
+
 
 class StockSyncManager:
     """
     Otomatik stok senkronizasyon yöneticisi
-    Arka planda çalışarak stoğu güncel tutar
+    Arka planda çalışarak her kullanıcının stoğunu kendi aralığında güncel tutar
     """
     
     def __init__(self, sync_interval_minutes: int = 30):
         """
         Args:
-            sync_interval_minutes: Senkronizasyon aralığı (dakika)
+            sync_interval_minutes: Varsayılan senkronizasyon aralığı (dakika)
         """
         self.sync_interval = sync_interval_minutes * 60  # saniyeye çevir
         self.is_running = False
@@ -39,6 +372,21 @@ class StockSyncManager:
         }
         self._progress_callback = None
         self._status_callback = None
+        
+        # Kullanıcı bazlı zamanlama: user_id -> durum
+        self.tenants = {}
+        # Adil kuyruk: user_id -> TenantSyncRun (ekleme sırasıyla)
+        self.run_queue = OrderedDict()
+        # sync_all_products ile çağıran thread'de çalışan kullanıcılar (None = tümü)
+        self._active_users = set()
+        self._deficits = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._next_schedule_check = 0
+        # Katman başına toplam kontrol/değişiklik (değişiklik yakalama oranı için)
+        self.tier_stats = empty_tier_stats()
+        # Ortak gözlem deposu: önbellekten / Trendyol'dan / diğer kullanıcılara yayılan
+        self.observation_stats = {'hits': 0, 'fetches': 0, 'fanned_out': 0}
     
     def set_progress_callback(self, callback: Callable):
         """İlerleme callback'i ayarla"""
@@ -54,162 +402,297 @@ class StockSyncManager:
             self._status_callback(message)
         logger.info(message)
     
-    def sync_all_products(self, progress_callback: Optional[Callable] = None) -> dict:
+    def sync_all_products(self, progress_callback: Optional[Callable] = None,
+                          user_id: Optional[int] = None, resume: bool = True) -> dict:
         """
-        Tüm senkronize edilmiş ürünlerin stokunu kontrol et
+        Tüm senkronize edilmiş ürünlerin stokunu kontrol et (çağıran thread'de, sonuna kadar)
+        
+        Ürünler id sırasıyla parça parça okunur; iş hemen başlar ve bellek ürün
+        sayısından bağımsızdır. Kaldığı id periyodik olarak kaydedilir, yarıda
+        kalan bir senkronizasyon bir sonraki çağrıda oradan devam eder.
         
         Args:
             progress_callback: İlerleme callback (current, total, product_name)
+            user_id: Sadece bu kullanıcının ürünleri (None = tüm kullanıcılar)
+            resume: Kayıtlı checkpoint varsa kaldığı yerden devam et
+        
+        Kullanıcının kuyrukta veya çalışan bir senkronizasyonu varsa (tüm
+        kullanıcılar için: herhangi biri) başlamaz; aynı ürünler ve checkpoint
+        iki çalışma tarafından paylaşılmasın.
         
         Returns:
             dict: Senkronizasyon sonuçları
         """
-        self._update_status("Stok senkronizasyonu başlatılıyor...")
+        with self._lock:
+            busy = self._is_busy(user_id)
+            if not busy:
+                self._active_users.add(user_id)
+        if busy:
+            return {'success': False, 'message': 'Stok senkronizasyonu zaten sırada veya çalışıyor'}
         
-        # Shopify'a senkronize edilmiş ürünleri al
-        synced_products = Product.get_synced_products()
+        try:
+            return self._sync_to_end(user_id, resume, progress_callback)
+        finally:
+            with self._lock:
+                self._active_users.discard(user_id)
+    
+    def _sync_to_end(self, user_id: Optional[int], resume: bool,
+                     progress_callback: Optional[Callable]) -> dict:
+        """sync_all_products gövdesi: çalışmayı çağıran thread'de sonuna kadar ilerlet"""
+        self._update_status("Stok senkronizasyonu başlatılıyor...")
         
-        if not synced_products:
+        run = TenantSyncRun(self, user_id, resume=resume, progress_callback=progress_callback)
+        if not run.total:
             self._update_status("Senkronize edilmiş ürün bulunamadı")
             return {'success': False, 'message': 'Senkronize ürün yok'}
         
-        total = len(synced_products)
-        self._update_status(f"{total} ürün kontrol edilecek")
+        if run.after_id:
+            self._update_status(f"Yarım kalan senkronizasyon #{run.after_id} sonrasından devam ediyor ({run.processed}/{run.total})")
+        else:
+            self._update_status(f"{run.total} ürün kontrol edilecek")
         
-        results = {
-            'total_checked': 0,
-            'in_stock': 0,
-            'out_of_stock': 0,
-            'price_changes': 0,
-            'shopify_updated': 0,
-            'errors': 0,
-            'details': []
-        }
+        while not run.done:
+            run.step(SYNC_BATCH_SIZE)
+            if run.paused:
+                # Checkpoint kalır; bir sonraki çağrı kaldığı yerden devam eder
+                run.save_checkpoint()
+                self._update_status("Trendyol hata oranı yüksek - senkronizasyon duraklatıldı")
+                return {'success': False, 'paused': True,
+                        'message': 'Trendyol geçici olarak yanıt vermiyor, senkronizasyon duraklatıldı',
+                        **{k: v for k, v in run.results.items() if k != 'details'}}
         
-        shopify_api = None
+        return self._finish_run(run)
+    
+    def _finish_run(self, run: TenantSyncRun) -> dict:
+        """Çalışmayı kapat, genel ve kullanıcı durumunu güncelle"""
+        results = run.finish()
+        now = datetime.now()
+        self.last_sync_time = now
+        self.sync_stats = results
+        merge_tier_stats(self.tier_stats, run.tier_stats)
+        
+        if run.user_id is not None:
+            tenant = self._tenant(run.user_id)
+            tenant['state'] = 'idle'
+            tenant['last_sync'] = now
+            tenant['last_result'] = {k: v for k, v in results.items() if k != 'details'}
+            tenant['progress'] = None
+            merge_tier_stats(tenant['tier_stats'], run.tier_stats)
+        
+        self._update_status(f"Senkronizasyon tamamlandı: {results['total_checked']} ürün kontrol edildi")
+        return results
+    
+    # ==================== KULLANICI BAZLI ZAMANLAMA ====================
+    
+    def _tenant(self, user_id: int) -> dict:
+        """Kullanıcının zamanlama durumu (yoksa oluştur)"""
+        tenant = self.tenants.get(user_id)
+        if tenant is None:
+            tenant = self.tenants[user_id] = {
+                'state': 'idle',
+                'interval_minutes': self.sync_interval // 60,
+                'weight': MIN_WEIGHT,
+                'auto_sync': True,
+                'last_sync': None,
+                'last_result': None,
+                'progress': None,
+                'tier_stats': empty_tier_stats()
+            }
+        return tenant
+    
+    def _refresh_tenant_settings(self, user_id: int) -> dict:
+        """Kullanıcının aralık, ağırlık ve otomatik senkronizasyon ayarlarını oku"""
+        tenant = self._tenant(user_id)
         try:
-            shopify_api = get_shopify_api()
-        except Exception as e:
-            logger.warning(f"Shopify API bağlantısı kurulamadı: {e}")
+            tenant['interval_minutes'] = max(1, int(Settings.get(
+                'stock_sync_interval', self.sync_interval // 60, user_id=user_id
+            )))
+        except (TypeError, ValueError):
+            tenant['interval_minutes'] = self.sync_interval // 60
+        try:
+            weight = int(Settings.get('stock_sync_weight', MIN_WEIGHT, user_id=user_id))
+        except (TypeError, ValueError):
+            weight = MIN_WEIGHT
+        tenant['weight'] = min(MAX_WEIGHT, max(MIN_WEIGHT, weight))
+        # Kullanıcı kapatmadıysa (auto_stock_sync=False) genel zamanlayıcıya dahil
+        tenant['auto_sync'] = Settings.get('auto_stock_sync', True, user_id=user_id) is not False
+        return tenant
+    
+    def _next_sync_time(self, tenant: dict) -> Optional[datetime]:
+        if not tenant['last_sync']:
+            return None
+        return tenant['last_sync'] + timedelta(minutes=tenant['interval_minutes'])
+    
+    def request_sync(self, user_id: int, resume: bool = True, due_only: bool = False) -> bool:
+        """
+        Kullanıcının senkronizasyonunu adil kuyruğa ekle (API'den manuel tetikleme
+        veya zamanlayıcı). Zaten kuyrukta veya çalışıyorsa False döner.
+        
+        Args:
+            due_only: Sadece kontrol zamanı gelmiş ürünler (zamanlayıcı)
+        """
+        with self._lock:
+            if self._is_busy(user_id):
+                return False
+            tenant = self._refresh_tenant_settings(user_id)
+            run = TenantSyncRun(self, user_id, resume=resume, due_only=due_only)
+            if run.done:
+                # Kontrol edilecek ürün yok - bir sonraki aralığa kadar bekle
+                tenant['last_sync'] = datetime.now()
+                return False
+            self.run_queue[user_id] = run
+            self._deficits[user_id] = 0
+            tenant['state'] = 'queued'
+            tenant['progress'] = {'checked': run.processed, 'total': run.total}
+        
+        self._ensure_worker()
+        self._wakeup.set()
+        return True
+    
+    def _is_busy(self, user_id: Optional[int]) -> bool:
+        """Kullanıcının kuyrukta veya çalışan senkronizasyonu var mı (kilit altında)"""
+        if user_id is None:
+            return bool(self.run_queue or self._active_users)
+        return (user_id in self.run_queue or user_id in self._active_users
+                or None in self._active_users)
+    
+    def _enqueue_due_tenants(self):
+        """Aralığı dolan kullanıcıları kuyruğa ekle"""
+        now = datetime.now()
+        for user_id in Product.get_synced_user_ids():
+            if user_id in self.run_queue:
+                continue
+            tenant = self._refresh_tenant_settings(user_id)
+            if not tenant['auto_sync']:
+                continue
+            next_sync = self._next_sync_time(tenant)
+            if next_sync is None or next_sync <= now:
+                self.request_sync(user_id, due_only=True)
+    
+    def _run_round(self):
+        """
+        Deficit round robin turu: her kullanıcı ağırlığı kadar ürün hakkı kazanır,
+        hakkı kadar ürün kontrol eder. Biten kullanıcı kuyruktan çıkar.
+        """
+        with self._lock:
+            queue = list(self.run_queue.items())
         
-        for idx, product in enumerate(synced_products, 1):
+        for user_id, run in queue:
+            tenant = self._tenant(user_id)
+            tenant['state'] = 'running'
+            self._deficits[user_id] = self._deficits.get(user_id, 0) + FAIR_QUANTUM * tenant['weight']
             try:
-                trendyol_id = product.get('trendyol_id')
-                shopify_id = product.get('shopify_id')
-                product_name = product.get('name', 'Bilinmeyen')
-                old_price = product.get('trendyol_price', 0)
-                
-                if progress_callback:
-                    progress_callback(idx, total, product_name)
-                
-                # Trendyol'dan canlı stok bilgisi al
-                stock_info = self.scraper.check_product_stock(trendyol_id)
-                
-                in_stock = stock_info.get('in_stock', False)
-                new_price = stock_info.get('price', 0)
-                
-                # Veritabanını güncelle
-                Product.update_stock_status(product['id'], in_stock, new_price)
-                
-                results['total_checked'] += 1
-                
-                if in_stock:
-                    results['in_stock'] += 1
-                else:
-                    results['out_of_stock'] += 1
-                    
-                    # Shopify'da ürünü gizle (ayar aktifse)
-                    hide_out_of_stock = Settings.get('hide_out_of_stock', True)
-                    if shopify_api and shopify_id and hide_out_of_stock:
-                        try:
-                            shopify_api.set_product_status(shopify_id, active=False)
-                            results['shopify_updated'] += 1
-                            results['details'].append({
-                                'product': product_name,
-                                'action': 'Stokta yok - Shopify\'da gizlendi'
-                            })
-                        except Exception as e:
-                            logger.error(f"Shopify güncelleme hatası: {e}")
-                
-                # Fiyat değişikliği kontrolü
-                auto_price_update = Settings.get('auto_price_update', True)
-                if new_price > 0 and abs(new_price - old_price) > 0.01:
-                    results['price_changes'] += 1
-                    
-                    # Yeni Shopify fiyatını hesapla ve güncelle (ayar aktifse)
-                    if shopify_api and shopify_id and in_stock and auto_price_update:
-                        try:
-                            # Kar marjını al
-                            profit_margin = product.get('profit_margin') or Settings.get('profit_margin', 50)
-                            
-                            # Yeni fiyatı hesapla (kar marjı + USD dönüşümü)
-                            new_shopify_price = self.scraper.calculate_shopify_price(
-                                new_price, 
-                                profit_margin=profit_margin,
-                                to_usd=True
-                            )
-                            
-                            old_shopify_price = product.get('shopify_price', 0)
-                            
-                            # Shopify'da fiyatı güncelle
-                            shopify_api.update_product_inventory_and_price(
-                                shopify_id, 
-                                price=new_shopify_price
-                            )
-                            
-                            # Veritabanında Shopify fiyatını güncelle
-                            Product.update_shopify_price(product['id'], new_shopify_price)
-                            
-                            results['shopify_updated'] += 1
-                            results['details'].append({
-                                'product': product_name,
-                                'action': f'Fiyat güncellendi: {old_price}₺→{new_price}₺ (Shopify: ${old_shopify_price:.2f}→${new_shopify_price:.2f})'
-                            })
-                            logger.info(f"Fiyat güncellendi: {product_name} - Shopify: ${new_shopify_price:.2f}")
-                        except Exception as e:
-                            logger.error(f"Shopify fiyat güncelleme hatası: {e}")
-                            results['details'].append({
-                                'product': product_name,
-                                'action': f'Fiyat değişti: {old_price}₺ → {new_price}₺ (Shopify güncellenemedi)'
-                            })
-                    else:
-                        results['details'].append({
-                            'product': product_name,
-                            'action': f'Fiyat değişti: {old_price}₺ → {new_price}₺'
-                        })
-                
-                # Rate limiting
-                time.sleep(0.2)
+                checked = run.step(int(self._deficits[user_id]))
+            except Exception as e:
+                logger.error(f"Kullanıcı {user_id} senkronizasyon hatası: {e}")
+                run.done = True
+                checked = 0
+            self._deficits[user_id] -= checked
+            tenant['progress'] = {'checked': run.processed, 'total': run.total}
+            
+            if run.done:
+                try:
+                    self._finish_run(run)
+                except Exception as e:
+                    logger.error(f"Kullanıcı {user_id} senkronizasyon kapanış hatası: {e}")
+                    tenant['state'] = 'idle'
+                finally:
+                    # Checkpoint temizlendikten sonra çıkar; araya yeni çalışma girmesin
+                    with self._lock:
+                        self.run_queue.pop(user_id, None)
+                        self._deficits.pop(user_id, None)
+            else:
+                tenant['state'] = 'paused' if run.paused else 'queued'
+    
+    def _ensure_worker(self):
+        """Kuyruğu işleyen thread çalışmıyorsa başlat"""
+        with self._lock:
+            if self.sync_thread and self.sync_thread.is_alive():
+                return
+            self.sync_thread = threading.Thread(target=self._worker_loop, daemon=True)
+            self.sync_thread.start()
+    
+    def _worker_loop(self):
+        """
+        Zamanlayıcı + adil kuyruk döngüsü. Otomatik senkronizasyon kapalıyken
+        sadece manuel istenen çalışmaları bitirip çıkar.
+        """
+        while True:
+            try:
+                if self.is_running and time.monotonic() >= self._next_schedule_check:
+                    self._next_schedule_check = time.monotonic() + SCHEDULE_CHECK_SECONDS
+                    self._enqueue_due_tenants()
                 
+                if self.run_queue:
+                    pause = self.scraper.stock_circuit.retry_after()
+                    if not pause:
+                        self._run_round()
+                        continue
+                    # Devre açık: tüm kullanıcılar bekler, kuyruk korunur
+                    for user_id in list(self.run_queue):
+                        self._tenant(user_id)['state'] = 'paused'
+                    self._wakeup.wait(timeout=min(pause, SCHEDULE_CHECK_SECONDS))
+                    self._wakeup.clear()
+                    continue
             except Exception as e:
-                results['errors'] += 1
-                logger.error(f"Ürün senkronizasyon hatası: {e}")
-        
-        self.last_sync_time = datetime.now()
-        self.sync_stats = results
-        
-        # Log kaydet
-        ActivityLog.create(
-            action='stock_sync',
-            details=f"Kontrol: {results['total_checked']}, Stokta yok: {results['out_of_stock']}, Fiyat değişimi: {results['price_changes']}",
-            status='success' if results['errors'] == 0 else 'warning'
-        )
+                logger.error(f"Otomatik senkronizasyon hatası: {e}")
+            
+            with self._lock:
+                if not self.is_running and not self.run_queue:
+                    self.sync_thread = None
+                    return
+            
+            # Yeni iş veya bir sonraki zamanlama kontrolüne kadar bekle
+            self._wakeup.wait(timeout=SCHEDULE_CHECK_SECONDS)
+            self._wakeup.clear()
+    
+    # ==================== ORTAK GÖZLEMLER ====================
+    
+    def get_stock_observation(self, trendyol_id: int, user_id: Optional[int] = None,
+                              max_age_seconds: Optional[int] = None) -> dict:
+        """
+        trendyol_id'nin stok/fiyat bilgisi. TTL içinde başka bir kullanıcı için
+        alınmış gözlem varsa Trendyol'a gidilmez ('cached': True). Yeni gözlem
+        öncekinden farklıysa aynı ürünü takip eden diğer kullanıcıların kayıtları
+        hemen kontrole alınır; Shopify güncellemelerini kendi çalışmaları yapar.
+        """
+        if max_age_seconds is None:
+            max_age_seconds = STOCK_SYNC_CONFIG['observation_ttl_seconds']
+        if max_age_seconds > 0:
+            observation = TrendyolObservation.get(trendyol_id, max_age_seconds)
+            if observation:
+                self.observation_stats['hits'] += 1
+                return {**observation, 'cached': True}
         
-        self._update_status(f"Senkronizasyon tamamlandı: {results['total_checked']} ürün kontrol edildi")
+        stock_info = self.scraper.check_product_stock(trendyol_id)
+        self.observation_stats['fetches'] += 1
         
-        return results
+        # Bilinmeyen sonuç (hata, devre açık) paylaşılmaz; kesin sonuçlar - fiyatsız
+        # olsa da (404 / isSuccess=false: ürün kaldırılmış, stokta yok) - paylaşılır
+        if not is_unknown(stock_info):
+            try:
+                if TrendyolObservation.save(trendyol_id, stock_info):
+                    self.observation_stats['fanned_out'] += Product.mark_due_by_trendyol_id(
+                        trendyol_id, exclude_user_id=user_id
+                    )
+            except Exception as e:
+                logger.warning(f"Trendyol gözlemi kaydedilemedi ({trendyol_id}): {e}")
+        return {**stock_info, 'cached': False}
+    
+    # ==================== DİĞER İŞLEMLER ====================
     
-    def check_single_product(self, trendyol_id: int) -> dict:
+    def check_single_product(self, trendyol_id: int, user_id: Optional[int] = None) -> dict:
         """
-        Tek bir ürünün stokunu kontrol et
+        Tek bir ürünün stokunu kontrol et (taze ortak gözlem varsa o kullanılır)
         
         Args:
             trendyol_id: Trendyol ürün ID
+            user_id: Kontrolü isteyen kullanıcı
         
         Returns:
             dict: Stok bilgisi
         """
-        return self.scraper.check_product_stock(trendyol_id)
+        return self.get_stock_observation(trendyol_id, user_id=user_id)
     
     def verify_stock_before_order(self, trendyol_id: int, variant: str = None) -> tuple:
         """
@@ -231,40 +714,85 @@ class StockSyncManager:
             return
         
         self.is_running = True
-        self.sync_thread = threading.Thread(target=self._auto_sync_loop, daemon=True)
-        self.sync_thread.start()
-        logger.info(f"Otomatik stok senkronizasyonu başlatıldı (aralık: {self.sync_interval // 60} dakika)")
+        self._next_schedule_check = 0
+        self._ensure_worker()
+        self._wakeup.set()
+        logger.info(f"Otomatik stok senkronizasyonu başlatıldı (varsayılan aralık: {self.sync_interval // 60} dakika)")
     
     def stop_auto_sync(self):
-        """Otomatik senkronizasyonu durdur"""
+        """Otomatik senkronizasyonu durdur (kuyruktaki çalışmalar tamamlanır)"""
         self.is_running = False
+        self._wakeup.set()
         logger.info("Otomatik stok senkronizasyonu durduruldu")
     
-    def _auto_sync_loop(self):
-        """Otomatik senkronizasyon döngüsü"""
-        while self.is_running:
-            try:
-                self.sync_all_products()
-            except Exception as e:
-                logger.error(f"Otomatik senkronizasyon hatası: {e}")
-            
-            # Bir sonraki senkronizasyona kadar bekle
-            for _ in range(self.sync_interval):
-                if not self.is_running:
-                    break
-                time.sleep(1)
-    
-    def get_sync_status(self) -> dict:
-        """Senkronizasyon durumunu al"""
+    def _tenant_status(self, user_id: int) -> dict:
+        tenant = self._tenant(user_id)
+        next_sync = self._next_sync_time(tenant)
         return {
+            'state': tenant['state'],
+            'auto_sync': tenant['auto_sync'],
+            'interval_minutes': tenant['interval_minutes'],
+            'weight': tenant['weight'],
+            'last_sync': tenant['last_sync'].isoformat() if tenant['last_sync'] else None,
+            'next_sync': next_sync.isoformat() if next_sync and self.is_running else None,
+            'progress': tenant['progress'],
+            'last_result': tenant['last_result'],
+            'tiers': self._tier_summary(tenant['tier_stats'], user_id)
+        }
+    
+    @staticmethod
+    def _tier_summary(tier_stats: dict, user_id: Optional[int] = None) -> dict:
+        """Katman başına ürün sayısı, kontrol/değişiklik sayısı ve değişiklik yakalama oranı"""
+        counts = Product.get_tier_counts(user_id)
+        summary = {}
+        for tier in sorted(set(CHECK_TIERS) | set(counts) | set(tier_stats),
+                           key=lambda t: CHECK_TIERS.index(t) if t in CHECK_TIERS else len(CHECK_TIERS)):
+            stats = tier_stats.get(tier, {'checks': 0, 'changes': 0})
+            summary[tier] = {
+                'products': counts.get(tier, 0),
+                'checks': stats['checks'],
+                'changes': stats['changes'],
+                'change_detection_rate': round(stats['changes'] / stats['checks'], 4) if stats['checks'] else None
+            }
+        return summary
+    
+    def get_sync_status(self, user_id: Optional[int] = None) -> dict:
+        """
+        Senkronizasyon durumunu al. user_id verilirse o kullanıcının durumu
+        'tenant' altında, verilmezse tüm kullanıcılarınki 'tenants' altında döner.
+        """
+        status = {
             'is_running': self.is_running,
             'last_sync': self.last_sync_time.isoformat() if self.last_sync_time else None,
             'sync_interval_minutes': self.sync_interval // 60,
-            'stats': self.sync_stats
+            'queue_length': len(self.run_queue)
         }
+        if user_id is not None:
+            if user_id not in self.tenants:
+                self._refresh_tenant_settings(user_id)
+            tenant = self._tenant_status(user_id)
+            status['tenant'] = tenant
+            status['last_sync'] = tenant['last_sync']
+            status['stats'] = tenant['last_result'] or {}
+        else:
+            status['stats'] = self.sync_stats
+            status['tiers'] = self._tier_summary(self.tier_stats)
+            lookups = self.observation_stats['hits'] + self.observation_stats['fetches']
+            status['observations'] = {
+                **self.observation_stats,
+                'hit_rate': round(self.observation_stats['hits'] / lookups, 4) if lookups else None
+            }
+            status['trendyol_requests'] = self.scraper.get_stock_request_stats()
+            status['tenants'] = {uid: self._tenant_status(uid) for uid in list(self.tenants)}
+        return status
     
-    def set_sync_interval(self, minutes: int):
-        """Senkronizasyon aralığını değiştir"""
+    def set_sync_interval(self, minutes: int, user_id: Optional[int] = None):
+        """Senkronizasyon aralığını değiştir (user_id verilirse sadece o kullanıcı için)"""
+        if user_id is not None:
+            Settings.set('stock_sync_interval', str(minutes), user_id=user_id)
+            self._tenant(user_id)['interval_minutes'] = minutes
+            logger.info(f"Kullanıcı {user_id} stok senkronizasyon aralığı {minutes} dakika olarak ayarlandı")
+            return
         self.sync_interval = minutes * 60
         Settings.set('stock_sync_interval', str(minutes))
         logger.info(f"Stok senkronizasyon aralığı {minutes} dakika olarak ayarlandı")
@@ -0,0 +1,12 @@
+"""
+Testler dropship_app dizininden çalıştırılır: python -m pytest tests
+Her oturum geçici bir SQLite veritabanı kullanır.
+"""
+import os
+import sys
+import tempfile
+
+_TMP_DIR = tempfile.mkdtemp(prefix='dropship-test-')
+os.environ.setdefault('DATABASE_PATH', os.path.join(_TMP_DIR, 'dropship.db'))
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,43 @@
+"""/api/admin/query-stats erişim kontrolü"""
+import pytest
+from fastapi.testclient import TestClient
+
+import api
+from config import QUERY_LOG_CONFIG
+
+ADMIN = {'user_id': 1, 'email': 'admin@example.com', 'name': 'Admin'}
+TENANT = {'user_id': 2, 'email': 'tenant@example.com', 'name': 'Tenant'}
+
+
+@pytest.fixture
+def client_as(monkeypatch):
+    def make(user, admin_emails):
+        monkeypatch.setitem(QUERY_LOG_CONFIG, 'admin_emails', admin_emails)
+        api.app.dependency_overrides[api.get_current_user] = lambda: user
+        return TestClient(api.app)
+    yield make
+    api.app.dependency_overrides.clear()
+
+
+@pytest.mark.parametrize('method', ['get', 'delete'])
+def test_non_admin_tenant_forbidden(client_as, method):
+    client = client_as(TENANT, ['admin@example.com'])
+    assert getattr(client, method)('/api/admin/query-stats').status_code == 403
+
+
+@pytest.mark.parametrize('method', ['get', 'delete'])
+def test_forbidden_when_no_admins_configured(client_as, method):
+    client = client_as(TENANT, [])
+    assert getattr(client, method)('/api/admin/query-stats').status_code == 403
+
+
+def test_admin_allowed(client_as):
+    client = client_as(ADMIN, ['admin@example.com'])
+    response = client.get('/api/admin/query-stats')
+    assert response.status_code == 200
+    assert response.json()['success'] is True
+
+
+def test_requires_login():
+    response = TestClient(api.app).get('/api/admin/query-stats')
+    assert response.status_code in (401, 403)
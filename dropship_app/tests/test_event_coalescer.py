@@ -0,0 +1,51 @@
+"""EventCoalescer: toplu mesajda ürün bazlı veri korunur"""
+import asyncio
+
+from websocket_manager import EventCoalescer
+
+
+def run_events(events, window_ms=20):
+    sent = []
+
+    async def dispatch(event_type, data, user_id):
+        sent.append(data)
+
+    async def main():
+        coalescer = EventCoalescer(dispatch, window_ms)
+        for data in events:
+            await coalescer.add('product_stock_changed', data, '1')
+        await asyncio.sleep(window_ms * 3 / 1000)
+
+    asyncio.run(main())
+    return sent
+
+
+def test_batch_keeps_per_product_payload():
+    sent = run_events([
+        {'product_id': 1, 'in_stock': True},
+        {'product_id': 2, 'in_stock': False, 'price': 10},
+        {'product_id': 3, 'in_stock': True},
+        {'product_id': 2, 'price': 12},
+    ])
+    assert sent[0] == {'product_id': 1, 'in_stock': True}
+    batch = sent[1]
+    assert batch['batched'] is True
+    assert batch['event_count'] == 3
+    assert batch['product_ids'] == [2, 3]
+    assert batch['items'] == [
+        {'product_id': 2, 'in_stock': False, 'price': 12},
+        {'product_id': 3, 'in_stock': True},
+    ]
+
+
+def test_summary_events_not_merged_and_keep_order():
+    sent = run_events([
+        {'product_id': 1, 'in_stock': True},
+        {'product_id': 2, 'in_stock': False},
+        {'updated_count': 5, 'message': 'Toplu stok güncelleme tamamlandı'},
+        {'product_ids': [7, 8], 'updated_count': 2},
+    ])
+    assert sent[0] == {'product_id': 1, 'in_stock': True}
+    assert sent[1]['items'] == [{'product_id': 2, 'in_stock': False}]
+    assert sent[2] == {'updated_count': 5, 'message': 'Toplu stok güncelleme tamamlandı'}
+    assert sent[3] == {'product_ids': [7, 8], 'updated_count': 2}
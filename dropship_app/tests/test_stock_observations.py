@@ -0,0 +1,60 @@
+"""Ortak Trendyol gözlemleri: hangi sonuçlar kaydedilip diğer kullanıcılara yayılır"""
+from datetime import datetime
+
+import pytest
+
+from models import init_database, Product, TrendyolObservation
+from stock_sync import StockSyncManager
+from trendyol_scraper import unknown_stock_result
+
+
+class FakeScraper:
+    def __init__(self, result):
+        self.result = result
+        self.calls = 0
+
+    def check_product_stock(self, trendyol_id):
+        self.calls += 1
+        return dict(self.result)
+
+
+@pytest.fixture
+def manager_with(monkeypatch):
+    init_database()
+    fanned_out = []
+    monkeypatch.setattr(Product, 'mark_due_by_trendyol_id',
+                        lambda trendyol_id, exclude_user_id=None: fanned_out.append(trendyol_id) or 1)
+
+    def make(result):
+        manager = StockSyncManager()
+        manager.scraper = FakeScraper(result)
+        return manager, fanned_out
+    return make
+
+
+def test_delisted_product_stock_out_is_shared(manager_with):
+    # 404 / isSuccess=false: fiyatsız ama kesin "stokta yok"
+    manager, fanned_out = manager_with({'in_stock': False, 'price': 0, 'variants': [],
+                                        'last_checked': datetime.now().isoformat()})
+    TrendyolObservation.save(9001, {'in_stock': True, 'price': 120.0})
+
+    # Önceki (stokta) gözlem atlanıp Trendyol'a gidilir
+    first = manager.get_stock_observation(9001, user_id=1, max_age_seconds=0)
+    second = manager.get_stock_observation(9001, user_id=2)
+
+    assert first['in_stock'] is False and first['cached'] is False
+    assert second['in_stock'] is False and second['cached'] is True
+    assert manager.scraper.calls == 1
+    assert fanned_out == [9001]
+    assert TrendyolObservation.get(9001, 60)['in_stock'] is False
+
+
+def test_unknown_result_is_not_shared(manager_with):
+    manager, fanned_out = manager_with(unknown_stock_result('timeout'))
+
+    manager.get_stock_observation(9002, user_id=1)
+    manager.get_stock_observation(9002, user_id=2)
+
+    assert manager.scraper.calls == 2
+    assert fanned_out == []
+    assert TrendyolObservation.get(9002, 60) is None
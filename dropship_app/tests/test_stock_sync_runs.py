@@ -0,0 +1,46 @@
+"""Stok senkronizasyonu: checkpoint ayrımı ve aynı kullanıcı için çakışan çalışmalar"""
+import pytest
+
+from models import init_database, SyncCheckpoint
+from stock_sync import CHECKPOINT_JOB, CHECKPOINT_JOB_DUE, StockSyncManager, TenantSyncRun
+
+USER_ID = 42
+
+
+@pytest.fixture
+def manager():
+    init_database()
+    yield StockSyncManager()
+    SyncCheckpoint.clear(CHECKPOINT_JOB, USER_ID)
+    SyncCheckpoint.clear(CHECKPOINT_JOB_DUE, USER_ID)
+
+
+def test_due_only_checkpoint_does_not_move_full_run(manager):
+    SyncCheckpoint.save(CHECKPOINT_JOB_DUE, 500, 10, user_id=USER_ID)
+
+    assert TenantSyncRun(manager, USER_ID).after_id == 0
+    assert TenantSyncRun(manager, USER_ID, due_only=True).after_id == 500
+
+
+def test_full_run_checkpoint_does_not_move_due_run(manager):
+    SyncCheckpoint.save(CHECKPOINT_JOB, 700, 10, user_id=USER_ID)
+
+    assert TenantSyncRun(manager, USER_ID, due_only=True).after_id == 0
+    assert TenantSyncRun(manager, USER_ID).after_id == 700
+
+
+def test_full_run_rejected_while_user_queued(manager):
+    manager.run_queue[USER_ID] = TenantSyncRun(manager, USER_ID, due_only=True)
+
+    assert manager.sync_all_products(user_id=USER_ID)['success'] is False
+    # Tüm kullanıcılar çalışması da bu kullanıcının ürünlerini kapsar
+    assert manager.sync_all_products()['success'] is False
+    assert manager.request_sync(USER_ID) is False
+
+
+def test_queue_rejected_while_full_run_in_progress(manager):
+    # sync_all_products çalışırken kullanıcı _active_users'tadır
+    manager._active_users.add(USER_ID)
+    assert manager.request_sync(USER_ID) is False
+    manager._active_users.discard(USER_ID)
+    assert USER_ID not in manager.run_queue
@@ -0,0 +1,111 @@
+"""WebSocket resume (last_seq + stream_id) ve kuyruk taşması resync mesajları"""
+import asyncio
+import json
+
+from websocket_manager import ConnectionManager, EventTypes
+
+
+class FakeWebSocket:
+    """Gönderilen frame'leri biriktiren sahte bağlantı; blocked ise gönderim bekler"""
+
+    def __init__(self, blocked=False):
+        self.frames = []
+        self.closed = None
+        self._unblocked = asyncio.Event()
+        if not blocked:
+            self._unblocked.set()
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, frame):
+        await self._unblocked.wait()
+        self.frames.append(json.loads(frame))
+
+    async def close(self, code=1000):
+        self.closed = code
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+async def drain():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+async def publish(manager, user_id, count):
+    for i in range(count):
+        await manager.broadcast_event(EventTypes.PRODUCT_ADDED, {'product_id': i}, user_id=user_id)
+
+
+def test_resume_replays_missed_events():
+    async def scenario():
+        manager = ConnectionManager(coalesce_window_ms=0)
+        await publish(manager, '1', 5)
+        websocket = FakeWebSocket()
+        replay = await manager.connect(websocket, user_id='1', last_seq=3, stream_id=manager.stream_id)
+        await drain()
+        return replay, websocket.frames
+
+    replay, frames = run(scenario())
+    assert replay == {'replayed': 2, 'resync_required': False}
+    assert [f['seq'] for f in frames] == [4, 5]
+
+
+def test_resume_after_server_restart_requires_resync():
+    async def scenario():
+        before = ConnectionManager(coalesce_window_ms=0)
+        await publish(before, '1', 5)
+        old_stream = before.stream_id
+
+        # Yeniden başlayan sunucu: yeni stream_id, sıra numaraları baştan
+        after = ConnectionManager(coalesce_window_ms=0)
+        await publish(after, '1', 7)
+        websocket = FakeWebSocket()
+        replay = await after.connect(websocket, user_id='1', last_seq=5, stream_id=old_stream)
+        await drain()
+        return after, replay, websocket.frames
+
+    after, replay, frames = run(scenario())
+    assert replay == {'replayed': 0, 'resync_required': True}
+    assert len(frames) == 1
+    assert frames[0]['type'] == 'resync_required'
+    assert frames[0]['reason'] == 'stream_changed'
+    assert frames[0]['seq'] == 7
+    assert frames[0]['stream_id'] == after.stream_id
+
+
+def test_resume_without_stream_id_requires_resync():
+    async def scenario():
+        manager = ConnectionManager(coalesce_window_ms=0)
+        await publish(manager, '1', 5)
+        websocket = FakeWebSocket()
+        replay = await manager.connect(websocket, user_id='1', last_seq=3)
+        await drain()
+        return replay, websocket.frames
+
+    replay, frames = run(scenario())
+    assert replay['resync_required'] is True
+    assert [f['type'] for f in frames] == ['resync_required']
+    assert frames[0]['reason'] == 'stream_changed'
+
+
+def test_overflow_resync_carries_seq_and_stream_id():
+    async def scenario():
+        manager = ConnectionManager(queue_size=2, coalesce_window_ms=0, overflow_policy='resync')
+        websocket = FakeWebSocket(blocked=True)
+        await manager.connect(websocket, user_id='1')
+        await drain()
+        await publish(manager, '1', 6)
+        websocket._unblocked.set()
+        await drain()
+        return manager, websocket.frames
+
+    manager, frames = run(scenario())
+    resyncs = [f for f in frames if f['type'] == 'resync_required']
+    assert resyncs
+    assert resyncs[-1]['reason'] == 'queue_overflow'
+    assert resyncs[-1]['stream_id'] == manager.stream_id
+    assert 0 < resyncs[-1]['seq'] <= manager.current_seq('1')
@@ -6,23 +6,240 @@ Canlı stok takibi ve fiyat güncelleme özelliği içerir
 import requests
 import cloudscraper
 import re
+import random
 import logging
+import queue
+import threading
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from bs4 import BeautifulSoup
+from collections import deque
 from datetime import datetime
 from typing import Optional, Dict, List, Tuple
 
+from config import TRENDYOL_CONFIG
+
 logger = logging.getLogger(__name__)
 
+# Başarılı stok sonucunun aynı ürün için tekrar kullanıldığı süre (saniye)
+STOCK_RESULT_TTL_SECONDS = 5
+# Sonuç önbelleği bu boyutu aşınca süresi dolanlar temizlenir
+STOCK_RESULT_CACHE_MAX = 10000
+# Geçici hatalarda (ağ, 403, 429, 5xx) en fazla deneme sayısı ve bekleme sınırları (saniye)
+STOCK_MAX_ATTEMPTS = 3
+STOCK_BACKOFF_BASE = 0.5
+STOCK_BACKOFF_MAX = 8.0
+RETRYABLE_STATUS_CODES = {403, 429, 500, 502, 503, 504}
+# Oturum havuzu: en fazla bu kadar cloudscraper oturumu (ve Cloudflare kurulumu) oluşturulur
+SCRAPER_POOL_SIZE = TRENDYOL_CONFIG.get('max_workers', 10)
+# Oturum başına bağlantı havuzu (host başına açık tutulan keep-alive bağlantı)
+SESSION_POOL_CONNECTIONS = 4
+SESSION_POOL_MAXSIZE = 4
+# Tüm oturumlar aynı tarayıcı profilinden (TLS şifre takımı User-Agent ile uyumlu kalsın)
+SCRAPER_BROWSER = {'browser': 'chrome', 'platform': 'windows', 'mobile': False}
+
+
+class ScraperSessionPool:
+    """
+    Sabit boyutlu cloudscraper oturum havuzu
+    
+    requests oturumları thread-safe değildir; her istek süresince havuzdan bir
+    oturum ödünç alınır ve istek bitince geri bırakılır. Thread sayısı ne olursa
+    olsun en fazla size oturum oluşturulur; hepsi kullanımdaysa çağıran boşa
+    çıkan oturumu bekler. Oturumlar aynı cookie jar'ı (Cloudflare challenge
+    çerezleri) ve aynı User-Agent'ı kullanır, böylece bir oturumun çözdüğü
+    challenge hepsinde geçerlidir.
+    """
+    
+    def __init__(self, size: int = SCRAPER_POOL_SIZE):
+        self.size = max(1, size)
+        self._base = cloudscraper.create_scraper(browser=SCRAPER_BROWSER)
+        self._tune(self._base)
+        # LIFO: en son kullanılan (bağlantısı sıcak) oturum önce verilir
+        self._idle = queue.LifoQueue()
+        self._idle.put(self._base)
+        self._lock = threading.Lock()
+        self.sessions_created = 1
+        self.waits = 0
+    
+    @staticmethod
+    def _tune(session):
+        session.headers['Connection'] = 'keep-alive'
+        for prefix in ('https://', 'http://'):
+            adapter = session.get_adapter(prefix)
+            # cloudscraper'ın TLS ayarlı adapter'ı korunur, sadece havuz boyutu değişir
+            adapter.init_poolmanager(SESSION_POOL_CONNECTIONS, SESSION_POOL_MAXSIZE)
+    
+    def _create(self):
+        # sess= ile cookie jar ve başlıklar ana oturumdan alınır
+        session = cloudscraper.create_scraper(sess=self._base, browser=SCRAPER_BROWSER)
+        session.cookies = self._base.cookies
+        session.headers = self._base.headers.copy()
+        self._tune(session)
+        return session
+    
+    @contextmanager
+    def session(self):
+        """Havuzdan bir oturum ödünç al; blok bitince geri bırakılır"""
+        try:
+            session = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                create = self.sessions_created < self.size
+                if create:
+                    self.sessions_created += 1
+                else:
+                    self.waits += 1
+            if create:
+                try:
+                    session = self._create()
+                except Exception:
+                    with self._lock:
+                        self.sessions_created -= 1
+                    raise
+            else:
+                session = self._idle.get()
+        try:
+            yield session
+        finally:
+            self._idle.put(session)
+    
+    def get(self, url, **kwargs):
+        """Ödünç alınan oturumla GET (yanıt gövdesi okunmuş döner)"""
+        with self.session() as session:
+            return session.get(url, **kwargs)
+
+
+class TransientStockError(Exception):
+    """Trendyol'dan geçici hata yanıtı (tekrar denenebilir)"""
+    
+    def __init__(self, message: str, retryable: bool = True, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+def unknown_stock_result(error: str) -> Dict:
+    """
+    Stok durumu öğrenilemedi. in_stock None'dır; bu sonuç hiçbir zaman
+    "stokta yok" gibi yorumlanmamalı ve Shopify'a yazılmamalıdır.
+    """
+    return {
+        'in_stock': None,
+        'unknown': True,
+        'error': error,
+        'price': 0,
+        'variants': [],
+        'last_checked': datetime.now().isoformat()
+    }
+
+
+def is_unknown(stock_info: Dict) -> bool:
+    return bool(stock_info.get('unknown')) or stock_info.get('in_stock') is None
+
+
+class CircuitBreaker:
+    """
+    Son window sonuçta hata oranı failure_ratio'yu geçerse devre açılır ve
+    cooldown süresince istek atılmaz. Süre dolunca tek bir deneme isteğine
+    izin verilir (yarı açık); başarılıysa devre kapanır, değilse tekrar açılır.
+    """
+    
+    def __init__(self, window: int = 20, failure_ratio: float = 0.5,
+                 min_calls: int = 10, cooldown_seconds: float = 60):
+        self.window = window
+        self.failure_ratio = failure_ratio
+        self.min_calls = min_calls
+        self.cooldown_seconds = cooldown_seconds
+        self._results = deque(maxlen=window)
+        self._opened_at = None
+        self._probing = False
+        self._trips = 0
+        self._lock = threading.Lock()
+    
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return 'closed'
+            if time.monotonic() - self._opened_at < self.cooldown_seconds:
+                return 'open'
+            return 'half_open'
+    
+    def retry_after(self) -> float:
+        """Devre açıksa bir sonraki denemeye kalan süre, değilse 0"""
+        with self._lock:
+            if self._opened_at is None:
+                return 0
+            return max(0.0, self._opened_at + self.cooldown_seconds - time.monotonic())
+    
+    def allow_request(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.cooldown_seconds or self._probing:
+                return False
+            # Yarı açık: tek deneme isteği
+            self._probing = True
+            return True
+    
+    def record(self, success: bool):
+        with self._lock:
+            if self._opened_at is not None:
+                self._probing = False
+                if success:
+                    self._opened_at = None
+                    self._results.clear()
+                    logger.info("Trendyol devre kesici kapandı")
+                else:
+                    self._opened_at = time.monotonic()
+                return
+            
+            self._results.append(success)
+            failures = self._results.count(False)
+            if len(self._results) >= self.min_calls and failures / len(self._results) >= self.failure_ratio:
+                self._opened_at = time.monotonic()
+                self._trips += 1
+                logger.warning(f"Trendyol hata oranı yüksek ({failures}/{len(self._results)}), "
+                               f"istekler {self.cooldown_seconds:.0f} sn durduruldu")
+    
+    def snapshot(self) -> Dict:
+        state = self.state
+        with self._lock:
+            failures = self._results.count(False)
+            return {
+                'state': state,
+                'recent_calls': len(self._results),
+                'recent_failures': failures,
+                'trips': self._trips
+            }
+
+
 class TrendyolScraper:
     """Trendyol ürün scraper sınıfı"""
     
-    def __init__(self):
-        self.scraper = cloudscraper.create_scraper()
-        self.base_api_url = "https://apigw.trendyol.com"
+    def __init__(self, base_api_url: Optional[str] = None):
+        """
+        Args:
+            base_api_url: Trendyol API adresi (varsayılan TRENDYOL_CONFIG['api_url'])
+        """
+        self.session_pool = ScraperSessionPool()
+        self.base_api_url = (base_api_url or TRENDYOL_CONFIG['api_url']).rstrip('/')
         self.currency_rate = None
-        self._update_currency_rate()
+        
+        # Stok kontrolü single-flight: aynı ürün için eşzamanlı çağrılar tek isteği paylaşır
+        self._stock_lock = threading.Lock()
+        self._stock_inflight = {}   # product_id -> Future
+        self._stock_results = {}    # product_id -> (son geçerlilik, stock_info)
+        self._stock_stats = {'requests': 0, 'coalesced': 0, 'cache_hits': 0,
+                             'retries': 0, 'unknown': 0, 'short_circuited': 0}
+        self.stock_circuit = CircuitBreaker()
+        
+        if TRENDYOL_CONFIG.get('currency_rate'):
+            self.currency_rate = float(TRENDYOL_CONFIG['currency_rate'])
+        else:
+            self._update_currency_rate()
     
     def _update_currency_rate(self):
         """Dolar kurunu güncelle"""
@@ -66,7 +283,7 @@ class TrendyolScraper:
                 'sellerId': seller_id,
                 'pi': 1
             }
-            response = self.scraper.get(
+            response = self.session_pool.get(
                 f'{self.base_api_url}/discovery-web-searchgw-service/v2/api/infinite-scroll/sr',
                 params=params
             )
@@ -84,7 +301,7 @@ class TrendyolScraper:
                 'sellerId': seller_id,
                 'pi': page
             }
-            response = self.scraper.get(
+            response = self.session_pool.get(
                 f'{self.base_api_url}/discovery-web-searchgw-service/v2/api/infinite-scroll/sr',
                 params=params
             )
@@ -105,7 +322,7 @@ class TrendyolScraper:
             product_id = match.group(1)
             api_url = f'{self.base_api_url}/discovery-web-productgw-service/api/productDetail/{product_id}'
             
-            response = self.scraper.get(api_url)
+            response = self.session_pool.get(api_url)
             
             if response.status_code == 200:
                 data = response.json()
@@ -127,6 +344,10 @@ class TrendyolScraper:
         """
         Tek bir ürünün canlı stok durumunu kontrol et
         
+        Aynı ürün için eşzamanlı çağrılar (stok senkronizasyonu, check-stock
+        endpoint'i, satın alma öncesi kontrol) tek bir productDetail isteğini
+        bekler; başarılı sonuç STOCK_RESULT_TTL_SECONDS boyunca tekrar kullanılır.
+        
         Args:
             product_id: Trendyol ürün ID'si
         
@@ -139,46 +360,150 @@ class TrendyolScraper:
                 'last_checked': datetime
             }
         """
-        try:
-            api_url = f'{self.base_api_url}/discovery-web-productgw-service/api/productDetail/{product_id}'
-            response = self.scraper.get(api_url, timeout=10)
+        product_id = int(product_id)
+        with self._stock_lock:
+            cached = self._stock_results.get(product_id)
+            if cached and cached[0] > time.monotonic():
+                self._stock_stats['cache_hits'] += 1
+                return dict(cached[1])
             
-            if response.status_code == 200:
-                data = response.json()
-                if data.get('isSuccess') and data.get('result'):
-                    result = data['result']
-                    
-                    # Stok durumunu kontrol et
-                    in_stock = result.get('hasStock', False)
-                    
-                    # Fiyat bilgilerini al
-                    price_info = result.get('price', {})
-                    selling_price = price_info.get('sellingPrice', 0)
-                    original_price = price_info.get('originalPrice', selling_price)
-                    
-                    # Varyant stok durumları
-                    variants_stock = []
-                    for variant in result.get('allVariants', []):
-                        variants_stock.append({
-                            'attribute_value': variant.get('attributeValue', ''),
-                            'in_stock': variant.get('inStock', False),
-                            'price': variant.get('price', selling_price)
-                        })
-                    
-                    return {
-                        'in_stock': in_stock,
-                        'price': selling_price,
-                        'original_price': original_price,
-                        'variants': variants_stock,
-                        'last_checked': datetime.now().isoformat()
+            inflight = product_id in self._stock_inflight
+        
+        # Devre açıkken Trendyol'a gidilmez (bekleyen bir istek varsa onun sonucu paylaşılır)
+        if not inflight and not self.stock_circuit.allow_request():
+            with self._stock_lock:
+                self._stock_stats['short_circuited'] += 1
+            return unknown_stock_result('circuit_open')
+        
+        with self._stock_lock:
+            
+            future = self._stock_inflight.get(product_id)
+            leader = future is None
+            if leader:
+                future = self._stock_inflight[product_id] = Future()
+                self._stock_stats['requests'] += 1
+            else:
+                self._stock_stats['coalesced'] += 1
+        
+        if not leader:
+            return dict(future.result())
+        
+        try:
+            stock_info = self._fetch_product_stock(product_id)
+        except BaseException as e:
+            with self._stock_lock:
+                self._stock_inflight.pop(product_id, None)
+            self.stock_circuit.record(False)
+            future.set_exception(e)
+            raise
+        
+        unknown = is_unknown(stock_info)
+        self.stock_circuit.record(not unknown)
+        with self._stock_lock:
+            self._stock_inflight.pop(product_id, None)
+            self._stock_stats['unknown'] += unknown
+            # Başarısız sonuç (fiyat yok) önbelleğe alınmaz, sadece bekleyenlerle paylaşılır
+            if stock_info.get('price'):
+                if len(self._stock_results) >= STOCK_RESULT_CACHE_MAX:
+                    now = time.monotonic()
+                    self._stock_results = {
+                        pid: entry for pid, entry in self._stock_results.items() if entry[0] > now
                     }
+                self._stock_results[product_id] = (time.monotonic() + STOCK_RESULT_TTL_SECONDS, stock_info)
+        future.set_result(stock_info)
+        return dict(stock_info)
+    
+    def get_stock_request_stats(self) -> Dict:
+        """Stok kontrolü istek sayaçları: Trendyol'a giden, birleştirilen, önbellekten dönen"""
+        with self._stock_lock:
+            stats = dict(self._stock_stats)
+            stats['in_flight'] = len(self._stock_inflight)
+        stats['circuit'] = self.stock_circuit.snapshot()
+        stats['sessions'] = self.session_pool.sessions_created
+        stats['session_waits'] = self.session_pool.waits
+        calls = stats['requests'] + stats['coalesced'] + stats['cache_hits']
+        stats['saved_ratio'] = round((calls - stats['requests']) / calls, 4) if calls else None
+        return stats
+    
+    def _fetch_product_stock(self, product_id: int) -> Dict:
+        """
+        productDetail isteği (check_product_stock'un single-flight katmanı arkasında)
+        
+        Geçici hatalar üstel, rastgele dağıtılmış (full jitter) beklemeyle
+        STOCK_MAX_ATTEMPTS kez denenir. Hepsi başarısızsa unknown sonuç döner.
+        """
+        error = None
+        for attempt in range(STOCK_MAX_ATTEMPTS):
+            if attempt:
+                delay = random.uniform(0, min(STOCK_BACKOFF_MAX, STOCK_BACKOFF_BASE * 2 ** attempt))
+                retry_after = getattr(error, 'retry_after', None)
+                if retry_after:
+                    delay = max(delay, min(STOCK_BACKOFF_MAX, retry_after))
+                with self._stock_lock:
+                    self._stock_stats['retries'] += 1
+                time.sleep(delay)
             
-            logger.warning(f"Ürün {product_id} stok bilgisi alınamadı")
-            return {'in_stock': False, 'price': 0, 'variants': [], 'last_checked': datetime.now().isoformat()}
+            try:
+                return self._request_product_stock(product_id)
+            except TransientStockError as e:
+                error = e
+                logger.warning(f"Stok kontrolü geçici hata (ürün {product_id}, deneme {attempt + 1}): {e}")
+            except Exception as e:
+                error = e
+                logger.warning(f"Stok kontrolü hatası (ürün {product_id}, deneme {attempt + 1}): {e}")
             
-        except Exception as e:
-            logger.error(f"Stok kontrolü hatası (ürün {product_id}): {e}")
-            return {'in_stock': False, 'price': 0, 'variants': [], 'last_checked': datetime.now().isoformat()}
+            if isinstance(error, TransientStockError) and not error.retryable:
+                break
+        
+        logger.error(f"Ürün {product_id} stok bilgisi alınamadı: {error}")
+        return unknown_stock_result(str(error))
+    
+    def _request_product_stock(self, product_id: int) -> Dict:
+        """Tek productDetail isteği; geçici hatalarda TransientStockError fırlatır"""
+        api_url = f'{self.base_api_url}/discovery-web-productgw-service/api/productDetail/{product_id}'
+        response = self.session_pool.get(api_url, timeout=10)
+        
+        if response.status_code != 200 and response.status_code != 404:
+            retry_after = response.headers.get('Retry-After') if getattr(response, 'headers', None) else None
+            raise TransientStockError(
+                f"HTTP {response.status_code}",
+                retryable=response.status_code in RETRYABLE_STATUS_CODES,
+                retry_after=float(retry_after) if retry_after and retry_after.isdigit() else None
+            )
+        
+        if response.status_code == 200:
+            data = response.json()
+            if data.get('isSuccess') and data.get('result'):
+                result = data['result']
+                
+                # Stok durumunu kontrol et
+                in_stock = result.get('hasStock', False)
+                
+                # Fiyat bilgilerini al
+                price_info = result.get('price', {})
+                selling_price = price_info.get('sellingPrice', 0)
+                original_price = price_info.get('originalPrice', selling_price)
+                
+                # Varyant stok durumları
+                variants_stock = []
+                for variant in result.get('allVariants', []):
+                    variants_stock.append({
+                        'attribute_value': variant.get('attributeValue', ''),
+                        'in_stock': variant.get('inStock', False),
+                        'price': variant.get('price', selling_price)
+                    })
+                
+                return {
+                    'in_stock': in_stock,
+                    'price': selling_price,
+                    'original_price': original_price,
+                    'variants': variants_stock,
+                    'last_checked': datetime.now().isoformat()
+                }
+        
+        # 404 / isSuccess=false: ürün Trendyol'da yok - kesin olarak stokta değil
+        logger.warning(f"Ürün {product_id} Trendyol'da bulunamadı")
+        return {'in_stock': False, 'price': 0, 'variants': [], 'last_checked': datetime.now().isoformat()}
     
     def check_multiple_products_stock(self, product_ids: List[int], progress_callback=None) -> Dict[int, Dict]:
         """
@@ -208,7 +533,7 @@ class TrendyolScraper:
                     results[product_id] = future.result()
                 except Exception as e:
                     logger.error(f"Stok kontrolü hatası (ürün {product_id}): {e}")
-                    results[product_id] = {'in_stock': False, 'price': 0, 'variants': []}
+                    results[product_id] = unknown_stock_result(str(e))
                 
                 processed += 1
                 if progress_callback:
@@ -232,6 +557,9 @@ class TrendyolScraper:
         """
         stock_info = self.check_product_stock(product_id)
         
+        if is_unknown(stock_info):
+            return False, "Stok bilgisi alınamadı, daha sonra tekrar deneyin", 0
+        
         if not stock_info['in_stock']:
             return False, "Ürün stokta yok", 0
         
@@ -3,25 +3,249 @@ WebSocket Manager - Real-Time Senkronizasyon
 Tüm bağlı istemcilere değişiklikleri broadcast eder
 """
 from fastapi import WebSocket
-from typing import Dict, List, Set
+from typing import Dict, List, Optional, Set
 import json
 import asyncio
+import secrets
+import time
+from collections import deque
 from datetime import datetime
+from config import WEBSOCKET_CONFIG
+
+try:
+    import orjson  # Opsiyonel - hızlı JSON encoder
+except ImportError:
+    orjson = None
+
+
+def encode_message(message: dict) -> str:
+    """
+    Mesajı WebSocket text frame'i olarak bir kez JSON'a çevir
+    
+    Broadcast'lerde aynı frame tüm alıcılara gönderilir; orjson kuruluysa
+    onu kullanır, yoksa standart json modülüne düşer.
+    """
+    if orjson is not None:
+        return orjson.dumps(message, default=str).decode('utf-8')
+    return json.dumps(message, ensure_ascii=False, separators=(',', ':'), default=str)
+
+
+class ClientConnection:
+    """
+    Tek bir WebSocket bağlantısının durumu
+    
+    Her bağlantının kendine ait sınırlı bir gönderim kuyruğu ve bu kuyruğu
+    boşaltan bir writer task'ı vardır; böylece yavaş bir istemci diğerlerini
+    bekletmez. Kuyrukta önceden JSON'a çevrilmiş frame'ler (str) tutulur.
+    """
+    
+    def __init__(self, websocket: WebSocket, user_id: Optional[str], topics: Set[str], queue_size: int):
+        self.websocket = websocket
+        self.user_id = user_id
+        self.topics = topics
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.writer_task: Optional[asyncio.Task] = None
+        self.sent_count = 0
+        self.dropped_count = 0
+        self.overflow_count = 0
+        # Heartbeat: istemciden son mesaj alınma zamanı
+        self.connected_at = time.monotonic()
+        self.last_seen = self.connected_at
+    
+    def enqueue(self, frame: str) -> bool:
+        """Frame'i kuyruğa ekle (beklemeden). Kuyruk doluysa False döner."""
+        try:
+            self.queue.put_nowait(frame)
+            return True
+        except asyncio.QueueFull:
+            return False
+    
+    def clear_queue(self) -> int:
+        """Kuyruktaki bekleyen mesajları at, atılan mesaj sayısını döndür"""
+        cleared = 0
+        while True:
+            try:
+                self.queue.get_nowait()
+                cleared += 1
+            except asyncio.QueueEmpty:
+                return cleared
+
+
+class EventCoalescer:
+    """
+    Yüksek frekanslı event'leri zaman penceresi içinde birleştirir
+    
+    Aynı kullanıcı ve event tipi için pencere içindeki ilk event hemen
+    gönderilir; pencere boyunca gelen tek ürünlük event'ler biriktirilip pencere
+    sonunda tek bir toplu mesaj olarak gönderilir. Toplu mesajda her ürünün son
+    verisi ayrı ayrı bulunur (items); product_ids değişen ID'lerin listesidir.
+    Böylece bir stok senkronizasyonu yüzlerce frame yerine pencere başına bir
+    frame üretir ve ürün başına in_stock/fiyat bilgisi kaybolmaz.
+    
+    Birden fazla ürün içeren veya hiç ürün ID'si olmayan (toplu işlem özeti gibi)
+    event'ler birleştirilmez, olduğu gibi hemen gönderilir.
+    """
+    
+    ID_KEYS = ('product_id', 'id')
+    
+    def __init__(self, dispatch, window_ms: int):
+        # dispatch(event_type, data, user_id) -> coroutine
+        self._dispatch = dispatch
+        self.window = window_ms / 1000
+        # (user_id, event_type) -> biriken event durumu
+        self._pending: Dict[tuple, dict] = {}
+        self.stats = {
+            'events_received': 0,
+            'events_coalesced': 0,
+            'batches_sent': 0
+        }
+    
+    @classmethod
+    def _single_id(cls, data: dict):
+        """Event tek bir ürüne aitse ürün ID'si, değilse None"""
+        if data.get('product_ids'):
+            return None
+        for key in cls.ID_KEYS:
+            if data.get(key) is not None:
+                return data[key]
+        return None
+    
+    async def add(self, event_type: str, data: dict, user_id: Optional[str]):
+        """Event'i ekle - pencere yoksa hemen gönder, varsa biriktir"""
+        self.stats['events_received'] += 1
+        key = (user_id, event_type)
+        item_id = self._single_id(data)
+        if item_id is None:
+            # Önce biriken ürün event'leri gitsin ki sıra bozulmasın
+            if self._pending.get(key, {}).get('count'):
+                await self.flush(key)
+            await self._dispatch(event_type, data, user_id)
+            return
+        
+        state = self._pending.get(key)
+        
+        if state is None:
+            # Pencere aç ve ilk event'i gecikmeden gönder
+            self._pending[key] = {'items': {}, 'count': 0}
+            asyncio.get_running_loop().call_later(self.window, self._on_window_end, key)
+            await self._dispatch(event_type, data, user_id)
+            return
+        
+        # Pencere açık - ürün bazında biriktir (aynı ürünün sonraki alanları öncekileri ezer)
+        self.stats['events_coalesced'] += 1
+        state['count'] += 1
+        state['items'].setdefault(item_id, {}).update(data)
+    
+    def _on_window_end(self, key: tuple):
+        """Pencere sonunda biriken event'leri gönder"""
+        asyncio.ensure_future(self.flush(key))
+    
+    async def flush(self, key: tuple):
+        """Biriken event'leri tek toplu mesaj olarak gönder"""
+        state = self._pending.get(key)
+        if state is None:
+            return
+        
+        if state['count'] == 0:
+            # Pencerede yeni event gelmedi - pencereyi kapat
+            del self._pending[key]
+            return
+        
+        user_id, event_type = key
+        data = {
+            'batched': True,
+            'event_count': state['count'],
+            'product_ids': list(state['items']),
+            'items': list(state['items'].values())
+        }
+        
+        # Yoğunluk sürüyorsa bir sonraki pencere için durumu sıfırla
+        self._pending[key] = {'items': {}, 'count': 0}
+        asyncio.get_running_loop().call_later(self.window, self._on_window_end, key)
+        
+        self.stats['batches_sent'] += 1
+        await self._dispatch(event_type, data, user_id)
 
 
 class ConnectionManager:
     """WebSocket bağlantılarını yöneten manager"""
     
-    def __init__(self):
+    def __init__(self, queue_size: int = None, send_timeout: float = None, overflow_policy: str = None,
+                 coalesce_window_ms: int = None):
         # Aktif bağlantılar: user_id -> WebSocket list
         self.active_connections: Dict[str, Set[WebSocket]] = {}
         # Tüm bağlantılar (user_id olmadan)
         self.all_connections: Set[WebSocket] = set()
+        # Bağlantı -> bağlantı durumu (kullanıcı, topic'ler, gönderim kuyruğu)
+        self.clients: Dict[WebSocket, ClientConnection] = {}
+        
+        # Gönderim kuyruğu ayarları
+        self.queue_size = queue_size or WEBSOCKET_CONFIG['send_queue_size']
+        self.send_timeout = send_timeout or WEBSOCKET_CONFIG['send_timeout']
+        # Kuyruk taşınca: 'resync' = kuyruğu boşalt + resync mesajı, 'drop' = bağlantıyı kapat
+        self.overflow_policy = overflow_policy or WEBSOCKET_CONFIG['overflow_policy']
+        
+        # Toplam istatistikler
+        self.stats = {
+            'messages_enqueued': 0,
+            'messages_sent': 0,
+            'messages_dropped': 0,
+            'resyncs_sent': 0,
+            'slow_consumers_dropped': 0,
+            'send_errors': 0
+        }
+        
+        # Yüksek frekanslı event'ler için birleştirme penceresi (0 = kapalı)
+        window_ms = WEBSOCKET_CONFIG['coalesce_window_ms'] if coalesce_window_ms is None else coalesce_window_ms
+        self.coalescer = EventCoalescer(self._dispatch_event, window_ms) if window_ms > 0 else None
         
-    async def connect(self, websocket: WebSocket, user_id: str = None):
-        """Yeni WebSocket bağlantısı kabul et"""
+        # Kaldığı yerden devam (resume): kullanıcı başına sıra numarası ve son event'ler
+        # stream_id sunucu her başladığında değişir; eski sıra numaraları geçersiz olur
+        self.stream_id = secrets.token_hex(8)
+        self.replay_buffer_size = WEBSOCKET_CONFIG['replay_buffer_size']
+        self.user_seq: Dict[str, int] = {}
+        # user_id -> deque[(seq, topic, frame)]
+        self.replay_buffers: Dict[str, deque] = {}
+        self.replay_stats = {
+            'resumes': 0,
+            'events_replayed': 0,
+            'full_resyncs': 0
+        }
+        
+        # Sunucu taraflı heartbeat ve ölü bağlantı temizliği
+        self.heartbeat_interval = WEBSOCKET_CONFIG['heartbeat_interval']
+        self.heartbeat_timeout = WEBSOCKET_CONFIG['heartbeat_timeout']
+        # Kullanıcı başına maksimum bağlantı (0 = sınırsız)
+        self.max_connections_per_user = WEBSOCKET_CONFIG['max_connections_per_user']
+        self.heartbeat_task: Optional[asyncio.Task] = None
+        self.heartbeat_stats = {
+            'heartbeats_sent': 0,
+            'reaped_connections': 0,
+            'evicted_over_limit': 0
+        }
+        
+    async def connect(self, websocket: WebSocket, user_id: str = None, topics: Optional[Set[str]] = None,
+                      last_seq: Optional[int] = None, stream_id: Optional[str] = None) -> dict:
+        """
+        Yeni WebSocket bağlantısı kabul et
+        
+        last_seq verilirse (yeniden bağlanma) kaçırılan event'ler sırayla
+        kuyruğa eklenir. stream_id gönderilmediyse veya güncel akışa ait değilse
+        (ör. sunucu yeniden başladı) ya da aradaki fark tampondan büyükse resync
+        istenir.
+        """
         await websocket.accept()
         
+        # Topic verilmediyse tüm topic'lere abone et
+        user_id = str(user_id) if user_id else None
+        client = ClientConnection(
+            websocket, user_id,
+            set(topics) if topics else set(EventTopics.ALL),
+            self.queue_size
+        )
+        self.clients[websocket] = client
+        client.writer_task = asyncio.create_task(self._writer(client))
+        
         # Tüm bağlantılara ekle
         self.all_connections.add(websocket)
         
@@ -29,15 +253,157 @@ class ConnectionManager:
         if user_id:
             if user_id not in self.active_connections:
                 self.active_connections[user_id] = set()
+            self._enforce_user_limit(user_id)
             self.active_connections[user_id].add(websocket)
             
         print(f"✅ WebSocket connected. Total: {len(self.all_connections)}")
         
+        # Canlı event'lerden önce kaçırılanları gönder (arada await yok, sıra korunur)
+        if user_id and last_seq is not None:
+            return self._replay(client, last_seq, stream_id)
+        return {'replayed': 0, 'resync_required': False}
+    
+    def _enforce_user_limit(self, user_id: str):
+        """Kullanıcı limiti aşılacaksa en eski bağlantıları kapat"""
+        limit = self.max_connections_per_user
+        connections = self.active_connections.get(user_id, set())
+        if not limit or len(connections) < limit:
+            return
+        
+        # En eski bağlantılar genelde uyuyan/ölü cihazlardır
+        oldest_first = sorted(
+            connections,
+            key=lambda ws: self.clients[ws].connected_at if ws in self.clients else 0
+        )
+        for websocket in oldest_first[:len(connections) - limit + 1]:
+            self.heartbeat_stats['evicted_over_limit'] += 1
+            self.disconnect(websocket, user_id)
+            asyncio.create_task(self._close_quietly(websocket, 1008))
+    
+    def touch(self, websocket: WebSocket):
+        """İstemciden mesaj alındı - bağlantı canlı"""
+        client = self.clients.get(websocket)
+        if client:
+            client.last_seen = time.monotonic()
+    
+    def start_heartbeat(self):
+        """Heartbeat / temizlik döngüsünü başlat"""
+        if self.heartbeat_task is None or self.heartbeat_task.done():
+            self.heartbeat_task = asyncio.create_task(self._heartbeat_loop())
+    
+    async def stop_heartbeat(self):
+        """Heartbeat döngüsünü durdur"""
+        if self.heartbeat_task:
+            self.heartbeat_task.cancel()
+            try:
+                await self.heartbeat_task
+            except asyncio.CancelledError:
+                pass
+            self.heartbeat_task = None
+    
+    async def _heartbeat_loop(self):
+        """Periyodik olarak ping gönder ve cevap vermeyen bağlantıları kapat"""
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                self.reap_idle_connections()
+            except Exception as e:
+                print(f"Heartbeat error: {e}")
+    
+    def reap_idle_connections(self) -> int:
+        """
+        heartbeat_timeout boyunca hiç mesaj gelmeyen bağlantıları kapat,
+        diğerlerine sunucu ping'i gönder. Kapatılan bağlantı sayısını döndürür.
+        """
+        now = time.monotonic()
+        reaped = 0
+        ping_frame = None
+        for websocket, client in list(self.clients.items()):
+            if now - client.last_seen > self.heartbeat_timeout:
+                # Yarı açık / uyuyan bağlantı - broadcast'lerden çıkar
+                self.disconnect(websocket)
+                asyncio.create_task(self._close_quietly(websocket, 1001))
+                reaped += 1
+                continue
+            if ping_frame is None:
+                ping_frame = encode_message({"type": "ping", "timestamp": int(time.time() * 1000)})
+            self._enqueue(client, ping_frame)
+            self.heartbeat_stats['heartbeats_sent'] += 1
+        
+        if reaped:
+            self.heartbeat_stats['reaped_connections'] += reaped
+            print(f"🧹 {reaped} idle WebSocket connection(s) reaped. Total: {len(self.all_connections)}")
+        return reaped
+    
+    def current_seq(self, user_id: str) -> int:
+        """Kullanıcının son event sıra numarası"""
+        return self.user_seq.get(str(user_id), 0)
+    
+    def _next_seq(self, user_id: str) -> int:
+        """Kullanıcı için sıradaki numarayı üret"""
+        seq = self.user_seq.get(user_id, 0) + 1
+        self.user_seq[user_id] = seq
+        return seq
+    
+    def _remember(self, user_id: str, seq: int, topic: Optional[str], frame: str):
+        """Event'i kullanıcının replay tamponuna ekle (eskiler otomatik düşer)"""
+        buffer = self.replay_buffers.get(user_id)
+        if buffer is None:
+            buffer = self.replay_buffers[user_id] = deque(maxlen=self.replay_buffer_size)
+        buffer.append((seq, topic, frame))
+    
+    def _replay(self, client: ClientConnection, last_seq: int, stream_id: Optional[str]) -> dict:
+        """last_seq'ten sonraki event'leri bağlantıya tekrar gönder"""
+        self.replay_stats['resumes'] += 1
+        current = self.current_seq(client.user_id)
+        buffer = self.replay_buffers.get(client.user_id, ())
+        oldest = buffer[0][0] if buffer else current + 1
+        
+        # last_seq sadece kendi akışında anlamlı: stream_id yoksa veya farklıysa
+        # (sunucu yeniden başladı) sıra numaraları karşılaştırılamaz
+        if stream_id != self.stream_id:
+            reason = 'stream_changed'
+        # Client ileride görünüyorsa veya kaçırılan event'ler tampondan düştüyse
+        elif last_seq > current or last_seq + 1 < oldest:
+            reason = 'replay_gap'
+        else:
+            reason = None
+        if reason:
+            self.replay_stats['full_resyncs'] += 1
+            self._enqueue(client, encode_message({
+                "type": "resync_required",
+                "reason": reason,
+                "seq": current,
+                "stream_id": self.stream_id,
+                "timestamp": datetime.now().isoformat()
+            }))
+            return {'replayed': 0, 'resync_required': True}
+        
+        replayed = 0
+        for seq, topic, frame in buffer:
+            if seq > last_seq and (topic is None or topic in client.topics):
+                self._enqueue(client, frame)
+                replayed += 1
+        self.replay_stats['events_replayed'] += replayed
+        return {'replayed': replayed, 'resync_required': False}
+        
     def disconnect(self, websocket: WebSocket, user_id: str = None):
         """WebSocket bağlantısını kapat"""
+        client = self.clients.pop(websocket, None)
+        if client is None and websocket not in self.all_connections:
+            return
+        
         # Tüm bağlantılardan çıkar
         self.all_connections.discard(websocket)
         
+        if client:
+            # Writer task'ı durdur (kendi içinden çağrıldıysa iptal etme)
+            if client.writer_task and client.writer_task is not asyncio.current_task():
+                client.writer_task.cancel()
+            # User ID verilmediyse bağlantı durumundan al
+            user_id = user_id or client.user_id
+        user_id = str(user_id) if user_id else None
+        
         # User ID varsa kullanıcıya özel bağlantılardan çıkar
         if user_id and user_id in self.active_connections:
             self.active_connections[user_id].discard(websocket)
@@ -46,55 +412,162 @@ class ConnectionManager:
                 del self.active_connections[user_id]
                 
         print(f"❌ WebSocket disconnected. Total: {len(self.all_connections)}")
+    
+    async def _writer(self, client: ClientConnection):
+        """Bağlantının kuyruğunu sırayla istemciye yaz"""
+        websocket = client.websocket
+        task = asyncio.current_task()
+        try:
+            # Python 3.11'de wait_for, gönderim tamamlanırken gelen iptali
+            # yutabilir; cancelling() kontrolü writer'ın askıda kalmasını önler
+            while not task.cancelling():
+                frame = await client.queue.get()
+                await asyncio.wait_for(websocket.send_text(frame), timeout=self.send_timeout)
+                client.sent_count += 1
+                self.stats['messages_sent'] += 1
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            print(f"Error sending to client (user {client.user_id}): {e}")
+            self.stats['send_errors'] += 1
+            self.disconnect(websocket)
+    
+    def _enqueue(self, client: ClientConnection, frame: str):
+        """Frame'i bağlantının kuyruğuna ekle, taşma durumunu yönet"""
+        if client.enqueue(frame):
+            self.stats['messages_enqueued'] += 1
+            return
+        
+        # Kuyruk dolu - yavaş istemci
+        client.overflow_count += 1
+        dropped = client.clear_queue() + 1
+        client.dropped_count += dropped
+        self.stats['messages_dropped'] += dropped
+        
+        if self.overflow_policy == 'drop':
+            self.stats['slow_consumers_dropped'] += 1
+            print(f"⚠️ Slow WebSocket consumer dropped (user {client.user_id})")
+            self.disconnect(client.websocket)
+            asyncio.create_task(self._close_quietly(client.websocket, 1013))
+        else:
+            # İstemci tüm verisini yeniden çekmeli; seq/stream_id ile sonraki
+            # yeniden bağlanmada buradan devam edebilir
+            client.enqueue(encode_message({
+                "type": "resync_required",
+                "reason": "queue_overflow",
+                "dropped": dropped,
+                "seq": self.current_seq(client.user_id) if client.user_id else 0,
+                "stream_id": self.stream_id,
+                "timestamp": datetime.now().isoformat()
+            }))
+            self.stats['resyncs_sent'] += 1
+    
+    @staticmethod
+    async def _close_quietly(websocket: WebSocket, code: int = 1000):
+        """Bağlantıyı hata fırlatmadan kapat"""
+        try:
+            await websocket.close(code=code)
+        except Exception:
+            pass
+    
+    def subscribe(self, websocket: WebSocket, topics: List[str]) -> Set[str]:
+        """Bağlantıyı verilen topic'lere abone et"""
+        client = self.clients.get(websocket)
+        if not client:
+            return set()
+        client.topics.update(t for t in topics if t in EventTopics.ALL)
+        return client.topics
+    
+    def unsubscribe(self, websocket: WebSocket, topics: List[str]) -> Set[str]:
+        """Bağlantının topic aboneliklerini kaldır"""
+        client = self.clients.get(websocket)
+        if not client:
+            return set()
+        client.topics.difference_update(topics)
+        return client.topics
+    
+    def get_topics(self, websocket: WebSocket) -> Set[str]:
+        """Bağlantının abone olduğu topic'ler"""
+        client = self.clients.get(websocket)
+        return client.topics if client else set()
+    
+    def is_subscribed(self, websocket: WebSocket, topic: Optional[str]) -> bool:
+        """Bağlantı bu topic'e abone mi? (topic yoksa herkese gider)"""
+        if topic is None:
+            return True
+        return topic in self.get_topics(websocket)
         
     async def send_personal_message(self, message: dict, websocket: WebSocket):
         """Belirli bir bağlantıya mesaj gönder"""
-        try:
-            await websocket.send_json(message)
-        except Exception as e:
-            print(f"Error sending personal message: {e}")
+        client = self.clients.get(websocket)
+        if client:
+            self._enqueue(client, encode_message(message))
             
-    async def send_to_user(self, message: dict, user_id: str):
+    async def send_to_user(self, message: dict, user_id: str, topic: Optional[str] = None):
         """Belirli bir kullanıcının tüm cihazlarına mesaj gönder"""
-        if user_id in self.active_connections:
-            disconnected = set()
-            for connection in self.active_connections[user_id]:
-                try:
-                    await connection.send_json(message)
-                except Exception as e:
-                    print(f"Error sending to user {user_id}: {e}")
-                    disconnected.add(connection)
-            
-            # Bağlantısı kopanları temizle
-            for conn in disconnected:
-                self.disconnect(conn, user_id)
+        user_id = str(user_id)
+        frame = None
+        for connection in list(self.active_connections.get(user_id, ())):
+            client = self.clients.get(connection)
+            if client and (topic is None or topic in client.topics):
+                # Mesaj sadece bir kez (ve alıcı varsa) JSON'a çevrilir
+                if frame is None:
+                    frame = encode_message(message)
+                self._enqueue(client, frame)
+    
+    def _send_frame_to_user(self, frame: str, user_id: str, topic: Optional[str] = None):
+        """Önceden encode edilmiş frame'i kullanıcının bağlantılarına ilet"""
+        for connection in list(self.active_connections.get(user_id, ())):
+            client = self.clients.get(connection)
+            if client and (topic is None or topic in client.topics):
+                self._enqueue(client, frame)
                 
-    async def broadcast(self, message: dict, exclude: WebSocket = None):
+    async def broadcast(self, message: dict, exclude: WebSocket = None, topic: Optional[str] = None):
         """Tüm bağlantılara mesaj gönder (broadcast)"""
-        disconnected = set()
-        
-        for connection in self.all_connections:
+        frame = None
+        for connection in list(self.all_connections):
             if connection == exclude:
                 continue
-                
-            try:
-                await connection.send_json(message)
-            except Exception as e:
-                print(f"Error broadcasting: {e}")
-                disconnected.add(connection)
-        
-        # Bağlantısı kopanları temizle
-        for conn in disconnected:
-            self.disconnect(conn)
+            client = self.clients.get(connection)
+            if client and (topic is None or topic in client.topics):
+                # Mesaj sadece bir kez (ve alıcı varsa) JSON'a çevrilir
+                if frame is None:
+                    frame = encode_message(message)
+                self._enqueue(client, frame)
             
-    async def broadcast_event(self, event_type: str, data: dict, exclude: WebSocket = None):
-        """Olay broadcast et"""
+    async def broadcast_event(self, event_type: str, data: dict, exclude: WebSocket = None,
+                              user_id: str = None):
+        """
+        Olay broadcast et
+        
+        user_id verilirse sadece o kullanıcının bağlantılarına gider,
+        verilmezse tüm bağlantılara (sistem geneli) gönderilir.
+        Stok/fiyat gibi yüksek frekanslı event'ler birleştirme penceresinden geçer.
+        """
+        user_id = str(user_id) if user_id else None
+        if self.coalescer and exclude is None and event_type in COALESCED_EVENTS:
+            await self.coalescer.add(event_type, data, user_id)
+        else:
+            await self._dispatch_event(event_type, data, user_id, exclude)
+    
+    async def _dispatch_event(self, event_type: str, data: dict, user_id: str = None,
+                              exclude: WebSocket = None):
+        """Event mesajını oluştur ve alıcılara ilet"""
         message = {
             "type": event_type,
             "data": data,
             "timestamp": datetime.now().isoformat()
         }
-        await self.broadcast(message, exclude)
+        topic = EVENT_TOPICS.get(event_type)
+        if user_id:
+            # Kullanıcı event'leri sıra numarası alır ve replay için saklanır
+            seq = self._next_seq(user_id)
+            message["seq"] = seq
+            frame = encode_message(message)
+            self._remember(user_id, seq, topic, frame)
+            self._send_frame_to_user(frame, user_id, topic)
+        else:
+            await self.broadcast(message, exclude, topic)
         
     def get_connection_count(self) -> int:
         """Toplam bağlantı sayısı"""
@@ -103,6 +576,56 @@ class ConnectionManager:
     def get_user_count(self) -> int:
         """Bağlı kullanıcı sayısı"""
         return len(self.active_connections)
+    
+    def get_topic_counts(self) -> Dict[str, int]:
+        """Topic başına abone bağlantı sayısı"""
+        counts = {topic: 0 for topic in EventTopics.ALL}
+        for client in self.clients.values():
+            for topic in client.topics:
+                counts[topic] = counts.get(topic, 0) + 1
+        return counts
+    
+    def get_queue_stats(self) -> dict:
+        """Gönderim kuyruğu doluluk ve düşürülen mesaj istatistikleri"""
+        depths = [client.queue.qsize() for client in self.clients.values()]
+        return {
+            'queue_size_limit': self.queue_size,
+            'overflow_policy': self.overflow_policy,
+            'total_queued': sum(depths),
+            'max_queue_depth': max(depths) if depths else 0,
+            'clients_backlogged': sum(1 for d in depths if d > 0),
+            **self.stats
+        }
+    
+    def get_heartbeat_stats(self) -> dict:
+        """Heartbeat ve bağlantı temizliği istatistikleri"""
+        return {
+            'interval_seconds': self.heartbeat_interval,
+            'timeout_seconds': self.heartbeat_timeout,
+            'max_connections_per_user': self.max_connections_per_user,
+            'running': self.heartbeat_task is not None and not self.heartbeat_task.done(),
+            **self.heartbeat_stats
+        }
+    
+    def get_replay_stats(self) -> dict:
+        """Resume / replay istatistikleri"""
+        return {
+            'stream_id': self.stream_id,
+            'buffer_size': self.replay_buffer_size,
+            'buffered_users': len(self.replay_buffers),
+            'buffered_events': sum(len(b) for b in self.replay_buffers.values()),
+            **self.replay_stats
+        }
+    
+    def get_coalescing_stats(self) -> dict:
+        """Event birleştirme istatistikleri"""
+        if not self.coalescer:
+            return {'enabled': False}
+        return {
+            'enabled': True,
+            'window_ms': int(self.coalescer.window * 1000),
+            **self.coalescer.stats
+        }
 
 
 # Global manager instance
@@ -148,27 +671,86 @@ class EventTypes:
     SUCCESS = "success"
 
 
-async def broadcast_product_event(event_type: str, product_data: dict):
+class EventTopics:
+    """İstemcilerin abone olabileceği topic'ler"""
+    
+    ORDERS = "orders"
+    STOCK = "stock"
+    PRODUCTS = "products"
+    SELLERS = "sellers"
+    SETTINGS = "settings"
+    
+    ALL = (ORDERS, STOCK, PRODUCTS, SELLERS, SETTINGS)
+
+
+# Event tipi -> topic eşlemesi (listede olmayan event'ler herkese gider)
+EVENT_TOPICS = {
+    EventTypes.PRODUCT_ADDED: EventTopics.PRODUCTS,
+    EventTypes.PRODUCT_UPDATED: EventTopics.PRODUCTS,
+    EventTypes.PRODUCT_DELETED: EventTopics.PRODUCTS,
+    EventTypes.PRODUCT_PRICE_CHANGED: EventTopics.PRODUCTS,
+    EventTypes.PRODUCT_SYNCED: EventTopics.PRODUCTS,
+    EventTypes.PRODUCT_STOCK_CHANGED: EventTopics.STOCK,
+    
+    EventTypes.SELLER_ADDED: EventTopics.SELLERS,
+    EventTypes.SELLER_UPDATED: EventTopics.SELLERS,
+    EventTypes.SELLER_DELETED: EventTopics.SELLERS,
+    EventTypes.SELLER_PRODUCTS_FETCHED: EventTopics.SELLERS,
+    
+    EventTypes.ORDER_CREATED: EventTopics.ORDERS,
+    EventTypes.ORDER_UPDATED: EventTopics.ORDERS,
+    EventTypes.ORDER_STATUS_CHANGED: EventTopics.ORDERS,
+    EventTypes.ORDER_PROCESSED: EventTopics.ORDERS,
+    
+    EventTypes.STOCK_SYNC_STARTED: EventTopics.STOCK,
+    EventTypes.STOCK_SYNC_COMPLETED: EventTopics.STOCK,
+    EventTypes.STOCK_LOW: EventTopics.STOCK,
+    EventTypes.STOCK_OUT: EventTopics.STOCK,
+    
+    EventTypes.SETTINGS_UPDATED: EventTopics.SETTINGS,
+}
+
+
+# Birleştirme penceresinden geçen yüksek frekanslı event'ler
+COALESCED_EVENTS = {
+    EventTypes.PRODUCT_STOCK_CHANGED,
+    EventTypes.PRODUCT_PRICE_CHANGED,
+    EventTypes.PRODUCT_UPDATED,
+    EventTypes.PRODUCT_SYNCED,
+}
+
+
+def parse_topics(raw) -> Set[str]:
+    """'orders,stock' veya liste şeklindeki topic'leri geçerli set'e çevir"""
+    if not raw:
+        return set()
+    if isinstance(raw, str):
+        raw = raw.split(",")
+    return {t.strip() for t in raw if isinstance(t, str) and t.strip() in EventTopics.ALL}
+
+
+async def broadcast_product_event(event_type: str, product_data: dict, user_id: str = None):
     """Ürün event'i broadcast et"""
-    await manager.broadcast_event(event_type, product_data)
+    await manager.broadcast_event(event_type, product_data, user_id=user_id)
 
 
-async def broadcast_seller_event(event_type: str, seller_data: dict):
+async def broadcast_seller_event(event_type: str, seller_data: dict, user_id: str = None):
     """Satıcı event'i broadcast et"""
-    await manager.broadcast_event(event_type, seller_data)
+    await manager.broadcast_event(event_type, seller_data, user_id=user_id)
 
 
-async def broadcast_order_event(event_type: str, order_data: dict):
+async def broadcast_order_event(event_type: str, order_data: dict, user_id: str = None):
     """Sipariş event'i broadcast et"""
-    await manager.broadcast_event(event_type, order_data)
+    await manager.broadcast_event(event_type, order_data, user_id=user_id)
 
 
-async def broadcast_notification(message: str, type: str = "info"):
+async def broadcast_notification(message: str, type: str = "info", user_id: str = None):
     """Genel bildirim gönder"""
     await manager.broadcast_event(
         EventTypes.SYSTEM_NOTIFICATION,
         {
             "message": message,
             "notification_type": type
-        }
+        },
+        user_id=user_id
     )
@@ -52,6 +52,23 @@ function App() {
     }, 150);
   }, []);
 
+  // Kaçırılan event'ler tekrar gönderilemedi (replay_gap, stream_changed,
+  // queue_overflow): ürün, sipariş ve dashboard sayfaları verilerini baştan çeker
+  useEffect(() => {
+    if (!user) {
+      return;
+    }
+
+    const handleResync = (data) => {
+      console.log('🔄 Resync required:', data.reason);
+      websocket.emit('product_update', data);
+      websocket.emit('order_update', data);
+    };
+
+    websocket.on('resync_required', handleResync);
+    return () => websocket.off('resync_required', handleResync);
+  }, [user]);
+
   const handleLogin = (userData) => {
     console.log('✅ handleLogin called with:', userData);
     
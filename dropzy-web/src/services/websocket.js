@@ -7,6 +7,9 @@ class WebSocketService {
     this.reconnectAttempts = 0;
     this.maxReconnectAttempts = 5;
     this.reconnectTimeout = null;
+    // Kaldığı yerden devam için son alınan event sıra numarası
+    this.lastSeq = null;
+    this.streamId = null;
   }
 
   connect(token) {
@@ -14,7 +17,12 @@ class WebSocketService {
       return;
     }
 
-    const wsUrl = 'wss://dropzy.app/ws';
+    // Bağlantı token ile kullanıcıya bağlanır, event'ler sadece o kullanıcıya gelir
+    let wsUrl = `wss://dropzy.app/ws?token=${encodeURIComponent(token || '')}`;
+    // Yeniden bağlanırken sadece kaçırılan event'leri iste
+    if (this.lastSeq !== null && this.streamId) {
+      wsUrl += `&last_seq=${this.lastSeq}&stream_id=${this.streamId}`;
+    }
     
     try {
       this.socket = new WebSocket(wsUrl);
@@ -50,8 +58,23 @@ class WebSocketService {
         try {
           const data = JSON.parse(event.data);
           console.log('📨 WebSocket message:', data);
+
+          // Sunucu heartbeat'i - cevap vermezsek bağlantı idle sayılıp kapatılır
+          if (data.type === 'ping') {
+            this.send({ type: 'pong' });
+            return;
+          }
+
+          // Sıra numarası takibi (resume için)
+          if (data.type === 'connected' || data.type === 'resync_required') {
+            this.streamId = data.stream_id || this.streamId;
+            this.lastSeq = data.seq !== undefined ? data.seq : this.lastSeq;
+          } else if (data.seq !== undefined) {
+            this.lastSeq = data.seq;
+          }
           
           // Emit event to listeners
+          // (resync_required dahil - App verileri baştan çeker)
           if (data.type) {
             this.emit(data.type, data);
           }
@@ -279,6 +279,7 @@ function MainNavigator({ onLogout }) {
 export default function App() {
   const [isLoading, setIsLoading] = useState(true);
   const [isAuthenticated, setIsAuthenticated] = useState(false);
+  const [authToken, setAuthToken] = useState(null);
   const [needsApiSetup, setNeedsApiSetup] = useState(false);
   const isConnected = useNetwork();
 
@@ -287,9 +288,21 @@ export default function App() {
     NetworkService.initialize();
     checkAuth();
     
-    // WebSocket bağlantısını kur
+    return () => {
+      NetworkService.destroy();
+    };
+  }, []);
+
+  // WebSocket sadece oturum açıkken bağlı kalır (/ws token ister);
+  // token değişince (giriş/çıkış) bağlantı yeniden kurulur veya kapatılır
+  useEffect(() => {
+    if (!authToken) {
+      return;
+    }
+    
+    // Token her (yeniden) bağlanmada api'den güncel haliyle okunur
     const apiUrl = api.baseUrl || 'https://dropzy.app';
-    websocketService.connect(apiUrl);
+    websocketService.connect(apiUrl, () => api.token);
     
     // WebSocket event listeners
     const unsubscribers = [
@@ -333,16 +346,22 @@ export default function App() {
           `${data.product_name} tükendi!`
         );
       }),
+      
+      // Kaçırılan event'ler gönderilemedi - ürün, sipariş ve dashboard
+      // ekranları verilerini baştan çeker
+      websocketService.on(EventTypes.RESYNC_REQUIRED, (data) => {
+        console.log('🔄 Resync gerekli:', data.reason);
+        websocketService.requestRefresh(data);
+      }),
     ];
     
     return () => {
-      NetworkService.destroy();
       // WebSocket bağlantısını kapat
       websocketService.disconnect();
       // Event listener'ları temizle
       unsubscribers.forEach(unsub => unsub());
     };
-  }, []);
+  }, [authToken]);
 
   const checkAuth = async () => {
     try {
@@ -362,10 +381,12 @@ export default function App() {
         try {
           await api.getMe();
           setIsAuthenticated(true);
+          setAuthToken(api.token);
         } catch (e) {
           // Token geçersiz
           await api.clearAuth();
           setIsAuthenticated(false);
+          setAuthToken(null);
         }
       }
     } catch (e) {
@@ -377,11 +398,13 @@ export default function App() {
 
   const handleLogin = (userData) => {
     setIsAuthenticated(true);
+    setAuthToken(api.token);
   };
 
   const handleLogout = async () => {
     await api.logout();
     setIsAuthenticated(false);
+    setAuthToken(null);
   };
 
   if (isLoading) {
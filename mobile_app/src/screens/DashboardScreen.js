@@ -11,6 +11,7 @@ import { Ionicons } from '@expo/vector-icons';
 import api from '../services/api';
 import { StatCardSkeleton } from '../components/SkeletonLoader';
 import ConnectionStatus from '../components/ConnectionStatus';
+import websocketService, { EventTypes } from '../services/websocket';
 
 const StatCard = ({ icon, title, value, color, onPress }) => (
   <TouchableOpacity style={[styles.statCard, { borderLeftColor: color }]} onPress={onPress}>
@@ -59,6 +60,12 @@ export default function DashboardScreen({ navigation }) {
 
   useEffect(() => {
     fetchDashboard();
+    
+    // Resync sonrası özet verileri baştan çek
+    const unsubscribe = websocketService.on(EventTypes.DATA_REFRESH, () => {
+      fetchDashboard();
+    });
+    return unsubscribe;
   }, [fetchDashboard]);
 
   const onRefresh = useCallback(() => {
@@ -221,6 +221,11 @@ export default function OrdersScreen({ navigation }) {
         console.log('✅ Real-time: Sipariş işlendi', data);
         fetchOrders();
       }),
+      
+      // Resync sonrası listeyi baştan çek
+      websocketService.on(EventTypes.DATA_REFRESH, () => {
+        fetchOrders();
+      }),
     ];
     
     // Cleanup
@@ -209,6 +209,11 @@ export default function ProductsScreen({ navigation }) {
         console.log('💰 Real-time: Fiyat güncellendi', data);
         onRefresh();
       }),
+      
+      // Resync sonrası listeyi baştan çek
+      websocketService.on(EventTypes.DATA_REFRESH, () => {
+        onRefresh();
+      }),
     ];
     
     // Cleanup
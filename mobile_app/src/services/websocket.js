@@ -11,19 +11,52 @@ class WebSocketService {
     this.reconnectDelay = 3000; // 3 saniye
     this.listeners = new Map();
     this.isConnected = false;
+    this.url = null;
+    this.getToken = null;
+    this.shouldReconnect = false;
+    this.reconnectTimeout = null;
+    // Kaldığı yerden devam için son alınan event sıra numarası
+    this.lastSeq = null;
+    this.streamId = null;
   }
 
   /**
    * WebSocket bağlantısı kur
    * @param {string} url - WebSocket sunucu URL'i
+   * @param {function} getToken - Güncel oturum token'ını döndürür (event'ler sadece
+   *   bu kullanıcıya gelir); her yeniden bağlanmada tekrar okunur
    */
-  connect(url) {
+  connect(url, getToken) {
+    this.url = url;
+    this.getToken = getToken;
+    this.shouldReconnect = true;
+    this.reconnectAttempts = 0;
+    this._open();
+  }
+
+  /**
+   * Güncel token ile soketi aç
+   * @private
+   */
+  _open() {
+    const token = this.getToken ? this.getToken() : null;
+    // Sunucu token'sız bağlantıyı 1008 ile kapatır; oturum yoksa deneme
+    if (!token) {
+      console.log('[WebSocket] No session token, not connecting');
+      return;
+    }
+    
     try {
       // ws:// veya wss:// protokolünü ekle
-      const wsUrl = url.replace(/^http/, 'ws') + '/ws';
+      let wsUrl = this.url.replace(/^http/, 'ws') + '/ws?token=' + encodeURIComponent(token);
+      // Yeniden bağlanırken sadece kaçırılan event'leri iste
+      if (this.lastSeq !== null && this.streamId) {
+        wsUrl += `&last_seq=${this.lastSeq}&stream_id=${this.streamId}`;
+      }
       
       console.log('[WebSocket] Connecting to:', wsUrl);
-      this.ws = new WebSocket(wsUrl);
+      const socket = new WebSocket(wsUrl);
+      this.ws = socket;
 
       this.ws.onopen = () => {
         console.log('[WebSocket] ✅ Connected');
@@ -42,7 +75,22 @@ class WebSocketService {
           const data = JSON.parse(event.data);
           console.log('[WebSocket] ← Message:', data.type);
           
+          // Sunucu heartbeat'i - cevap vermezsek bağlantı idle sayılıp kapatılır
+          if (data.type === 'ping') {
+            this.send({ type: 'pong' });
+            return;
+          }
+          
+          // Sıra numarası takibi (resume için)
+          if (data.type === 'connected' || data.type === 'resync_required') {
+            this.streamId = data.stream_id || this.streamId;
+            this.lastSeq = data.seq !== undefined ? data.seq : this.lastSeq;
+          } else if (data.seq !== undefined) {
+            this.lastSeq = data.seq;
+          }
+          
           // Event'i ilgili listener'lara ilet
+          // (resync_required dahil - App verileri baştan çeker)
           this._emit(data.type, data);
           
         } catch (error) {
@@ -55,13 +103,25 @@ class WebSocketService {
         this._emit('error', { error });
       };
 
-      this.ws.onclose = () => {
-        console.log('[WebSocket] 🔌 Disconnected');
+      this.ws.onclose = (event) => {
+        // disconnect() sonrası veya yerine yenisi açılmış eski soket
+        if (this.ws !== socket) {
+          return;
+        }
+        console.log('[WebSocket] 🔌 Disconnected', event.code);
+        this.ws = null;
         this.isConnected = false;
         this._stopHeartbeat();
         
+        // 1008: token reddedildi veya cihaz limiti aşıldı - tekrar denemek
+        // aynı sonucu verir (ya da diğer cihazı düşürür)
+        if (event.code === 1008) {
+          console.log('[WebSocket] Closed by policy (1008), not reconnecting');
+          return;
+        }
+        
         // Otomatik yeniden bağlan
-        this._reconnect(url);
+        this._reconnect();
       };
 
     } catch (error) {
@@ -73,11 +133,21 @@ class WebSocketService {
    * WebSocket bağlantısını kapat
    */
   disconnect() {
+    // Yeniden bağlanmayı engelle
+    this.shouldReconnect = false;
+    if (this.reconnectTimeout) {
+      clearTimeout(this.reconnectTimeout);
+      this.reconnectTimeout = null;
+    }
+    // Sıra numaraları kullanıcıya özel; sonraki oturum baştan başlar
+    this.lastSeq = null;
+    this.streamId = null;
     if (this.ws) {
-      this.reconnectAttempts = this.maxReconnectAttempts; // Yeniden bağlanmayı engelle
-      this.ws.close();
+      const socket = this.ws;
       this.ws = null;
+      socket.close();
       this.isConnected = false;
+      this._stopHeartbeat();
     }
   }
 
@@ -151,11 +221,22 @@ class WebSocketService {
     }
   }
 
+  /**
+   * Ekranların verilerini baştan çekmesini iste (ör. resync_required sonrası)
+   * @param {object} data - Tetikleyen mesaj
+   */
+  requestRefresh(data) {
+    this._emit(EventTypes.DATA_REFRESH, data);
+  }
+
   /**
    * Yeniden bağlan
    * @private
    */
-  _reconnect(url) {
+  _reconnect() {
+    if (!this.shouldReconnect) {
+      return;
+    }
     if (this.reconnectAttempts >= this.maxReconnectAttempts) {
       console.log('[WebSocket] Max reconnect attempts reached');
       this._emit('max_reconnect_attempts', {});
@@ -165,11 +246,28 @@ class WebSocketService {
     this.reconnectAttempts++;
     console.log(`[WebSocket] Reconnecting... (${this.reconnectAttempts}/${this.maxReconnectAttempts})`);
     
-    setTimeout(() => {
-      this.connect(url);
+    this.reconnectTimeout = setTimeout(() => {
+      this.reconnectTimeout = null;
+      this._open();
     }, this.reconnectDelay);
   }
 
+  /**
+   * Topic'lere abone ol (orders, stock, products, sellers, settings)
+   * @param {string[]} topics - Topic listesi
+   */
+  subscribe(topics) {
+    this.send({ type: 'subscribe', topics });
+  }
+
+  /**
+   * Topic aboneliğini kaldır
+   * @param {string[]} topics - Topic listesi
+   */
+  unsubscribe(topics) {
+    this.send({ type: 'unsubscribe', topics });
+  }
+
   /**
    * Heartbeat (ping-pong) başlat
    * @private
@@ -249,6 +347,12 @@ export const EventTypes = {
   ERROR: 'error',
   SUCCESS: 'success',
   
+  // Senkronizasyon events - kaçırılan event'ler tekrar gönderilemiyor
+  // (replay_gap, stream_changed, queue_overflow); veriler baştan çekilmeli
+  RESYNC_REQUIRED: 'resync_required',
+  // Uygulama içi: ekranlar verilerini yeniden çeker (sunucudan gelmez)
+  DATA_REFRESH: 'data_refresh',
+  
   // Bağlantı events
   CONNECTED: 'connected',
   DISCONNECTED: 'disconnected',